@@ -0,0 +1,252 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from pymongo.database import Database
+from dotenv import load_dotenv
+from routes.cotizacionesLegales import get_routes
+from routes.encuadernacion import get_encuadernacion_routes, ensure_encuadernacion_indexes
+from routes.auth import get_auth_routes
+from routes.telegram_recipients import get_telegram_recipients_routes, ensure_telegram_recipients_indexes
+from routes.sync import get_sync_routes
+from routes.price_history import get_price_history_routes
+from routes.repricing import get_repricing_routes
+from routes.pdf import get_pdf_routes
+from routes.payment_plans import get_payment_plan_routes
+from routes.bootstrap import get_bootstrap_routes
+from services.template_service import TemplateService
+from services.telegram_service import TelegramService
+from services.sync_service import SyncService
+from services.archive_service import ArchiveService, ARCHIVO_INTERVALO_SEGUNDOS
+from services.idempotency_service import IdempotencyService
+from services.catalog_cache import CatalogCache
+from services.cotizacion_storage import CotizacionStorage
+from services.price_history_service import PriceHistoryService, TIPO_LEY, TIPO_ENCUADERNACION
+from services.repricing_service import RepricingService
+from services.pdf_service import PdfService
+from services.payment_plan_service import PaymentPlanService
+from services.bootstrap_service import BootstrapService
+from services.invalidation_bus import InvalidationBus, CANAL_LEYES, CANAL_COTIZACIONES, CANAL_ENCUADERNACION, CANAL_PLANES_PAGO, CANAL_TELEGRAM
+from services.document_cache import DocumentCache
+from services.auth_service import AuthService
+from services.user_provisioning_service import UserProvisioningService
+from services.group_commit_writer import GroupCommitWriter, COTIZACIONES_GRUPO_COMMIT
+from fastapi.middleware.cors import CORSMiddleware
+
+# Cargar variables de entorno
+load_dotenv()
+
+MONGO_COLLECTION_LEYES = os.getenv("MONGO_COLLECTION_LEYES", "leyes")
+MONGO_COLLECTION_COTIZACIONES = os.getenv("MONGO_COLLECTION_COTIZACIONES", "cotizaciones")
+MONGO_COLLECTION_ENCUADERNACION = os.getenv("MONGO_COLLECTION_ENCUADERNACION", "encuadernacion")
+MONGO_COLLECTION_USERS = os.getenv("MONGO_COLLECTION_USERS", "users")
+MONGO_COLLECTION_TELEGRAM_DESTINATARIOS = os.getenv("MONGO_COLLECTION_TELEGRAM_DESTINATARIOS", "telegram_destinatarios")
+MONGO_COLLECTION_CONTADORES = os.getenv("MONGO_COLLECTION_CONTADORES", "contadores")
+MONGO_COLLECTION_SYNC_LAPIDAS = os.getenv("MONGO_COLLECTION_SYNC_LAPIDAS", "sync_lapidas")
+MONGO_COLLECTION_COTIZACIONES_ARCHIVO = os.getenv("MONGO_COLLECTION_COTIZACIONES_ARCHIVO", "cotizaciones_archivo")
+MONGO_COLLECTION_IDEMPOTENCIA = os.getenv("MONGO_COLLECTION_IDEMPOTENCIA", "idempotencia")
+MONGO_COLLECTION_HISTORIAL_PRECIOS = os.getenv("MONGO_COLLECTION_HISTORIAL_PRECIOS", "historial_precios")
+MONGO_COLLECTION_TRABAJOS_REPRECIO = os.getenv("MONGO_COLLECTION_TRABAJOS_REPRECIO", "trabajos_reprecio")
+MONGO_COLLECTION_PLANES_PAGO = os.getenv("MONGO_COLLECTION_PLANES_PAGO", "planes_pago")
+MONGO_COLLECTION_INVALIDACIONES = os.getenv("MONGO_COLLECTION_INVALIDACIONES", "invalidaciones")
+
+# CORS
+origins = [
+    "http://localhost",
+    "http://localhost:5174"
+]
+
+async def run_archive_job(archive_service: ArchiveService, interval: float):
+    """Job periódico de archivo; cada ejecución mueve como máximo ARCHIVO_MAX_LOTES lotes"""
+    while True:
+        try:
+            await asyncio.to_thread(archive_service.run)
+        except Exception as e:
+            print(f"❌ Error en el job de archivo: {str(e)}")
+        await asyncio.sleep(interval)
+
+def create_app(db: Database, archive_interval: float = ARCHIVO_INTERVALO_SEGUNDOS) -> FastAPI:
+    """
+    Construye la aplicación FastAPI sobre la base de datos indicada.
+
+    main.py la usa con la conexión real; los benchmarks la montan sobre
+    una base de datos local (mongomock o un mongod temporal).
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Compilar plantillas y pre-renderizar fragmentos estáticos al arrancar
+        TemplateService.preload()
+        # Índices y versiones de sincronización
+        sync_service.ensure_indexes()
+        archive_service.ensure_indexes()
+        idempotency_service.ensure_indexes()
+        price_history_service.ensure_indexes({TIPO_LEY: collection_leyes, TIPO_ENCUADERNACION: collection_encuadernacion})
+        repricing_service.ensure_indexes()
+        payment_plan_service.ensure_indexes()
+        auth_service.ensure_indexes()
+        auth_service.migrate_password_fields()
+        ensure_encuadernacion_indexes(collection_encuadernacion)
+        ensure_telegram_recipients_indexes(collection_destinatarios)
+        # Invalidaciones de caché publicadas por los demás workers
+        invalidation_bus.ensure_collection()
+        invalidation_bus.start()
+        archive_task = asyncio.create_task(run_archive_job(archive_service, archive_interval)) if archive_interval > 0 else None
+        yield
+        if archive_task:
+            archive_task.cancel()
+        invalidation_bus.stop()
+        # No perder notificaciones de Telegram que sigan agrupándose
+        TelegramService.flush_pending()
+        PdfService.shutdown()
+        UserProvisioningService.shutdown()
+
+    app = FastAPI(title="LeyesVzla API", description="API para gestión de cotizaciones legales", version="1.0.0", lifespan=lifespan)
+
+    collection_leyes = db[MONGO_COLLECTION_LEYES]
+    collection_cotizaciones = db[MONGO_COLLECTION_COTIZACIONES]
+    collection_encuadernacion = db[MONGO_COLLECTION_ENCUADERNACION]
+    collection_users = db[MONGO_COLLECTION_USERS]
+    collection_destinatarios = db[MONGO_COLLECTION_TELEGRAM_DESTINATARIOS]
+
+    archive_collection = db[MONGO_COLLECTION_COTIZACIONES_ARCHIVO]
+    cotizacion_storage = CotizacionStorage(CatalogCache(collection_leyes), [collection_cotizaciones, archive_collection])
+
+    sync_service = SyncService(
+        db[MONGO_COLLECTION_CONTADORES],
+        db[MONGO_COLLECTION_SYNC_LAPIDAS],
+        {
+            "cotizaciones": collection_cotizaciones,
+            "leyes": collection_leyes,
+            "encuadernacion": collection_encuadernacion
+        },
+        decoders={"cotizaciones": cotizacion_storage.expand}
+    )
+
+    # Cachés en memoria que se vacían al escribir en cualquier worker
+    invalidation_bus = InvalidationBus(db[MONGO_COLLECTION_INVALIDACIONES])
+
+    archive_service = ArchiveService(collection_cotizaciones, archive_collection, invalidation_bus=invalidation_bus, sync_service=sync_service)
+    idempotency_service = IdempotencyService(db[MONGO_COLLECTION_IDEMPOTENCIA])
+    price_history_service = PriceHistoryService(db[MONGO_COLLECTION_HISTORIAL_PRECIOS])
+    repricing_service = RepricingService(
+        collection_cotizaciones,
+        collection_encuadernacion,
+        db[MONGO_COLLECTION_TRABAJOS_REPRECIO],
+        cotizacion_storage,
+        sync_service,
+        invalidation_bus=invalidation_bus,
+        price_history_service=price_history_service
+    )
+
+    pdf_service = PdfService()
+    auth_service = AuthService(collection_users, collection_destinatarios)
+    # Inserciones de cotizaciones agrupadas en un insert_many (opcional)
+    cotizacion_writer = GroupCommitWriter(collection_cotizaciones, sync_service) if COTIZACIONES_GRUPO_COMMIT else None
+    payment_plan_service = PaymentPlanService(db[MONGO_COLLECTION_PLANES_PAGO])
+
+    cotizaciones_cache = DocumentCache("cotizaciones")
+    leyes_cache = DocumentCache("leyes")
+
+    invalidation_bus.subscribe(CANAL_COTIZACIONES, cotizaciones_cache.evict)
+    invalidation_bus.subscribe(CANAL_LEYES, leyes_cache.evict)
+    invalidation_bus.subscribe(CANAL_LEYES, lambda clave: cotizacion_storage.catalog.invalidate())
+    invalidation_bus.subscribe(CANAL_LEYES, lambda clave: price_history_service.invalidate(TIPO_LEY))
+    invalidation_bus.subscribe(CANAL_ENCUADERNACION, lambda clave: price_history_service.invalidate(TIPO_ENCUADERNACION))
+    invalidation_bus.subscribe(CANAL_PLANES_PAGO, lambda clave: payment_plan_service.invalidate())
+    invalidation_bus.subscribe(CANAL_TELEGRAM, lambda clave: TelegramService.invalidate_recipients())
+
+    bootstrap_service = BootstrapService(collection_leyes, collection_encuadernacion, payment_plan_service, sync_service)
+    for canal in (CANAL_LEYES, CANAL_ENCUADERNACION, CANAL_PLANES_PAGO):
+        invalidation_bus.subscribe(canal, lambda clave: bootstrap_service.invalidate())
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Incluir rutas (reprecio antes que /cotizaciones/{id})
+    app.include_router(
+        get_repricing_routes(repricing_service),
+        prefix="",
+        tags=["Leyes y Cotizaciones"]
+    )
+
+    app.include_router(
+        get_routes(
+            collection_leyes,
+            collection_cotizaciones,
+            sync_service=sync_service,
+            archive_service=archive_service,
+            idempotency_service=idempotency_service,
+            cotizacion_storage=cotizacion_storage,
+            price_history_service=price_history_service,
+            repricing_service=repricing_service,
+            pdf_service=pdf_service,
+            payment_plan_service=payment_plan_service,
+            invalidation_bus=invalidation_bus,
+            cotizaciones_cache=cotizaciones_cache,
+            leyes_cache=leyes_cache,
+            collection_destinatarios=collection_destinatarios,
+            cotizacion_writer=cotizacion_writer,
+            collection_encuadernacion=collection_encuadernacion
+        ),
+        prefix="",
+        tags=["Leyes y Cotizaciones"]
+    )
+
+    app.include_router(
+        get_encuadernacion_routes(collection_encuadernacion, sync_service, price_history_service, repricing_service, invalidation_bus),
+        prefix="",
+        tags=["Encuadernación"]
+    )
+
+    app.include_router(
+        get_auth_routes(collection_users, collection_destinatarios, auth_service),
+        prefix="",
+        tags=["Autenticación"]
+    )
+
+    app.include_router(
+        get_telegram_recipients_routes(collection_destinatarios, invalidation_bus, auth_service),
+        prefix="",
+        tags=["Telegram"]
+    )
+
+    app.include_router(
+        get_pdf_routes(archive_service, cotizacion_storage, pdf_service),
+        prefix="",
+        tags=["Leyes y Cotizaciones"]
+    )
+
+    app.include_router(
+        get_payment_plan_routes(payment_plan_service, collection_cotizaciones, invalidation_bus),
+        prefix="",
+        tags=["Planes de pago"]
+    )
+
+    app.include_router(
+        get_price_history_routes(price_history_service, cotizacion_storage, archive_service, collection_encuadernacion),
+        prefix="",
+        tags=["Precios"]
+    )
+
+    app.include_router(
+        get_bootstrap_routes(bootstrap_service),
+        prefix="",
+        tags=["Cotizador"]
+    )
+
+    app.include_router(
+        get_sync_routes(sync_service),
+        prefix="",
+        tags=["Sincronización"]
+    )
+
+    @app.get("/")
+    def read_root():
+        return {"message": "API de LawDesign funcionando"}
+
+    return app
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Benchmark reproducible de la API.
+
+Monta la aplicación sobre una base de datos local con datos sintéticos,
+Telegram y Resend simulados, y mide throughput y latencias p50/p95/p99
+de los endpoints principales a la concurrencia indicada. El resultado se
+guarda como JSON para compararlo entre commits.
+
+Uso (desde el directorio backend):
+    python -m benchmarks.api_benchmark --seed 1k --concurrency 16 --requests 500
+    python -m benchmarks.api_benchmark --seed 100k --mongo spawn --output bench.json
+    python -m benchmarks.api_benchmark --seed 1k --compare bench_anterior.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.environment import MongoStandIn, build_app
+from benchmarks.seed_data import (
+    BENCH_PASSWORD,
+    BENCH_USERNAME,
+    cotizacion_payload,
+    parse_seed_size,
+    seed_database,
+)
+
+SCENARIOS = [
+    "leyes_list",
+    "encuadernacion_list",
+    "cotizaciones_list",
+    "cotizaciones_create",
+    "auth_login",
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, duration: float) -> Dict:
+    ordered = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "duration_s": round(duration, 4),
+        "throughput_rps": round(total / duration, 2) if duration > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 50) * 1000, 3),
+            "p95": round(percentile(ordered, 95) * 1000, 3),
+            "p99": round(percentile(ordered, 99) * 1000, 3),
+            "mean": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+            "max": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        },
+    }
+
+
+def build_requests(leyes: List[Dict]) -> Dict[str, Callable[[random.Random], Dict]]:
+    """Petición HTTP que ejecuta cada escenario"""
+    return {
+        "leyes_list": lambda rng: {"method": "GET", "url": "/leyes"},
+        "encuadernacion_list": lambda rng: {"method": "GET", "url": "/encuadernacion"},
+        "cotizaciones_list": lambda rng: {"method": "GET", "url": "/cotizaciones"},
+        "cotizaciones_create": lambda rng: {"method": "POST", "url": "/cotizaciones", "json": cotizacion_payload(leyes, rng)},
+        "auth_login": lambda rng: {
+            "method": "POST",
+            "url": "/auth/login",
+            "json": {"username": BENCH_USERNAME, "password": BENCH_PASSWORD},
+        },
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, make_request: Callable, total_requests: int, concurrency: int, warmup: int) -> Dict:
+    """Ejecuta un escenario con `concurrency` trabajadores hasta completar `total_requests`"""
+    rng = random.Random(7)
+
+    for _ in range(warmup):
+        await client.request(**make_request(rng))
+
+    latencies: List[float] = []
+    errors = 0
+    pending = total_requests
+
+    async def worker():
+        nonlocal pending, errors
+        while pending > 0:
+            pending -= 1
+            request = make_request(rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                elapsed = time.perf_counter() - start
+                if response.status_code >= 400:
+                    errors += 1
+                else:
+                    latencies.append(elapsed)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare_reports(current: Dict, previous: Dict):
+    """Imprime la variación de throughput y p95 respecto a un reporte anterior"""
+    print(f"\n📊 Comparación con {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')})")
+    print(f"{'escenario':<22}{'rps antes':>12}{'rps ahora':>12}{'Δ%':>8}{'p95 antes':>12}{'p95 ahora':>12}{'Δ%':>8}")
+    for name, result in current["results"].items():
+        before = previous["results"].get(name)
+        if not before:
+            continue
+
+        def delta(new, old):
+            return f"{(new - old) / old * 100:+.1f}" if old else "n/a"
+
+        print(
+            f"{name:<22}"
+            f"{before['throughput_rps']:>12.1f}{result['throughput_rps']:>12.1f}"
+            f"{delta(result['throughput_rps'], before['throughput_rps']):>8}"
+            f"{before['latency_ms']['p95']:>12.2f}{result['latency_ms']['p95']:>12.2f}"
+            f"{delta(result['latency_ms']['p95'], before['latency_ms']['p95']):>8}"
+        )
+
+
+async def run_benchmark(args) -> Dict:
+    from app_factory import (
+        MONGO_COLLECTION_COTIZACIONES,
+        MONGO_COLLECTION_ENCUADERNACION,
+        MONGO_COLLECTION_LEYES,
+        MONGO_COLLECTION_USERS,
+    )
+
+    seed_size = parse_seed_size(args.seed)
+    scenarios = args.scenarios.split(",") if args.scenarios else SCENARIOS
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+
+    mongo = MongoStandIn(args.mongo)
+    db = mongo.start()
+    try:
+        print(f"🌱 Poblando base de datos ({args.mongo}) con {seed_size} cotizaciones...")
+        seeded = seed_database(
+            db,
+            seed_size,
+            {
+                "leyes": MONGO_COLLECTION_LEYES,
+                "cotizaciones": MONGO_COLLECTION_COTIZACIONES,
+                "encuadernacion": MONGO_COLLECTION_ENCUADERNACION,
+                "users": MONGO_COLLECTION_USERS,
+            },
+        )
+
+        app = build_app(db)
+        requests_by_scenario = build_requests(seeded["leyes"])
+        results = {}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for name in scenarios:
+                print(f"🚀 {name}: {args.requests} peticiones, concurrencia {args.concurrency}")
+                results[name] = await run_scenario(
+                    client, requests_by_scenario[name], args.requests, args.concurrency, args.warmup
+                )
+                latency = results[name]["latency_ms"]
+                print(
+                    f"   {results[name]['throughput_rps']} req/s | "
+                    f"p50 {latency['p50']} ms | p95 {latency['p95']} ms | p99 {latency['p99']} ms | "
+                    f"errores {results[name]['errors']}"
+                )
+    finally:
+        mongo.stop()
+
+    return {
+        "meta": {
+            "commit": git_revision(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mongo": "mongomock" if args.mongo == "mongomock" else ("spawn" if args.mongo == "spawn" else "uri"),
+            "seed_size": seed_size,
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la API de LeyesVzla")
+    parser.add_argument("--seed", default="1k", help="Cotizaciones sintéticas: 1k, 100k, 1m o un número")
+    parser.add_argument("--mongo", default="mongomock", help="mongomock, spawn o una URI mongodb:// (se vacía la BD)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Peticiones concurrentes por escenario")
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones medidas por escenario")
+    parser.add_argument("--warmup", type=int, default=5, help="Peticiones de calentamiento no medidas")
+    parser.add_argument("--scenarios", default="", help=f"Lista separada por comas ({','.join(SCENARIOS)})")
+    parser.add_argument("--output", default="", help="Ruta del reporte JSON (por defecto benchmark-<commit>.json)")
+    parser.add_argument("--compare", default="", help="Reporte JSON anterior con el que comparar")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+
+    output = args.output or f"benchmark-{report['meta']['commit'] or 'local'}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Reporte guardado en {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_reports(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Entorno aislado para los benchmarks de la API.
+
+Monta la aplicación de app_factory sobre una base de datos local
+(mongomock o un mongod temporal) y reemplaza Telegram y Resend por stubs,
+de forma que los benchmarks nunca toquen servicios externos.
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from typing import Optional
+
+from pymongo import MongoClient
+
+BENCH_DB_NAME = "leyesvzla_benchmark"
+
+
+def stub_external_services():
+    """Reemplaza los envíos a Telegram y Resend por respuestas exitosas inmediatas"""
+    import resend
+    from services.telegram_service import TelegramService
+
+    TelegramService.send_message = lambda self, message, parse_mode="HTML", chat_id=None: True
+    resend.Emails.send = staticmethod(lambda params: {"id": "benchmark"})
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MongoStandIn:
+    """
+    Base de datos local para los benchmarks.
+
+    Modos:
+        - "mongomock": base de datos en memoria (no requiere servidor)
+        - "spawn": lanza un mongod temporal en un puerto libre
+        - cualquier URI mongodb://: usa un servidor existente
+    """
+
+    def __init__(self, mode: str = "mongomock"):
+        self.mode = mode
+        self.client = None
+        self._process: Optional[subprocess.Popen] = None
+        self._dbpath: Optional[str] = None
+
+    def start(self):
+        if self.mode == "mongomock":
+            import mongomock
+            self.client = mongomock.MongoClient()
+        elif self.mode == "spawn":
+            self._spawn_mongod()
+        else:
+            self.client = MongoClient(self.mode)
+            self.client.admin.command("ping")
+
+        db = self.client[BENCH_DB_NAME]
+        if self.mode != "mongomock":
+            # Partir siempre de una base de datos vacía
+            self.client.drop_database(BENCH_DB_NAME)
+        return db
+
+    def _spawn_mongod(self):
+        mongod = shutil.which("mongod")
+        if not mongod:
+            raise RuntimeError("No se encontró el ejecutable 'mongod' en el PATH")
+
+        port = _free_port()
+        self._dbpath = tempfile.mkdtemp(prefix="leyesvzla-bench-")
+        self._process = subprocess.Popen(
+            [mongod, "--dbpath", self._dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self.client = MongoClient(f"mongodb://127.0.0.1:{port}", serverSelectionTimeoutMS=500)
+
+        deadline = time.time() + 30
+        while True:
+            try:
+                self.client.admin.command("ping")
+                return
+            except Exception:
+                if time.time() > deadline:
+                    self.stop()
+                    raise RuntimeError("mongod no respondió en 30 segundos")
+                time.sleep(0.2)
+
+    def stop(self):
+        if self.client is not None:
+            self.client.close()
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait(timeout=30)
+            self._process = None
+        if self._dbpath:
+            shutil.rmtree(self._dbpath, ignore_errors=True)
+            self._dbpath = None
+
+
+def build_app(db):
+    """Construye la aplicación real sobre la base de datos del benchmark"""
+    stub_external_services()
+    from app_factory import create_app
+    # Sin job de archivo: movería cotizaciones mientras se mide
+    return create_app(db, archive_interval=0)
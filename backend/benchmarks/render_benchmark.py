@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark de renderizado de notificaciones.
+
+Mide cuánto cuesta construir cada correo y mensaje de Telegram con las
+plantillas compiladas y lo compara con la latencia de envío, para
+confirmar que en envíos masivos el tiempo se va en la red y no en
+construir cadenas.
+
+Uso (desde el directorio backend):
+    python -m benchmarks.render_benchmark --count 5000 --send-latency-ms 150
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.seed_data import make_cotizacion, make_leyes
+from services.template_service import TemplateService
+
+
+def quotation_email_context(cotizacion: dict) -> dict:
+    return {
+        "client_name": cotizacion["cliente"]["nombre"],
+        "client_email": cotizacion["cliente"]["email"],
+        "client_phone": "+58 412 0000000",
+        "selected_laws": [{"name": item["nombre"], "price": item["precio"]} for item in cotizacion["leyes_seleccionadas"]["items"]],
+        "encuadernacion": {"type": "MDF Carta", "cost": cotizacion["resumen_costo"]["costo_encuadernacion"]},
+        "total_cost": cotizacion["resumen_costo"]["total"],
+        "payment_option": cotizacion["opcion_pago"]["tipo"],
+        "created_at": cotizacion["fecha"]["fecha_completa"],
+    }
+
+
+def telegram_context(cotizacion: dict) -> dict:
+    return {
+        "cliente_nombre": cotizacion["cliente"]["nombre"],
+        "cliente_email": cotizacion["cliente"]["email"],
+        "fecha_completa": cotizacion["fecha"]["fecha_completa"],
+        "total": cotizacion["resumen_costo"]["total"],
+        "estado": cotizacion["estado"],
+    }
+
+
+def time_renders(template_name: str, contexts: list) -> float:
+    start = time.perf_counter()
+    for context in contexts:
+        TemplateService.render(template_name, **context)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de renderizado de plantillas")
+    parser.add_argument("--count", type=int, default=2000, help="Mensajes a renderizar por plantilla")
+    parser.add_argument("--send-latency-ms", type=float, default=150.0, help="Latencia típica de un envío (Resend/Telegram)")
+    parser.add_argument("--output", default="", help="Ruta opcional del reporte JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    TemplateService.preload()
+    preload_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(42)
+    leyes = make_leyes()
+    cotizaciones = [make_cotizacion(leyes, rng, datetime.now()) for _ in range(args.count)]
+
+    cases = {
+        "email/cotizacion.html": [quotation_email_context(c) for c in cotizaciones],
+        "email/recuperacion_password.html": [
+            {"username": f"usuario{i}", "reset_url": f"http://localhost:3000/reset-password?token={i:032x}"}
+            for i in range(args.count)
+        ],
+        "telegram/nueva_cotizacion.html": [telegram_context(c) for c in cotizaciones],
+        "telegram/recuperacion_password.html": [
+            {"username": f"usuario{i}", "email": f"usuario{i}@example.com", "temp_password": "Tmp123!@#abc"}
+            for i in range(args.count)
+        ],
+    }
+
+    print(f"⚙️  Precarga de plantillas: {preload_ms:.2f} ms")
+    print(f"{'plantilla':<38}{'µs/render':>12}{'% del envío':>14}")
+    report = {"preload_ms": round(preload_ms, 3), "send_latency_ms": args.send_latency_ms, "templates": {}}
+    for name, contexts in cases.items():
+        elapsed = time_renders(name, contexts)
+        per_render_us = elapsed / len(contexts) * 1_000_000
+        share = per_render_us / 1000 / (args.send_latency_ms + per_render_us / 1000) * 100
+        report["templates"][name] = {"renders": len(contexts), "us_per_render": round(per_render_us, 2), "render_share_pct": round(share, 4)}
+        print(f"{name:<38}{per_render_us:>12.1f}{share:>13.3f}%")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Reporte guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark de construcción de CotizacionLegalSchema.
+
+Compara el PyObjectId anterior (validador estilo v1 vía __get_validators__,
+con las rutas convirtiendo `_id` a str antes de validar) contra el tipo
+compartido de schemas/object_id.py (core schema v2, acepta el ObjectId tal
+cual llega de Mongo). Mide modelos construidos por segundo y, aparte, la
+serialización a JSON de la respuesta.
+
+Uso (desde el directorio backend):
+    python -m benchmarks.schema_benchmark --count 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import warnings
+from datetime import datetime
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from pydantic import BaseModel, Field
+
+from benchmarks.seed_data import make_cotizacion, make_leyes
+from schemas.cotizacionesLegales_schemas import CotizacionLegalSchema
+from schemas.object_id import PyObjectId
+
+
+class LegacyPyObjectId(ObjectId):
+    """Copia del PyObjectId que había en cada módulo de esquemas"""
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v, info):
+        if not ObjectId.is_valid(v):
+            raise ValueError("Invalid ObjectId")
+        return ObjectId(v)
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema, handler) -> dict:
+        return {"type": "string"}
+
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+
+    class LegacyCotizacionLegalSchema(CotizacionLegalSchema):
+        id: Optional[LegacyPyObjectId] = Field(alias="_id", default=None)
+
+    class LegacyIdOnly(BaseModel):
+        id: Optional[LegacyPyObjectId] = Field(alias="_id", default=None)
+        model_config = {"arbitrary_types_allowed": True, "json_encoders": {ObjectId: str}}
+
+
+class IdOnly(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+
+
+def legacy_build(doc: dict):
+    # Patrón anterior de las rutas: str() del _id y luego validar
+    doc = dict(doc)
+    doc["_id"] = str(doc["_id"])
+    return LegacyCotizacionLegalSchema(**doc)
+
+
+def current_build(doc: dict):
+    return CotizacionLegalSchema(**doc)
+
+
+def legacy_id_only(doc: dict):
+    return LegacyIdOnly(_id=str(doc["_id"]))
+
+
+def current_id_only(doc: dict):
+    return IdOnly(_id=doc["_id"])
+
+
+def time_builds(build, docs: list, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for doc in docs:
+            build(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_dumps(models: list, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for model in models:
+            model.model_dump_json(by_alias=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de construcción de CotizacionLegalSchema")
+    parser.add_argument("--count", type=int, default=20000, help="Documentos por ronda")
+    parser.add_argument("--rounds", type=int, default=5, help="Rondas (se reporta la mejor)")
+    parser.add_argument("--output", default="", help="Ruta opcional del reporte JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    leyes = make_leyes()
+    docs = []
+    for _ in range(args.count):
+        doc = make_cotizacion(leyes, rng, datetime.now())
+        doc["_id"] = ObjectId()
+        docs.append(doc)
+
+    report = {"count": args.count, "rounds": args.rounds, "casos": {}}
+    cases = (
+        ("anterior", legacy_build),
+        ("actual", current_build),
+        # Solo el campo _id, para aislar el costo del tipo del resto de validaciones
+        ("solo_id_anterior", legacy_id_only),
+        ("solo_id_actual", current_id_only),
+    )
+    for name, build in cases:
+        build_s = time_builds(build, docs, args.rounds)
+        models = [build(doc) for doc in docs]
+        dump_s = time_dumps(models, args.rounds)
+        report["casos"][name] = {
+            "modelos_por_segundo": round(args.count / build_s),
+            "json_por_segundo": round(args.count / dump_s),
+        }
+
+    anterior = report["casos"]["anterior"]["modelos_por_segundo"]
+    actual = report["casos"]["actual"]["modelos_por_segundo"]
+    report["mejora_construccion"] = round(actual / anterior, 2)
+    report["mejora_solo_id"] = round(
+        report["casos"]["solo_id_actual"]["modelos_por_segundo"] / report["casos"]["solo_id_anterior"]["modelos_por_segundo"], 2
+    )
+
+    print(f"📊 CotizacionLegalSchema, {args.count} documentos, mejor de {args.rounds} rondas")
+    for name, caso in report["casos"].items():
+        print(f"   {name:<17} {caso['modelos_por_segundo']:>9,} modelos/s   {caso['json_por_segundo']:>9,} JSON/s")
+    print(f"   construcción completa: x{report['mejora_construccion']}   solo _id: x{report['mejora_solo_id']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Reporte guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
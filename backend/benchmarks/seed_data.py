@@ -0,0 +1,169 @@
+"""
+Generación de datos sintéticos para los benchmarks.
+
+Los documentos siguen la misma forma que producen el frontend y las rutas
+(CotizacionLegalSchema, LeySchema, EncuadernacionSchema y usuarios de AuthService).
+"""
+
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+SEED_SIZES = {
+    "1k": 1_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+BENCH_USERNAME = "bench_admin"
+BENCH_PASSWORD = "Bench123!@#"
+
+GROSORES = ["Bajo", "Medio", "Alto", "Muy Alto"]
+CATEGORIAS = ["Constitucional", "Civil", "Penal", "Laboral", "Tributario", "Mercantil"]
+ENCUADERNACIONES = [
+    ("MDF", "Carta", 20.0),
+    ("MDF", "Pequeño", 15.0),
+    ("Cartón Gris", "Pequeño", 15.0),
+    ("Plastificado", "Carta", 10.0),
+    ("Plastificado", "Pequeño", 5.0),
+]
+CUOTAS = [1, 2, 3, 4]
+
+
+def parse_seed_size(value: str) -> int:
+    """Acepta los alias 1k/100k/1m o un número entero"""
+    key = value.strip().lower()
+    if key in SEED_SIZES:
+        return SEED_SIZES[key]
+    return int(key)
+
+
+def make_leyes(count: int = 200) -> List[Dict]:
+    now = datetime.now()
+    return [
+        {
+            "nombre": f"Ley Sintética {i:04d}",
+            "precio": float(random.randint(2, 40)),
+            "categoria": random.choice(CATEGORIAS),
+            "grosor": random.choice(GROSORES),
+            "fecha_actualizacion": now,
+        }
+        for i in range(count)
+    ]
+
+
+def make_encuadernaciones() -> List[Dict]:
+    now = datetime.now()
+    return [
+        {
+            "material": material,
+            "tamano": tamano,
+            "precio": precio,
+            "activo": True,
+            "fecha_creacion": now,
+            "fecha_actualizacion": now,
+        }
+        for material, tamano, precio in ENCUADERNACIONES
+    ]
+
+
+def make_cotizacion(leyes: List[Dict], rng: random.Random, fecha: datetime) -> Dict:
+    """Genera una cotización con entre 1 y 12 leyes agrupadas en volúmenes"""
+    seleccion = rng.sample(leyes, rng.randint(1, min(12, len(leyes))))
+    items = [{"nombre": ley["nombre"], "grosor": ley["grosor"], "precio": ley["precio"]} for ley in seleccion]
+    subtotal = sum(item["precio"] for item in items)
+
+    por_volumen = 4
+    volumenes = [
+        {"numero": n + 1, "leyes": ", ".join(item["nombre"] for item in items[n * por_volumen:(n + 1) * por_volumen])}
+        for n in range(math.ceil(len(items) / por_volumen))
+    ]
+    material, tamano, precio_encuadernacion = rng.choice(ENCUADERNACIONES)
+    costo_encuadernacion = precio_encuadernacion * len(volumenes)
+    total = subtotal + costo_encuadernacion
+    cuotas = rng.choice(CUOTAS)
+    entregada = rng.random() < 0.5
+
+    doc = {
+        "cliente": {"nombre": f"Cliente {rng.randint(1, 10**6)}", "email": f"cliente{rng.randint(1, 10**6)}@example.com"},
+        "fecha": {"fecha_completa": fecha.strftime("%d/%m/%Y %H:%M"), "timestamp": fecha},
+        "leyes_seleccionadas": {"cantidad": len(items), "items": items, "subtotal": subtotal},
+        "agrupamiento_volumenes": {
+            "cantidad_volumenes": len(volumenes),
+            "volumenes": volumenes,
+            "costo_encuadernacion": {
+                "cantidad": len(volumenes),
+                "costo_unitario": precio_encuadernacion,
+                "total": costo_encuadernacion,
+                "tipo_encuadernacion": {"material": material, "tamano": tamano, "precio": precio_encuadernacion},
+            },
+        },
+        "resumen_costo": {"subtotal_leyes": subtotal, "costo_encuadernacion": costo_encuadernacion, "total": total},
+        "opcion_pago": {
+            "tipo": "contado" if cuotas == 1 else f"{cuotas} cuotas",
+            "valor_cuota": float(math.ceil(total / cuotas)),
+            "cantidad_cuotas": cuotas,
+        },
+        "fecha_creacion": fecha,
+        "estado": "entregado" if entregada else "pendiente",
+    }
+    if entregada:
+        doc["fecha_entrega"] = fecha + timedelta(days=rng.randint(1, 15))
+    return doc
+
+
+def cotizacion_payload(leyes: List[Dict], rng: random.Random) -> Dict:
+    """Cuerpo JSON para POST /cotizaciones"""
+    doc = make_cotizacion(leyes, rng, datetime.now())
+    doc["estado"] = "pendiente"
+    doc.pop("fecha_entrega", None)
+    doc["fecha"]["timestamp"] = doc["fecha"]["timestamp"].isoformat()
+    doc["fecha_creacion"] = doc["fecha_creacion"].isoformat()
+    return doc
+
+
+def seed_database(db, cotizaciones: int, collections: Dict[str, str], chunk_size: int = 10_000, seed: int = 42) -> Dict:
+    """
+    Pobla la base de datos del benchmark.
+
+    Args:
+        db: Base de datos destino
+        cotizaciones: Número de cotizaciones a insertar
+        collections: Nombres de colección (leyes, cotizaciones, encuadernacion, users)
+        chunk_size: Tamaño de cada insert_many
+        seed: Semilla para obtener siempre el mismo conjunto de datos
+
+    Returns:
+        Dict: Leyes insertadas y número de cotizaciones
+    """
+    from services.auth_service import AuthService
+
+    rng = random.Random(seed)
+    random.seed(seed)
+
+    leyes = make_leyes()
+    db[collections["leyes"]].insert_many([dict(ley) for ley in leyes])
+    db[collections["encuadernacion"]].insert_many(make_encuadernaciones())
+
+    AuthService(db[collections["users"]]).create_user(
+        username=BENCH_USERNAME,
+        email="bench_admin@example.com",
+        password=BENCH_PASSWORD,
+        is_admin=True,
+    )
+
+    inicio = datetime.now() - timedelta(days=730)
+    collection = db[collections["cotizaciones"]]
+    insertadas = 0
+    while insertadas < cotizaciones:
+        lote = min(chunk_size, cotizaciones - insertadas)
+        docs = [
+            make_cotizacion(leyes, rng, inicio + timedelta(minutes=rng.randint(0, 730 * 24 * 60)))
+            for _ in range(lote)
+        ]
+        collection.insert_many(docs, ordered=False)
+        insertadas += lote
+        print(f"   🌱 {insertadas}/{cotizaciones} cotizaciones insertadas")
+
+    return {"leyes": leyes, "cotizaciones": insertadas}
@@ -0,0 +1,41 @@
+"""
+Calibración del costo de bcrypt para el hardware del servidor.
+
+Uso (desde el directorio backend, en la máquina donde corre la API):
+    python calibrate_bcrypt.py                    # objetivo de 250 ms por verificación
+    python calibrate_bcrypt.py --objetivo-ms 100
+
+Mide cuánto tarda verificar una contraseña con cada costo y recomienda el
+mayor que no supera el objetivo. El valor se configura con BCRYPT_ROUNDS en
+el entorno de la API: los hashes existentes con otro costo se rehacen al
+iniciar sesión cada usuario, sin pedirle nada.
+"""
+
+import argparse
+from services.auth_service import BCRYPT_ROUNDS, calibrate_bcrypt_rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrar el costo de bcrypt")
+    parser.add_argument("--objetivo-ms", type=float, default=250, help="Tiempo objetivo de una verificación (ms)")
+    parser.add_argument("--min", type=int, default=10, help="Costo mínimo aceptable")
+    parser.add_argument("--max", type=int, default=16, help="Costo máximo a medir")
+    parser.add_argument("--muestras", type=int, default=3, help="Verificaciones por costo (se usa la mediana)")
+    args = parser.parse_args()
+
+    print(f"⏱️ Midiendo bcrypt (objetivo {args.objetivo_ms:.0f} ms por verificación)...")
+    elegido, medidos = calibrate_bcrypt_rounds(args.objetivo_ms, args.min, args.max, args.muestras)
+    for rounds, ms in medidos.items():
+        marca = "  <- recomendado" if rounds == elegido else ""
+        actual = " (actual)" if rounds == BCRYPT_ROUNDS else ""
+        print(f"  costo {rounds:2d}: {ms:8.1f} ms{actual}{marca}")
+
+    if medidos[elegido] > args.objetivo_ms:
+        print(f"\n⚠️ Ni el costo mínimo ({args.min}) alcanza el objetivo en este hardware")
+    print(f"\n✅ BCRYPT_ROUNDS={elegido}")
+    if elegido != BCRYPT_ROUNDS:
+        print(f"   (actual: {BCRYPT_ROUNDS}; los hashes se actualizarán al iniciar sesión cada usuario)")
+
+
+if __name__ == "__main__":
+    main()
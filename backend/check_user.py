@@ -3,6 +3,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database.mongodb import get_database
+from services.auth_service import stored_password_hash
 
 def check_user():
     try:
@@ -15,7 +16,7 @@ def check_user():
         if user:
             print(f"✅ Usuario encontrado: {user['username']}")
             print(f"📧 Email: {user.get('email', 'No definido')}")
-            print(f"🔒 Password hash: {user.get('password', 'No definido')[:30]}...")
+            print(f"🔒 Password hash: {(stored_password_hash(user) or 'No definido')[:30]}...")
             print(f"🔄 Needs reset: {user.get('password_needs_reset', False)}")
             print(f"📅 Temp password created: {user.get('temp_password_created', 'No definido')}")
             print(f"🔐 Account locked: {user.get('account_locked', False)}")
@@ -7,6 +7,7 @@ import os
 import sys
 from pymongo import MongoClient
 from dotenv import load_dotenv
+from routes.encuadernacion import ensure_encuadernacion_indexes
 
 # Cargar variables de entorno
 load_dotenv()
@@ -43,12 +44,14 @@ def main():
             print(f"✓ Colección '{MONGO_COLLECTION_ENCUADERNACION}' creada exitosamente")
             
             # Crear índices para optimizar las consultas
-            collection.create_index([("material", 1), ("tamano", 1)], unique=True)
-            collection.create_index("activo")
             print("✓ Índices creados exitosamente")
         
-        # Verificar el contenido de la colección
+        # Índice único solo sobre las encuadernaciones activas (reemplaza el índice único anterior)
         collection = db[MONGO_COLLECTION_ENCUADERNACION]
+        ensure_encuadernacion_indexes(collection)
+        print("✓ Índices verificados")
+        
+        # Verificar el contenido de la colección
         count = collection.count_documents({})
         print(f"✓ La colección tiene {count} documentos")
         
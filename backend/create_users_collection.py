@@ -8,6 +8,7 @@ from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.auth_service import AuthService
+from services.user_provisioning_service import UserProvisioningService
 
 # Cargar variables de entorno
 load_dotenv()
@@ -68,38 +69,23 @@ def create_users_collection():
         
         created_users = []
         
-        for user_data in default_users:
-            try:
-                # Verificar si el usuario ya existe
-                existing_user = auth_service.get_user_by_username(user_data["username"])
-                if existing_user:
-                    print(f"Usuario {user_data['username']} ya existe, saltando...")
-                    continue
-                
-                # Crear usuario
-                new_user = auth_service.create_user(
-                    username=user_data["username"],
-                    email=user_data["email"],
-                    password=user_data["password"],
-                    is_admin=user_data["is_admin"]
-                )
-                
-                created_users.append(user_data["username"])
-                print(f"✅ Usuario creado: {user_data['username']} ({user_data['email']})")
-                
-            except ValueError as e:
-                print(f"❌ Error creando usuario {user_data['username']}: {str(e)}")
-            except Exception as e:
-                print(f"❌ Error inesperado creando usuario {user_data['username']}: {str(e)}")
+        # Crear índices para optimizar consultas (y rechazar duplicados en el alta)
+        auth_service.ensure_indexes()
+        print("✅ Índices verificados")
         
-        # Crear índices para optimizar consultas
+        # Alta en un solo lote: una consulta de duplicados, hashes en paralelo y un insert_many
         try:
-            users_collection.create_index("username", unique=True)
-            users_collection.create_index("email", unique=True)
-            users_collection.create_index("reset_token")
-            print("✅ Índices creados correctamente")
+            resultado = UserProvisioningService(users_collection).provision(default_users)
+            for user_data, fila in zip(default_users, resultado["resultados"]):
+                if fila["status"] == "creado":
+                    created_users.append(user_data)
+                    print(f"✅ Usuario creado: {user_data['username']} ({user_data['email']})")
+                else:
+                    print(f"Usuario {user_data['username']}: {fila['error']}, saltando...")
         except Exception as e:
-            print(f"⚠️ Error creando índices: {str(e)}")
+            print(f"❌ Error inesperado creando usuarios: {str(e)}")
+        finally:
+            UserProvisioningService.shutdown()
         
         # Resumen
         total_users = users_collection.count_documents({})
@@ -112,9 +98,8 @@ def create_users_collection():
         
         if created_users:
             print(f"\n🔐 Credenciales por defecto:")
-            for i, username in enumerate(created_users):
-                password = default_users[i]["password"]
-                print(f"- {username}: {password}")
+            for user_data in created_users:
+                print(f"- {user_data['username']}: {user_data['password']}")
             print("\n⚠️ IMPORTANTE: Cambia estas contraseñas después del primer login")
         
         return True
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Servidor Resend falso para probar el envío de emails sin tocar la API real.
+
+Implementa POST /emails y POST /emails/batch con las mismas respuestas que
+Resend y guarda cada petición recibida. Para usarlo con el backend:
+
+    python fake_resend_server.py --port 8787
+    RESEND_API_URL=http://127.0.0.1:8787 python run.py
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeResendServer:
+    """
+    Servidor HTTP en un hilo que imita el API de Resend
+
+    Args:
+        port: Puerto (0 elige uno libre)
+        latency: Segundos de espera simulados por petición
+        fail_to: Destinatarios para los que el lote completo responde 422
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, fail_to=None):
+        self.latency = latency
+        self.fail_to = set(fail_to or [])
+        self.requests = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, body: dict):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"null")
+
+                with fake._lock:
+                    fake._in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake._in_flight)
+                    fake.requests.append({"path": self.path, "body": body})
+                try:
+                    if fake.latency:
+                        time.sleep(fake.latency)
+
+                    emails = body if self.path == "/emails/batch" else [body]
+                    if self.path not in ("/emails", "/emails/batch"):
+                        return self._reply(404, {"name": "not_found", "message": "Ruta no encontrada"})
+
+                    rejected = [to for email in emails for to in email.get("to", []) if to in fake.fail_to]
+                    if rejected:
+                        return self._reply(422, {
+                            "name": "validation_error",
+                            "message": f"Destinatario rechazado: {rejected[0]}",
+                            "statusCode": 422
+                        })
+
+                    ids = [{"id": str(uuid.uuid4())} for _ in emails]
+                    if self.path == "/emails":
+                        return self._reply(200, ids[0])
+                    return self._reply(200, {"data": ids})
+                finally:
+                    with fake._lock:
+                        fake._in_flight -= 1
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor Resend falso")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos de latencia simulada")
+    args = parser.parse_args()
+
+    server = FakeResendServer(port=args.port, latency=args.latency).start()
+    print(f"📭 Resend falso escuchando en {server.url} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
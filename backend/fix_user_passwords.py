@@ -1,11 +1,8 @@
 from pymongo import MongoClient
 import os
 from dotenv import load_dotenv
-from passlib.context import CryptContext
 from datetime import datetime
-
-# Configurar hashing de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from services.auth_service import AuthService, PASSWORD_FIELD, password_update
 
 load_dotenv()
 MONGO_URI = os.getenv('MONGO_URI')
@@ -17,7 +14,7 @@ db = client[MONGO_DB_NAME]
 collection = db[MONGO_COLLECTION_USERS]
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return AuthService.get_password_hash(password)
 
 # Actualizar contraseñas de admin1 y admin2
 users_to_update = [
@@ -35,16 +32,12 @@ for user_data in users_to_update:
     password_hash = hash_password(password)
     
     # Actualizar en la base de datos
-    result = collection.update_one(
-        {"username": username},
-        {
-            "$set": {
-                "password_hash": password_hash,
-                "updated_at": datetime.utcnow(),
-                "password_changed_at": datetime.utcnow()
-            }
-        }
-    )
+    update = password_update(password_hash)
+    update["$set"].update({
+        "updated_at": datetime.utcnow(),
+        "password_created_at": datetime.utcnow()
+    })
+    result = collection.update_one({"username": username}, update)
     
     if result.modified_count > 0:
         print(f"✅ Contraseña actualizada para {username}")
@@ -52,9 +45,9 @@ for user_data in users_to_update:
         print(f"❌ No se pudo actualizar la contraseña para {username}")
 
 print("\nVerificando usuarios actualizados:")
-users = list(collection.find({}, {'username': 1, 'email': 1, 'password_hash': 1}))
+users = list(collection.find({}, {'username': 1, 'email': 1, PASSWORD_FIELD: 1}))
 for user in users:
-    has_hash = "Sí" if user.get("password_hash") else "No"
+    has_hash = "Sí" if user.get(PASSWORD_FIELD) else "No"
     print(f"- {user.get('username')}: Hash de contraseña: {has_hash}")
 
 print("\n✅ Proceso completado. Ahora puedes usar:")
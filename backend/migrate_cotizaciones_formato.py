@@ -0,0 +1,129 @@
+"""
+Migración entre el formato expandido y el compacto de las cotizaciones.
+
+Uso (desde el directorio backend):
+    python migrate_cotizaciones_formato.py --reporte                 # solo comparar tamaños
+    python migrate_cotizaciones_formato.py --formato compacto        # migrar a compacto
+    python migrate_cotizaciones_formato.py --formato expandido       # volver al formato original
+
+Las cotizaciones que no se pueden compactar (leyes que ya no están en el
+catálogo o con otro grosor, volúmenes que no coinciden con los items) se
+dejan expandidas y se cuentan en el resumen. Para que las nuevas se guarden
+compactas, definir COTIZACIONES_FORMATO_COMPACTO=true en el entorno de la API.
+"""
+
+import argparse
+import os
+from typing import Dict, Iterable
+import bson
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from services.catalog_cache import CatalogCache
+from services.cotizacion_storage import CotizacionStorage
+
+load_dotenv()
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
+MONGO_COLLECTION_LEYES = os.getenv("MONGO_COLLECTION_LEYES", "leyes")
+MONGO_COLLECTION_COTIZACIONES = os.getenv("MONGO_COLLECTION_COTIZACIONES", "cotizaciones")
+MONGO_COLLECTION_COTIZACIONES_ARCHIVO = os.getenv("MONGO_COLLECTION_COTIZACIONES_ARCHIVO", "cotizaciones_archivo")
+
+CAMPOS_FORMATO = ("leyes_seleccionadas", "agrupamiento_volumenes")
+
+
+def size_report(collection: Collection, storage: CotizacionStorage, muestra: int) -> Dict:
+    """Tamaño BSON de cada cotización en ambos formatos (sobre una muestra)"""
+    expandido = compacto = total = no_compactables = 0
+    for doc in collection.find().limit(muestra):
+        expanded = storage.expand(doc)
+        compacted = storage.compact(expanded)
+        expandido += len(bson.encode(expanded))
+        if compacted is None:
+            no_compactables += 1
+            compacto += len(bson.encode(expanded))
+        else:
+            compacto += len(bson.encode(compacted))
+        total += 1
+
+    reporte = {
+        "coleccion": collection.name,
+        "documentos": total,
+        "no_compactables": no_compactables,
+        "bytes_expandido": expandido,
+        "bytes_compacto": compacto,
+        "promedio_expandido": round(expandido / total) if total else 0,
+        "promedio_compacto": round(compacto / total) if total else 0,
+        "ahorro_porcentaje": round(100 * (1 - compacto / expandido), 1) if expandido else 0.0,
+    }
+    try:
+        stats = collection.database.command("collStats", collection.name)
+        reporte["almacenamiento_actual"] = {key: stats.get(key) for key in ("count", "size", "avgObjSize", "storageSize")}
+    except Exception:
+        pass
+    return reporte
+
+
+def migrate(collection: Collection, storage: CotizacionStorage, formato: str, lote: int) -> Dict:
+    query = {"leyes_seleccionadas.ley_ids": {"$exists": formato == "expandido"}}
+    migradas = no_compactables = 0
+    ultimo_id = None
+    while True:
+        filtro = dict(query)
+        if ultimo_id is not None:
+            filtro["_id"] = {"$gt": ultimo_id}
+        docs = list(collection.find(filtro).sort("_id", 1).limit(lote))
+        if not docs:
+            break
+        ultimo_id = docs[-1]["_id"]
+
+        for doc in docs:
+            nuevo = storage.expand(doc) if formato == "expandido" else storage.compact(doc)
+            if nuevo is None:
+                no_compactables += 1
+                continue
+            collection.update_one({"_id": doc["_id"]}, {"$set": {campo: nuevo[campo] for campo in CAMPOS_FORMATO}})
+            migradas += 1
+        print(f"   {collection.name}: {migradas} migradas, {no_compactables} sin cambios")
+    return {"coleccion": collection.name, "migradas": migradas, "no_compactables": no_compactables}
+
+
+def print_report(reportes: Iterable[Dict]):
+    for r in reportes:
+        print(f"\n📊 {r['coleccion']} ({r['documentos']} cotizaciones de muestra)")
+        print(f"   Expandido: {r['bytes_expandido']:,} bytes ({r['promedio_expandido']:,} por documento)")
+        print(f"   Compacto:  {r['bytes_compacto']:,} bytes ({r['promedio_compacto']:,} por documento)")
+        print(f"   Ahorro:    {r['ahorro_porcentaje']}%  ({r['no_compactables']} no compactables)")
+        if "almacenamiento_actual" in r:
+            print(f"   Actual en Mongo: {r['almacenamiento_actual']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migración del formato de items de cotizaciones")
+    parser.add_argument("--formato", choices=["compacto", "expandido"], help="Formato destino")
+    parser.add_argument("--reporte", action="store_true", help="Comparar tamaños sin modificar nada")
+    parser.add_argument("--muestra", type=int, default=10000, help="Cotizaciones a medir en el reporte")
+    parser.add_argument("--lote", type=int, default=500, help="Cotizaciones por lote de migración")
+    parser.add_argument("--incluir-archivo", action="store_true", help="Incluir la colección de archivo")
+    args = parser.parse_args()
+    if not args.formato and not args.reporte:
+        parser.error("Indicar --formato o --reporte")
+
+    db = MongoClient(MONGO_URI)[MONGO_DB_NAME]
+    collections = [db[MONGO_COLLECTION_COTIZACIONES]]
+    if args.incluir_archivo:
+        collections.append(db[MONGO_COLLECTION_COTIZACIONES_ARCHIVO])
+    storage = CotizacionStorage(CatalogCache(db[MONGO_COLLECTION_LEYES]), collections)
+
+    print_report(size_report(collection, storage, args.muestra) for collection in collections)
+
+    if args.formato:
+        print(f"\n🔄 Migrando a formato {args.formato}...")
+        for collection in collections:
+            resultado = migrate(collection, storage, args.formato, args.lote)
+            print(f"✅ {resultado['coleccion']}: {resultado['migradas']} migradas, {resultado['no_compactables']} sin cambios")
+        print_report(size_report(collection, storage, args.muestra) for collection in collections)
+
+
+if __name__ == "__main__":
+    main()
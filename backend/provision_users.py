@@ -0,0 +1,104 @@
+"""
+Alta masiva de usuarios desde un CSV.
+
+Uso (desde el directorio backend):
+    python provision_users.py usuarios.csv
+    python provision_users.py usuarios.csv --admin --lote 500
+
+El CSV debe tener encabezados username, email y password (is_admin es
+opcional: true/false, 1/0, si/no; por defecto se crean usuarios normales,
+o administradores con --admin). Las filas sin contraseña reciben una
+contraseña temporal que se muestra al final y que debe cambiarse en el
+primer login. Las filas con error (datos inválidos, repetidas o ya
+registradas) se informan sin detener el resto del lote.
+"""
+
+import argparse
+import csv
+import os
+import sys
+from typing import Any, Dict, List
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from services.auth_service import AuthService
+from services.user_provisioning_service import UserProvisioningService, USUARIOS_LOTE_MAX
+
+load_dotenv()
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
+MONGO_COLLECTION_USERS = os.getenv("MONGO_COLLECTION_USERS", "users")
+
+VALORES_VERDADEROS = ("1", "true", "si", "sí", "yes", "y")
+
+
+def read_rows(path: str, is_admin_default: bool, auth_service: AuthService) -> List[Dict[str, Any]]:
+    """Filas del CSV en el formato de UserCreateSchema"""
+    rows = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for record in csv.DictReader(f):
+            row: Dict[str, Any] = {
+                "username": (record.get("username") or "").strip(),
+                "email": (record.get("email") or "").strip(),
+                "password": record.get("password") or "",
+                "is_admin": is_admin_default
+            }
+            if (record.get("is_admin") or "").strip():
+                row["is_admin"] = record["is_admin"].strip().lower() in VALORES_VERDADEROS
+            if not row["password"]:
+                row["password"] = auth_service.generate_temporary_password()
+                row["temporal"] = True
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alta masiva de usuarios desde un CSV")
+    parser.add_argument("archivo", help="CSV con username, email, password e is_admin (opcional)")
+    parser.add_argument("--admin", action="store_true", help="Crear como administradores si el CSV no indica is_admin")
+    parser.add_argument("--lote", type=int, default=USUARIOS_LOTE_MAX, help="Usuarios por lote")
+    args = parser.parse_args()
+
+    if not MONGO_URI or not MONGO_DB_NAME:
+        print("Error: MONGO_URI y MONGO_DB_NAME deben estar configurados en .env")
+        sys.exit(1)
+
+    users_collection = MongoClient(MONGO_URI)[MONGO_DB_NAME][MONGO_COLLECTION_USERS]
+    auth_service = AuthService(users_collection)
+    auth_service.ensure_indexes()
+    service = UserProvisioningService(users_collection)
+
+    rows = read_rows(args.archivo, args.admin, auth_service)
+    print(f"🚀 {len(rows)} filas leídas de {args.archivo}")
+
+    creados = errores = 0
+    temporales = []
+    try:
+        lote = max(1, min(args.lote, USUARIOS_LOTE_MAX))
+        for inicio in range(0, len(rows), lote):
+            filas = rows[inicio:inicio + lote]
+            resultado = service.provision(filas)
+            creados += resultado["creados"]
+            errores += resultado["errores"]
+            for row, fila in zip(filas, resultado["resultados"]):
+                numero = inicio + fila["fila"]
+                if fila["status"] == "creado":
+                    print(f"✅ Fila {numero}: {fila['username']}")
+                    if row.get("temporal"):
+                        temporales.append((fila["username"], row["password"]))
+                else:
+                    print(f"❌ Fila {numero}: {fila['username'] or '-'} - {fila['error']}")
+    finally:
+        UserProvisioningService.shutdown()
+
+    print(f"\n📊 Resumen: {creados} creados, {errores} con error")
+    if temporales:
+        print("\n🔐 Contraseñas temporales:")
+        for username, password in temporales:
+            print(f"- {username}: {password}")
+        print("\n⚠️ IMPORTANTE: Cambia estas contraseñas después del primer login")
+    if errores:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
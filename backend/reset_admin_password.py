@@ -1,9 +1,9 @@
 import os
 import sys
-import bcrypt
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database.mongodb import get_database
+from services.auth_service import AuthService, PASSWORD_FIELD, password_update
 
 def reset_admin_password():
     try:
@@ -20,23 +20,16 @@ def reset_admin_password():
             print(f"✅ Usuario encontrado: {user['username']}")
             
             # Generar hash de la nueva contraseña temporal
-            new_hash = bcrypt.hashpw(temp_pass.encode('utf-8'), bcrypt.gensalt())
+            update = password_update(AuthService.get_password_hash(temp_pass))
             
             # Actualizar usuario con nueva contraseña y resetear intentos fallidos
-            result = users.update_one(
-                {'_id': user['_id']}, 
-                {
-                    '$set': {
-                        'password': new_hash.decode('utf-8'),
-                        'failed_login_attempts': 0,
-                        'password_needs_reset': True,
-                        'account_locked': False
-                    },
-                    '$unset': {
-                        'locked_until': ""
-                    }
-                }
-            )
+            update['$set'].update({
+                'failed_login_attempts': 0,
+                'password_needs_reset': True,
+                'account_locked': False
+            })
+            update['$unset']['locked_until'] = ""
+            result = users.update_one({'_id': user['_id']}, update)
             
             print(f"✅ Usuario actualizado. Modified count: {result.modified_count}")
             print(f"🔑 Nueva contraseña temporal: {temp_pass}")
@@ -44,8 +37,7 @@ def reset_admin_password():
             
             # Verificar que funciona
             updated_user = users.find_one({'username': 'admin1'})
-            stored_hash = updated_user.get('password')
-            verification = bcrypt.checkpw(temp_pass.encode('utf-8'), stored_hash.encode('utf-8'))
+            verification = AuthService.verify_password(temp_pass, updated_user.get(PASSWORD_FIELD))
             print(f"✅ Verificación de contraseña: {verification}")
             
         else:
@@ -1,21 +1,48 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pymongo.collection import Collection
-from typing import List
+from typing import Optional
 from datetime import timedelta
-from services.auth_service import AuthService
-from schemas.user_schemas import UserLoginSchema, UserCreateSchema, UserResponseSchema, PasswordResetRequestSchema, PasswordResetSchema, PasswordChangeSchema, TokenSchema
+from services.auth_service import AuthService, USUARIOS_POR_PAGINA, USUARIOS_MAX_POR_PAGINA
+from services.single_flight import SingleFlight
+from services.user_provisioning_service import UserProvisioningService
+from schemas.user_schemas import UserLoginSchema, UserCreateSchema, UserResponseSchema, PasswordResetRequestSchema, PasswordResetSchema, PasswordChangeSchema, TokenSchema, UserPageSchema, UserBulkCreateSchema
 
 security = HTTPBearer()
 
-def get_auth_routes(users_collection: Collection) -> APIRouter:
+def get_admin_dependency(auth_service: AuthService):
+    """Dependency para otros routers: exige un usuario activo con is_admin"""
+    async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
+        user = await asyncio.to_thread(auth_service.get_current_user_from_token, credentials.credentials)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido o expirado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if not user.get("is_active"):
+            raise HTTPException(status_code=400, detail="Usuario inactivo")
+        if not user.get("is_admin"):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo los administradores pueden realizar esta acción")
+        return user
+    return get_current_admin
+
+def get_auth_routes(
+    users_collection: Collection,
+    recipients_collection: Optional[Collection] = None,
+    auth_service: Optional[AuthService] = None
+) -> APIRouter:
     router = APIRouter(prefix="/auth", tags=["authentication"])
-    auth_service = AuthService(users_collection)
+    auth_service = auth_service or AuthService(users_collection, recipients_collection)
+    provisioning_service = UserProvisioningService(users_collection)
+    # Peticiones simultáneas con el mismo token cargan el usuario una sola vez
+    principal_flight = SingleFlight()
 
     async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
         """Dependency para obtener el usuario actual desde el token"""
         token = credentials.credentials
-        user = auth_service.get_current_user_from_token(token)
+        user = await principal_flight.do(token, auth_service.get_current_user_from_token, token)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -122,6 +149,38 @@ def get_auth_routes(users_collection: Collection) -> APIRouter:
                 detail=f"Error al crear usuario: {str(e)}"
             )
 
+    @router.post("/users/bulk")
+    async def bulk_register(request: UserBulkCreateSchema, current_user: dict = Depends(get_current_active_user)):
+        """
+        Alta masiva de usuarios (solo admins)
+
+        Cada fila se valida como en /register; las que fallan (datos
+        inválidos, repetidas o ya registradas) se informan sin impedir que se
+        creen las demás.
+        """
+        try:
+            if not current_user.get("is_admin"):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Solo los administradores pueden crear usuarios"
+                )
+
+            # Los hashes se calculan en un pool de procesos; la espera no bloquea el event loop
+            return await asyncio.to_thread(provisioning_service.provision, request.usuarios)
+
+        except HTTPException:
+            raise
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al crear usuarios: {str(e)}"
+            )
+
     @router.get("/me", response_model=UserResponseSchema)
     async def get_current_user_info(current_user: dict = Depends(get_current_active_user)):
         """Obtener información del usuario actual"""
@@ -216,9 +275,14 @@ def get_auth_routes(users_collection: Collection) -> APIRouter:
                 detail=f"Error al cambiar contraseña: {str(e)}"
             )
 
-    @router.get("/users", response_model=List[UserResponseSchema])
-    async def get_all_users(current_user: dict = Depends(get_current_active_user)):
-        """Obtener todos los usuarios (solo admins)"""
+    @router.get("/users", response_model=UserPageSchema)
+    async def get_all_users(
+        buscar: Optional[str] = Query(None, description="Prefijo de username o email"),
+        pagina: int = Query(1, ge=1),
+        limite: int = Query(USUARIOS_POR_PAGINA, ge=1, le=USUARIOS_MAX_POR_PAGINA),
+        current_user: dict = Depends(get_current_active_user)
+    ):
+        """Obtener una página de usuarios, opcionalmente filtrada por prefijo (solo admins)"""
         try:
             if not current_user.get("is_admin"):
                 raise HTTPException(
@@ -226,12 +290,9 @@ def get_auth_routes(users_collection: Collection) -> APIRouter:
                     detail="Solo los administradores pueden ver todos los usuarios"
                 )
             
-            users = list(users_collection.find())
-            user_responses = []
-            
-            for user in users:
-                password_needs_reset = auth_service.is_password_expired(user)
-                user_responses.append(UserResponseSchema(
+            users, total = auth_service.list_users(buscar, pagina, limite)
+            user_responses = [
+                UserResponseSchema(
                     _id=str(user["_id"]),
                     username=user["username"],
                     email=user["email"],
@@ -239,10 +300,18 @@ def get_auth_routes(users_collection: Collection) -> APIRouter:
                     is_admin=user["is_admin"],
                     created_at=user["created_at"],
                     last_login=user.get("last_login"),
-                    password_needs_reset=password_needs_reset
-                ))
-            
-            return user_responses
+                    password_needs_reset=user["password_needs_reset"]
+                )
+                for user in users
+            ]
+            
+            return UserPageSchema(
+                usuarios=user_responses,
+                total=total,
+                pagina=pagina,
+                limite=limite,
+                hay_mas=pagina * limite < total
+            )
             
         except HTTPException:
             raise
@@ -0,0 +1,38 @@
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Response, status
+
+from services.bootstrap_service import BootstrapService, BOOTSTRAP_MAX_AGE
+from services.single_flight import SingleFlight
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
+
+
+def get_bootstrap_routes(bootstrap_service: BootstrapService) -> APIRouter:
+    router = APIRouter()
+    bootstrap_flight = SingleFlight()
+    cache_control = f"public, max-age={BOOTSTRAP_MAX_AGE}" if BOOTSTRAP_MAX_AGE > 0 else "no-cache"
+
+    @router.get("/bootstrap")
+    async def get_bootstrap(if_none_match: Optional[str] = Header(None, alias="If-None-Match")):
+        """
+        Catálogo de leyes, encuadernaciones activas y planes de pago en una sola respuesta.
+        Con `If-None-Match` igual al ETag devuelve 304 sin cuerpo.
+        """
+        try:
+            cached = bootstrap_service.cached()
+            if cached is None:
+                cached = await bootstrap_flight.do("bootstrap", bootstrap_service.refresh)
+            etag, body = cached
+            headers = {"ETag": etag, "Cache-Control": cache_control}
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            return Response(content=body, media_type="application/json", headers=headers)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener datos iniciales: {str(e)}")
+
+    return router
@@ -1,15 +1,55 @@
-from typing import List
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import List, Optional
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, HTTPException, status, BackgroundTasks, Request, Query, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from pydantic import BaseModel
 from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
 
 from schemas.cotizacionesLegales_schemas import CotizacionLegalSchema, LeySchema
 from services.telegram_service import TelegramService
+from services.email_service import EmailService
+from services.cotizaciones_stream import CotizacionesChangeFeed
+from services.sync_service import SyncService
+from services.archive_service import ArchiveService
+from services.idempotency_service import IdempotencyService, IdempotencyConflict
+from services.cotizacion_storage import CotizacionStorage
+from services.price_history_service import PriceHistoryService, TIPO_LEY, PRECIOS_VALIDAR
+from services.repricing_service import RepricingService, REPRECIO_AUTOMATICO
+from services.pdf_service import PdfService
+from services.payment_plan_service import PaymentPlanService, PLANES_PAGO_VALIDAR
+from services.invalidation_bus import InvalidationBus, CANAL_LEYES, CANAL_COTIZACIONES
+from services.document_cache import DocumentCache
+from services.single_flight import SingleFlight
+from services.group_commit_writer import GroupCommitWriter
+
+# Estados posibles de una cotización
+ESTADOS_COTIZACION = ["pendiente", "entregado"]
+# Cotizaciones por petición de cambio de estado masivo
+ESTADO_MASIVO_MAX = int(os.getenv("ESTADO_MASIVO_MAX", "5000"))
 
 class EstadoUpdate(BaseModel):
     estado: str
 
+class FiltroEstadoMasivo(BaseModel):
+    estado_actual: Optional[str] = None
+    fecha_desde: Optional[datetime] = None
+    fecha_hasta: Optional[datetime] = None
+    cliente_email: Optional[str] = None
+
+class EstadoMasivoRequest(BaseModel):
+    estado: str
+    ids: Optional[List[str]] = None
+    filtro: Optional[FiltroEstadoMasivo] = None
+
+class ReenvioEmailRequest(BaseModel):
+    ids: List[str]
+
 def serialize_datetime(obj):
     """Función auxiliar para serializar objetos datetime a string ISO format"""
     from datetime import datetime
@@ -17,25 +57,89 @@ def serialize_datetime(obj):
         return obj.isoformat()
     raise TypeError(f"Tipo {type(obj)} no es serializable")
 
-async def send_telegram_notification(cotizacion_data: dict) -> bool:
+async def send_telegram_notification(cotizacion_data: dict, recipients_collection: Optional[Collection] = None) -> bool:
     """
     Envía una notificación directamente a Telegram cuando se crea una nueva cotización.
     
     Args:
         cotizacion_data: Diccionario con los datos de la cotización
+        recipients_collection: Registro de destinatarios (None = chat por defecto)
         
     Returns:
         bool: True si la notificación se envió correctamente, False en caso contrario
     """
     try:
-        telegram_service = TelegramService()
-        return telegram_service.send_cotizacion_notification(cotizacion_data)
+        telegram_service = TelegramService(recipients_collection)
+        # requests es bloqueante (y puede esperar un retry_after): ejecutarlo fuera del event loop
+        return await asyncio.to_thread(telegram_service.send_cotizacion_notification, cotizacion_data)
     except Exception as e:
         print(f" Error enviando notificación a Telegram: {str(e)}")
         return False
 
-def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection) -> APIRouter:
+def cotizacion_to_email_data(cotizacion: dict) -> dict:
+    """Adapta un documento de cotización al formato que espera EmailService.build_quotation_email"""
+    agrupamiento = cotizacion.get("agrupamiento_volumenes", {})
+    costo_encuadernacion = agrupamiento.get("costo_encuadernacion", {})
+    tipo = costo_encuadernacion.get("tipo_encuadernacion") or {}
+    opcion_pago = cotizacion.get("opcion_pago", {})
+    fecha = cotizacion.get("fecha", {})
+
+    return {
+        "clientName": cotizacion.get("cliente", {}).get("nombre", "Cliente"),
+        "clientEmail": cotizacion.get("cliente", {}).get("email", ""),
+        "selectedLaws": [
+            {"name": item.get("nombre"), "price": item.get("precio", 0)}
+            for item in cotizacion.get("leyes_seleccionadas", {}).get("items", [])
+        ],
+        "encuadernacion": {
+            "type": f"{tipo.get('material', '')} {tipo.get('tamano', '')}".strip() or "No especificado",
+            "cost": costo_encuadernacion.get("total", 0)
+        } if costo_encuadernacion else {},
+        "totalCost": cotizacion.get("resumen_costo", {}).get("total", 0),
+        "paymentOption": f"{opcion_pago.get('tipo', '')} - {opcion_pago.get('cantidad_cuotas', 1)} cuota(s) de ${opcion_pago.get('valor_cuota', 0)}",
+        "createdAt": fecha.get("fecha_completa", "")
+    }
+
+def get_routes(
+    collection_leyes: Collection,
+    collection_cotizaciones: Collection,
+    *,
+    sync_service: SyncService,
+    archive_service: ArchiveService,
+    idempotency_service: IdempotencyService,
+    cotizacion_storage: CotizacionStorage,
+    price_history_service: PriceHistoryService,
+    repricing_service: RepricingService,
+    pdf_service: PdfService,
+    payment_plan_service: PaymentPlanService,
+    invalidation_bus: InvalidationBus,
+    cotizaciones_cache: DocumentCache,
+    leyes_cache: DocumentCache,
+    collection_destinatarios: Optional[Collection] = None,
+    cotizacion_writer: Optional[GroupCommitWriter] = None,
+    collection_encuadernacion: Optional[Collection] = None
+) -> APIRouter:
     router = APIRouter()
+    # Peticiones simultáneas del catálogo comparten una sola consulta
+    catalog_flight = SingleFlight()
+    cotizaciones_feed = CotizacionesChangeFeed(
+        collection_cotizaciones,
+        sync_service,
+        decode=cotizacion_storage.expand,
+        archive_collection=archive_service.archive_collection
+    )
+
+    def validate_prices(cotizacion: CotizacionLegalSchema) -> Optional[str]:
+        data = cotizacion.model_dump(by_alias=True)
+        tipo = cotizacion.agrupamiento_volumenes.costo_encuadernacion.tipo_encuadernacion
+        encuadernacion = None
+        if tipo and collection_encuadernacion is not None:
+            encuadernacion = collection_encuadernacion.find_one({"material": tipo.material, "tamano": tipo.tamano, "activo": True}, {"_id": 1})
+        return price_history_service.validate_prices(
+            data,
+            cotizacion_storage.ley_ids(data),
+            encuadernacion["_id"] if encuadernacion else None
+        )
 
     @router.post("/test-telegram", status_code=status.HTTP_200_OK)
     async def test_telegram():
@@ -73,28 +177,109 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
     # --- Cotizaciones ---
 
     @router.get("/cotizaciones", response_model=List[CotizacionLegalSchema])
-    async def get_all_cotizaciones():
+    async def get_all_cotizaciones(incluir_archivadas: bool = Query(False, description="Incluir cotizaciones entregadas ya archivadas")):
         try:
             cotizaciones = []
-            for doc in collection_cotizaciones.find():
-                if "_id" in doc:
-                    doc["_id"] = str(doc["_id"])
-                cotizaciones.append(CotizacionLegalSchema(**doc))
+            for doc in archive_service.find(incluir_archivadas=incluir_archivadas):
+                cotizaciones.append(CotizacionLegalSchema(**cotizacion_storage.expand(doc)))
             return cotizaciones
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al obtener cotizaciones: {str(e)}")
 
+    @router.get("/cotizaciones/stream")
+    async def stream_cotizaciones(request: Request):
+        """
+        Server-Sent Events con los cambios de cotizaciones (inserciones, cambios de estado y borrados).
+        Los dashboards cargan la lista una vez y luego aplican estos deltas.
+        """
+        queue = cotizaciones_feed.subscribe()
+
+        async def event_stream():
+            try:
+                # Reintento de reconexión del EventSource (ms)
+                yield "retry: 3000\n\n"
+                while True:
+                    if await request.is_disconnected():
+                        break
+                    try:
+                        delta = await asyncio.wait_for(queue.get(), timeout=15)
+                    except asyncio.TimeoutError:
+                        # Mantener viva la conexión a través de proxies
+                        yield ": ping\n\n"
+                        continue
+                    yield f"event: cotizacion\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
+            finally:
+                cotizaciones_feed.unsubscribe(queue)
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    @router.post("/cotizaciones/enviar-email")
+    async def reenviar_cotizaciones_email(request: ReenvioEmailRequest):
+        """Reenvía por email varias cotizaciones a sus clientes usando el API batch de Resend"""
+        invalid_ids = [id for id in request.ids if not ObjectId.is_valid(id)]
+        if invalid_ids:
+            raise HTTPException(status_code=400, detail=f"IDs inválidos: {', '.join(invalid_ids)}")
+
+        try:
+            object_ids = [ObjectId(id) for id in request.ids]
+            cotizaciones = {
+                str(doc["_id"]): doc
+                for doc in collection_cotizaciones.find({"_id": {"$in": object_ids}})
+            }
+
+            recipients = []
+            resultados = []
+            for id in request.ids:
+                cotizacion = cotizaciones.get(id)
+                if not cotizacion:
+                    resultados.append({"id": id, "to": None, "status": "no_encontrada", "error": "Cotización no encontrada"})
+                    continue
+                recipients.append((cotizacion["cliente"]["email"], cotizacion_to_email_data(cotizacion_storage.expand(cotizacion))))
+                resultados.append({"id": id})
+
+            envios = iter(await EmailService.send_quotation_emails(recipients))
+            for resultado in resultados:
+                if "status" not in resultado:
+                    resultado.update(next(envios))
+
+            return {
+                "enviados": sum(1 for r in resultados if r["status"] == "enviado"),
+                "total": len(resultados),
+                "resultados": resultados
+            }
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al reenviar cotizaciones: {str(e)}")
+
+    @router.post("/cotizaciones/archivar")
+    async def archivar_cotizaciones():
+        """Ejecuta ahora el archivo de cotizaciones entregadas (mismo job que el programado)"""
+        try:
+            return await asyncio.to_thread(archive_service.run)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al archivar cotizaciones: {str(e)}")
+
     @router.get("/cotizaciones/{id}", response_model=CotizacionLegalSchema)
     async def get_one_cotizacion(id: str):
         try:
             if not ObjectId.is_valid(id):
                 raise HTTPException(status_code=400, detail="ID inválido")
             
-            cotizacion_doc = collection_cotizaciones.find_one({"_id": ObjectId(id)})
-            if not cotizacion_doc:
-                raise HTTPException(status_code=404, detail="Cotización no encontrada")
-            
-            return CotizacionLegalSchema(**cotizacion_doc)
+            body = cotizaciones_cache.get(id)
+            if body is None:
+                generation = cotizaciones_cache.generation
+                cotizacion_doc = archive_service.find_one(ObjectId(id))
+                if not cotizacion_doc:
+                    raise HTTPException(status_code=404, detail="Cotización no encontrada")
+
+                body = CotizacionLegalSchema(**cotizacion_storage.expand(cotizacion_doc)).model_dump_json(by_alias=True).encode("utf-8")
+                cotizaciones_cache.put(id, body, generation)
+            return Response(content=body, media_type="application/json")
         except HTTPException:
             raise
         except Exception as e:
@@ -107,8 +292,12 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
                 raise HTTPException(status_code=400, detail="ID inválido")
             
             result = collection_cotizaciones.delete_one({"_id": ObjectId(id)})
-            if result.deleted_count == 0:
+            if result.deleted_count == 0 and not archive_service.delete_archived(ObjectId(id)):
                 raise HTTPException(status_code=404, detail="Cotización no encontrada")
+            # También para las archivadas: los clientes de /sync pueden tenerlas de antes del archivo
+            sync_service.record_delete("cotizaciones", id)
+            pdf_service.invalidate(id)
+            invalidation_bus.publish(CANAL_COTIZACIONES, id)
             return
         except HTTPException:
             raise
@@ -127,14 +316,118 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
             raise HTTPException(status_code=404, detail="Cotización no encontrada")
 
         # Actualizar los datos
-        updated_data = cotizacion.model_dump(by_alias=True, exclude_none=True)
+        updated_data = cotizacion_storage.for_write(cotizacion.model_dump(by_alias=True, exclude_none=True))
+        updated_data.update(sync_service.stamp())
         collection_cotizaciones.update_one({"_id": ObjectId(id)}, {"$set": updated_data})
+        pdf_service.invalidate(id)
+        invalidation_bus.publish(CANAL_COTIZACIONES, id)
 
         # Devolver la cotización actualizada
         updated_doc = collection_cotizaciones.find_one({"_id": ObjectId(id)})
-        if updated_doc and "_id" in updated_doc:
-            updated_doc["_id"] = str(updated_doc["_id"])
-        return CotizacionLegalSchema(**updated_doc)
+        return CotizacionLegalSchema(**cotizacion_storage.expand(updated_doc))
+
+    @router.patch("/cotizaciones/estado")
+    async def update_cotizaciones_estado(request: EstadoMasivoRequest):
+        """
+        Cambia el estado de varias cotizaciones con una sola escritura
+
+        Recibe una lista de `ids` o un `filtro` con al menos un criterio
+        (estado actual, rango de `fecha_creacion` y email del cliente); el
+        filtro solo selecciona las que aún no tienen el estado pedido, así que
+        repetir la llamada mientras `hay_mas` sea true recorre todas. Al pasar
+        a "entregado" todas reciben la misma `fecha_entrega`. Devuelve el
+        resultado de cada id según lo que modificó la escritura.
+        """
+        if request.estado not in ESTADOS_COTIZACION:
+            raise HTTPException(status_code=400, detail="Estado inválido. Debe ser 'pendiente' o 'entregado'")
+        if (request.ids is None) == (request.filtro is None):
+            raise HTTPException(status_code=400, detail="Indique 'ids' o 'filtro' (solo uno de los dos)")
+
+        if request.filtro is not None and not request.filtro.model_dump(exclude_none=True):
+            raise HTTPException(status_code=400, detail="El filtro debe indicar al menos un criterio")
+
+        if request.ids is not None:
+            invalid_ids = [id for id in request.ids if not ObjectId.is_valid(id)]
+            if invalid_ids:
+                raise HTTPException(status_code=400, detail=f"IDs inválidos: {', '.join(invalid_ids)}")
+            if len(request.ids) > ESTADO_MASIVO_MAX:
+                raise HTTPException(status_code=400, detail=f"Máximo {ESTADO_MASIVO_MAX} cotizaciones por petición")
+
+        try:
+            hay_mas = False
+            if request.ids is not None:
+                # Ids únicos conservando el orden de la petición
+                ids = list(dict.fromkeys(request.ids))
+                actuales = {
+                    str(doc["_id"]): doc.get("estado")
+                    for doc in collection_cotizaciones.find({"_id": {"$in": [ObjectId(id) for id in ids]}}, {"estado": 1})
+                }
+            else:
+                filtro = request.filtro
+                # Solo las que aún no tienen el estado pedido: las ya cambiadas no deben ocupar la ventana de ESTADO_MASIVO_MAX
+                query = {"estado": {"$ne": request.estado}}
+                if filtro.estado_actual is not None:
+                    query["estado"]["$eq"] = filtro.estado_actual
+                if filtro.fecha_desde is not None or filtro.fecha_hasta is not None:
+                    query["fecha_creacion"] = {}
+                    if filtro.fecha_desde is not None:
+                        query["fecha_creacion"]["$gte"] = filtro.fecha_desde
+                    if filtro.fecha_hasta is not None:
+                        query["fecha_creacion"]["$lte"] = filtro.fecha_hasta
+                if filtro.cliente_email is not None:
+                    query["cliente.email"] = filtro.cliente_email
+                docs = list(collection_cotizaciones.find(query, {"estado": 1}).sort("_id", 1).limit(ESTADO_MASIVO_MAX + 1))
+                hay_mas = len(docs) > ESTADO_MASIVO_MAX
+                actuales = {str(doc["_id"]): doc.get("estado") for doc in docs[:ESTADO_MASIVO_MAX]}
+                ids = list(actuales)
+
+            pendientes = [id for id in ids if id in actuales and actuales[id] != request.estado]
+            update_data = {"estado": request.estado}
+            if request.estado == "entregado":
+                update_data["fecha_entrega"] = datetime.now()
+
+            actualizadas = 0
+            modificadas = set()
+            if pendientes:
+                # Una sola escritura y una sola versión de sincronización para todo el lote
+                update_data.update(sync_service.stamp())
+                object_ids = [ObjectId(id) for id in pendientes]
+                result = collection_cotizaciones.update_many(
+                    {"_id": {"$in": object_ids}, "estado": {"$ne": request.estado}},
+                    {"$set": update_data}
+                )
+                actualizadas = result.modified_count
+                # Las que esta escritura modificó llevan su versión (otra petición pudo cambiar o borrar alguna entre medias)
+                despues = {
+                    str(doc["_id"]): doc.get("sync_version")
+                    for doc in collection_cotizaciones.find({"_id": {"$in": object_ids}}, {"sync_version": 1})
+                }
+                modificadas = {id for id, version in despues.items() if version == update_data["sync_version"]}
+                actuales = {id: estado for id, estado in actuales.items() if id not in pendientes or id in despues}
+                pdf_service.invalidate_many(pendientes)
+                invalidation_bus.publish(CANAL_COTIZACIONES)
+
+            resultados = []
+            for id in ids:
+                if id not in actuales:
+                    resultados.append({"id": id, "status": "no_encontrada"})
+                elif id in modificadas:
+                    resultados.append({"id": id, "status": "actualizada"})
+                else:
+                    resultados.append({"id": id, "status": "sin_cambios"})
+
+            return {
+                "estado": request.estado,
+                "fecha_entrega": update_data.get("fecha_entrega"),
+                "actualizadas": actualizadas,
+                "total": len(resultados),
+                "hay_mas": hay_mas,
+                "resultados": resultados
+            }
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al actualizar estados: {str(e)}")
 
     @router.patch("/cotizaciones/{id}/estado", response_model=CotizacionLegalSchema)
     async def update_cotizacion_estado(id: str, estado_data: dict):
@@ -145,7 +438,7 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
             estado = estado_data.get("estado")
             
             # Verificar que el estado sea válido
-            if estado not in ["pendiente", "entregado"]:
+            if estado not in ESTADOS_COTIZACION:
                 raise HTTPException(status_code=400, detail="Estado inválido. Debe ser 'pendiente' o 'entregado'")
             
             # Buscar la cotización existente
@@ -154,11 +447,10 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
                 raise HTTPException(status_code=404, detail="Cotización no encontrada")
             
             # Preparar los datos a actualizar
-            update_data = {"estado": estado}
+            update_data = {"estado": estado, **sync_service.stamp()}
             
             # Si el estado es 'entregado', actualizar la fecha de entrega
             if estado == "entregado":
-                from datetime import datetime
                 update_data["fecha_entrega"] = datetime.now()
             
             # Actualizar el documento
@@ -169,12 +461,12 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
             
             if result.modified_count == 0:
                 raise HTTPException(status_code=400, detail="No se pudo actualizar el estado")
+            pdf_service.invalidate(id)
+            invalidation_bus.publish(CANAL_COTIZACIONES, id)
             
             # Devolver la cotización actualizada
             updated_doc = collection_cotizaciones.find_one({"_id": ObjectId(id)})
-            if updated_doc and "_id" in updated_doc:
-                updated_doc["_id"] = str(updated_doc["_id"])
-            return CotizacionLegalSchema(**updated_doc)
+            return CotizacionLegalSchema(**cotizacion_storage.expand(updated_doc))
             
         except HTTPException:
             raise
@@ -182,47 +474,119 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
             raise HTTPException(status_code=500, detail=f"Error al actualizar estado: {str(e)}")
 
     @router.post("/cotizaciones", response_model=CotizacionLegalSchema, status_code=status.HTTP_201_CREATED)
-    async def create_cotizacion(cotizacion: CotizacionLegalSchema, background_tasks: BackgroundTasks):
+    async def create_cotizacion(
+        cotizacion: CotizacionLegalSchema,
+        background_tasks: BackgroundTasks,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+    ):
+        """
+        Crea una cotización. Con la cabecera `Idempotency-Key`, los reintentos
+        con la misma clave devuelven la respuesta original sin crear otra
+        cotización ni repetir la notificación.
+        """
+        if PLANES_PAGO_VALIDAR:
+            error = payment_plan_service.validate(cotizacion.opcion_pago.model_dump(), cotizacion.resumen_costo.total)
+            if error:
+                raise HTTPException(status_code=400, detail=error)
+
+        request_hash = None
+        cotizacion_id = ObjectId()
+        if idempotency_key is not None:
+            request_hash = IdempotencyService.request_hash(cotizacion.model_dump(mode="json", by_alias=True))
+            try:
+                cached, recurso_id = idempotency_service.begin("POST /cotizaciones", idempotency_key, request_hash, str(cotizacion_id))
+            except IdempotencyConflict as e:
+                raise HTTPException(status_code=e.status_code, detail=e.detail)
+            if cached:
+                status_code, body = cached
+                return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+            # Si se retomó la clave de una petición caída, crear (o recuperar) su misma cotización
+            cotizacion_id = ObjectId(recurso_id)
+
+        creada = False
         try:
+            if PRECIOS_VALIDAR:
+                # Precios vigentes según el historial (después de la repetición idempotente:
+                # un reintento tras un cambio de precio devuelve la cotización original)
+                error = validate_prices(cotizacion)
+                if error:
+                    raise HTTPException(status_code=400, detail=error)
+
             # Convertir el modelo Pydantic a diccionario
-            cotizacion_dict = cotizacion.model_dump(by_alias=True, exclude_none=True)
-            
-            # Insertar la cotización en la base de datos
-            result = collection_cotizaciones.insert_one(cotizacion_dict)
-            created_cotizacion = collection_cotizaciones.find_one({"_id": result.inserted_id})
-            
+            cotizacion_dict = cotizacion_storage.for_write(cotizacion.model_dump(by_alias=True, exclude_none=True))
+            cotizacion_dict["_id"] = cotizacion_id
+
+            recuperada = False
+            try:
+                if cotizacion_writer is not None:
+                    # Inserción agrupada con las demás peticiones simultáneas (sin volver a leer el documento)
+                    created_cotizacion = await cotizacion_writer.insert(cotizacion_dict)
+                else:
+                    cotizacion_dict.update(sync_service.stamp())
+
+                    # Insertar la cotización en la base de datos
+                    result = collection_cotizaciones.insert_one(cotizacion_dict)
+                    created_cotizacion = collection_cotizaciones.find_one({"_id": result.inserted_id})
+            except DuplicateKeyError:
+                if idempotency_key is None:
+                    raise
+                # La petición original (con la misma clave) ya la creó antes de caerse
+                created_cotizacion = collection_cotizaciones.find_one({"_id": cotizacion_id})
+                recuperada = True
+            creada = created_cotizacion is not None
+
             if created_cotizacion:
-                # Convertir ObjectId a string para el JSON
-                created_cotizacion["_id"] = str(created_cotizacion["_id"])
-                
-                # Crear copia del diccionario para evitar modificar el original
-                notification_data = created_cotizacion.copy()
-                
-                # Asegurarse de que los ObjectId se conviertan a string
-                if "_id" in notification_data and isinstance(notification_data["_id"], ObjectId):
-                    notification_data["_id"] = str(notification_data["_id"])
-                
-                # Enviar notificación directamente a Telegram en segundo plano
-                background_tasks.add_task(
-                    send_telegram_notification,
-                    notification_data
-                )
+                created_cotizacion = cotizacion_storage.expand(created_cotizacion)
+
+                if not recuperada:
+                    # Crear copia del diccionario para evitar modificar el original
+                    notification_data = created_cotizacion.copy()
+
+                    # Asegurarse de que los ObjectId se conviertan a string
+                    if "_id" in notification_data and isinstance(notification_data["_id"], ObjectId):
+                        notification_data["_id"] = str(notification_data["_id"])
+
+                    # Enviar notificación directamente a Telegram en segundo plano
+                    background_tasks.add_task(
+                        send_telegram_notification,
+                        notification_data,
+                        collection_destinatarios
+                    )
                 
-                return CotizacionLegalSchema(**created_cotizacion)
+                response = CotizacionLegalSchema(**created_cotizacion)
+                if idempotency_key is None:
+                    return response
+
+                body = jsonable_encoder(response, by_alias=True)
+                try:
+                    idempotency_service.complete("POST /cotizaciones", idempotency_key, request_hash, status.HTTP_201_CREATED, body)
+                except Exception as e:
+                    # La cotización ya existe: no liberar la clave. Un reintento tras el lease la recupera por su id
+                    print(f"⚠️ Error guardando la respuesta idempotente de la cotización {cotizacion_id}: {str(e)}")
+                return JSONResponse(status_code=status.HTTP_201_CREATED, content=body)
             else:
                 raise HTTPException(status_code=500, detail="Error al crear la cotización")
                 
         except Exception as e:
+            if idempotency_key is not None and not creada:
+                idempotency_service.release("POST /cotizaciones", idempotency_key)
+            if isinstance(e, HTTPException):
+                raise
             raise HTTPException(status_code=500, detail=f"Error al crear cotización: {str(e)}")
 
+    @router.get("/cache/estadisticas")
+    async def get_cache_stats():
+        """Aciertos, fallos y ocupación de las cachés de documentos de este worker"""
+        return [cotizaciones_cache.stats(), leyes_cache.stats()]
+
     # --- Leyes ---
     @router.get("/leyes", response_model=List[LeySchema])
     async def get_all_leyes():
+        def load_leyes() -> List[LeySchema]:
+            return [LeySchema(**doc) for doc in collection_leyes.find()]
+
         try:
-            leyes = []
-            for doc in collection_leyes.find():
-                leyes.append(LeySchema(**doc))
-            return leyes
+            return await catalog_flight.do("leyes", load_leyes)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al obtener leyes: {str(e)}")
 
@@ -232,11 +596,16 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
             if not ObjectId.is_valid(id):
                 raise HTTPException(status_code=400, detail="ID inválido")
             
-            ley_doc = collection_leyes.find_one({"_id": ObjectId(id)})
-            if not ley_doc:
-                raise HTTPException(status_code=404, detail="Ley no encontrada")
-            
-            return LeySchema(**ley_doc)
+            body = leyes_cache.get(id)
+            if body is None:
+                generation = leyes_cache.generation
+                ley_doc = collection_leyes.find_one({"_id": ObjectId(id)})
+                if not ley_doc:
+                    raise HTTPException(status_code=404, detail="Ley no encontrada")
+
+                body = LeySchema(**ley_doc).model_dump_json(by_alias=True).encode("utf-8")
+                leyes_cache.put(id, body, generation)
+            return Response(content=body, media_type="application/json")
         except HTTPException:
             raise
         except Exception as e:
@@ -248,9 +617,13 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
             if not ObjectId.is_valid(id):
                 raise HTTPException(status_code=400, detail="ID inválido")
             
+            # Las cotizaciones compactas que la referencian pasan a guardar el texto
+            cotizacion_storage.expand_references(ObjectId(id))
             result = collection_leyes.delete_one({"_id": ObjectId(id)})
+            invalidation_bus.publish(CANAL_LEYES, id)
             if result.deleted_count == 0:
                 raise HTTPException(status_code=404, detail="Ley no encontrada")
+            sync_service.record_delete("leyes", id)
             return
         except HTTPException:
             raise
@@ -270,7 +643,21 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
 
             # Actualizar datos
             updated_data = ley.model_dump(by_alias=True, exclude_unset=True, exclude_none=True)
+            updated_data.update(sync_service.stamp())
+            if any(field in updated_data and updated_data[field] != existing_ley.get(field) for field in ("nombre", "grosor")):
+                # Conservar el nombre/grosor original en las cotizaciones compactas
+                cotizacion_storage.expand_references(ObjectId(id))
             collection_leyes.update_one({"_id": ObjectId(id)}, {"$set": updated_data})
+            if "precio" in updated_data:
+                price_history_service.record(TIPO_LEY, ObjectId(id), updated_data["precio"])
+            # Catálogo e historial de precios de todos los workers
+            invalidation_bus.publish(CANAL_LEYES, id)
+            if "precio" in updated_data:
+                if REPRECIO_AUTOMATICO and updated_data["precio"] != existing_ley.get("precio"):
+                    repricing_service.start(
+                        RepricingService.build_query([ObjectId(id)], {existing_ley["nombre"], updated_data.get("nombre", existing_ley["nombre"])}),
+                        motivo=f"precio de ley {id}"
+                    )
 
             # Devolver la ley actualizada
             updated_doc = collection_leyes.find_one({"_id": ObjectId(id)})
@@ -284,7 +671,10 @@ def get_routes(collection_leyes: Collection, collection_cotizaciones: Collection
     async def create_ley(ley: LeySchema):
         try:
             ley_dict = ley.model_dump(by_alias=True, exclude_none=True)
+            ley_dict.update(sync_service.stamp())
             result = collection_leyes.insert_one(ley_dict)
+            price_history_service.record(TIPO_LEY, result.inserted_id, ley_dict["precio"])
+            invalidation_bus.publish(CANAL_LEYES, str(result.inserted_id))
             created_ley = collection_leyes.find_one({"_id": result.inserted_id})
             if created_ley:
                 return LeySchema(**created_ley)
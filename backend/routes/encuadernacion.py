@@ -1,5 +1,7 @@
 from fastapi import APIRouter, HTTPException, status
+from pymongo import ReturnDocument
 from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from bson import ObjectId
 from typing import List
 from datetime import datetime
@@ -8,9 +10,101 @@ from schemas.encuadernacion_schemas import (
     EncuadernacionCreateSchema, 
     EncuadernacionUpdateSchema
 )
+from services.sync_service import SyncService
+from services.price_history_service import PriceHistoryService, TIPO_ENCUADERNACION
+from services.repricing_service import RepricingService, REPRECIO_AUTOMATICO
+from services.invalidation_bus import InvalidationBus, CANAL_ENCUADERNACION
+from services.single_flight import SingleFlight
 
-def get_encuadernacion_routes(collection_encuadernacion: Collection) -> APIRouter:
+# Una sola encuadernación activa por material y tamaño (las inactivas pueden repetirse)
+INDICE_ACTIVA_UNICA = "material_tamano_activa_unica"
+CLAVE_MATERIAL_TAMANO = [("material", 1), ("tamano", 1)]
+# Mongo < 7.0 no admite dos índices con la misma clave y distintas opciones
+CODIGOS_CONFLICTO_INDICE = (85, 86)
+CODIGO_INDICE_INEXISTENTE = 27
+
+
+def ensure_encuadernacion_indexes(collection_encuadernacion: Collection):
+    """
+    Crea el índice único parcial sobre las encuadernaciones activas
+
+    Reemplaza el índice único (material, tamano) que creaba
+    create_encuadernacion_collection.py, incompatible con desactivar una
+    encuadernación y crear otra igual. El índice antiguo solo se elimina
+    cuando el parcial ya existe (o, si Mongo no admite ambos a la vez,
+    se restaura si el parcial no se pudo crear): la colección nunca queda
+    sin unicidad.
+
+    Raises:
+        RuntimeError: Si hay encuadernaciones activas repetidas; el arranque
+            se detiene hasta desactivar las sobrantes
+    """
+    antiguos = [
+        name for name, info in collection_encuadernacion.index_information().items()
+        if info.get("unique") and info.get("key") == CLAVE_MATERIAL_TAMANO and "partialFilterExpression" not in info
+    ]
+
+    repetidas = list(collection_encuadernacion.aggregate([
+        {"$match": {"activo": True}},
+        {"$group": {"_id": {"material": "$material", "tamano": "$tamano"}, "ids": {"$push": "$_id"}, "cantidad": {"$sum": 1}}},
+        {"$match": {"cantidad": {"$gt": 1}}}
+    ]))
+    if repetidas:
+        detalle = "; ".join(
+            f"{grupo['_id'].get('material')} / {grupo['_id'].get('tamano')}: {', '.join(str(oid) for oid in grupo['ids'])}"
+            for grupo in repetidas
+        )
+        raise RuntimeError(f"Hay encuadernaciones activas repetidas, desactive las sobrantes antes de arrancar: {detalle}")
+
+    def eliminar_antiguos():
+        for name in antiguos:
+            try:
+                collection_encuadernacion.drop_index(name)
+            except OperationFailure as e:
+                # Otro worker ya lo eliminó
+                if e.code != CODIGO_INDICE_INEXISTENTE:
+                    raise
+
+    def crear_parcial():
+        collection_encuadernacion.create_index(
+            CLAVE_MATERIAL_TAMANO,
+            name=INDICE_ACTIVA_UNICA,
+            unique=True,
+            partialFilterExpression={"activo": True}
+        )
+
+    try:
+        crear_parcial()
+    except OperationFailure as e:
+        if not antiguos or e.code not in CODIGOS_CONFLICTO_INDICE:
+            raise
+        eliminar_antiguos()
+        try:
+            crear_parcial()
+        except Exception:
+            # Volver al índice antiguo antes de detener el arranque
+            collection_encuadernacion.create_index(CLAVE_MATERIAL_TAMANO, name=antiguos[0], unique=True)
+            raise
+    else:
+        eliminar_antiguos()
+    for name in antiguos:
+        print(f"🔧 Índice único '{name}' de encuadernación reemplazado por uno parcial")
+    collection_encuadernacion.create_index("activo")
+
+
+def get_encuadernacion_routes(
+    collection_encuadernacion: Collection,
+    sync_service: SyncService,
+    price_history_service: PriceHistoryService,
+    repricing_service: RepricingService,
+    invalidation_bus: InvalidationBus
+) -> APIRouter:
     router = APIRouter()
+    # Peticiones simultáneas del listado comparten una sola consulta
+    catalog_flight = SingleFlight()
+
+    def load_encuadernaciones(query: dict) -> List[EncuadernacionSchema]:
+        return [EncuadernacionSchema(**doc) for doc in collection_encuadernacion.find(query).sort("material", 1)]
 
     # --- Encuadernación CRUD ---
 
@@ -18,12 +112,7 @@ def get_encuadernacion_routes(collection_encuadernacion: Collection) -> APIRoute
     async def get_all_encuadernacion():
         """Obtener todos los tipos de encuadernación"""
         try:
-            encuadernaciones = []
-            for doc in collection_encuadernacion.find({"activo": True}).sort("material", 1):
-                if "_id" in doc:
-                    doc["_id"] = str(doc["_id"])
-                encuadernaciones.append(EncuadernacionSchema(**doc))
-            return encuadernaciones
+            return await catalog_flight.do("activas", load_encuadernaciones, {"activo": True})
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al obtener encuadernaciones: {str(e)}")
 
@@ -31,12 +120,7 @@ def get_encuadernacion_routes(collection_encuadernacion: Collection) -> APIRoute
     async def get_all_encuadernacion_admin():
         """Obtener todos los tipos de encuadernación (incluyendo inactivos) para admin"""
         try:
-            encuadernaciones = []
-            for doc in collection_encuadernacion.find().sort("material", 1):
-                if "_id" in doc:
-                    doc["_id"] = str(doc["_id"])
-                encuadernaciones.append(EncuadernacionSchema(**doc))
-            return encuadernaciones
+            return await catalog_flight.do("todas", load_encuadernaciones, {})
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al obtener encuadernaciones: {str(e)}")
 
@@ -51,7 +135,6 @@ def get_encuadernacion_routes(collection_encuadernacion: Collection) -> APIRoute
             if not encuadernacion_doc:
                 raise HTTPException(status_code=404, detail="Encuadernación no encontrada")
             
-            encuadernacion_doc["_id"] = str(encuadernacion_doc["_id"])
             return EncuadernacionSchema(**encuadernacion_doc)
         except HTTPException:
             raise
@@ -62,30 +145,24 @@ def get_encuadernacion_routes(collection_encuadernacion: Collection) -> APIRoute
     async def create_encuadernacion(encuadernacion: EncuadernacionCreateSchema):
         """Crear nueva encuadernación"""
         try:
-            # Verificar si ya existe una encuadernación con el mismo material y tamaño
-            existing = collection_encuadernacion.find_one({
-                "material": encuadernacion.material,
-                "tamano": encuadernacion.tamano,
-                "activo": True
-            })
+            encuadernacion_dict = encuadernacion.model_dump()
+            encuadernacion_dict["fecha_creacion"] = datetime.now()
+            encuadernacion_dict["fecha_actualizacion"] = datetime.now()
+            encuadernacion_dict.update(sync_service.stamp())
             
-            if existing:
+            # El índice único parcial rechaza duplicados activos de material y tamaño
+            try:
+                result = collection_encuadernacion.insert_one(encuadernacion_dict)
+            except DuplicateKeyError:
                 raise HTTPException(
                     status_code=400, 
                     detail=f"Ya existe una encuadernación activa con material '{encuadernacion.material}' y tamaño '{encuadernacion.tamano}'"
                 )
-
-            encuadernacion_dict = encuadernacion.model_dump()
-            encuadernacion_dict["fecha_creacion"] = datetime.now()
-            encuadernacion_dict["fecha_actualizacion"] = datetime.now()
-            
-            result = collection_encuadernacion.insert_one(encuadernacion_dict)
-            
-            # Obtener el documento creado
-            created_doc = collection_encuadernacion.find_one({"_id": result.inserted_id})
-            created_doc["_id"] = str(created_doc["_id"])
+            price_history_service.record(TIPO_ENCUADERNACION, result.inserted_id, encuadernacion_dict["precio"], encuadernacion_dict["fecha_creacion"])
+            invalidation_bus.publish(CANAL_ENCUADERNACION, str(result.inserted_id))
             
-            return EncuadernacionSchema(**created_doc)
+            # insert_one agrega el _id al diccionario insertado
+            return EncuadernacionSchema(**encuadernacion_dict)
         except HTTPException:
             raise
         except Exception as e:
@@ -98,48 +175,55 @@ def get_encuadernacion_routes(collection_encuadernacion: Collection) -> APIRoute
             if not ObjectId.is_valid(id):
                 raise HTTPException(status_code=400, detail="ID inválido")
             
-            # Verificar que la encuadernación existe
-            existing_doc = collection_encuadernacion.find_one({"_id": ObjectId(id)})
-            if not existing_doc:
-                raise HTTPException(status_code=404, detail="Encuadernación no encontrada")
-            
             # Preparar datos de actualización
             update_data = {}
             for field, value in encuadernacion.model_dump(exclude_unset=True).items():
                 if value is not None:
                     update_data[field] = value
             
-            if update_data:
-                update_data["fecha_actualizacion"] = datetime.now()
-                
-                # Si se está actualizando material o tamaño, verificar duplicados
-                if "material" in update_data or "tamano" in update_data:
-                    new_material = update_data.get("material", existing_doc["material"])
-                    new_tamano = update_data.get("tamano", existing_doc["tamano"])
-                    
-                    duplicate = collection_encuadernacion.find_one({
-                        "material": new_material,
-                        "tamano": new_tamano,
-                        "activo": True,
-                        "_id": {"$ne": ObjectId(id)}
-                    })
-                    
-                    if duplicate:
-                        raise HTTPException(
-                            status_code=400,
-                            detail=f"Ya existe otra encuadernación activa con material '{new_material}' y tamaño '{new_tamano}'"
-                        )
-                
-                collection_encuadernacion.update_one(
+            if not update_data:
+                existing_doc = collection_encuadernacion.find_one({"_id": ObjectId(id)})
+                if not existing_doc:
+                    raise HTTPException(status_code=404, detail="Encuadernación no encontrada")
+                return EncuadernacionSchema(**existing_doc)
+
+            update_data["fecha_actualizacion"] = datetime.now()
+            update_data.update(sync_service.stamp())
+            
+            # Una sola operación: devuelve el documento anterior (precio, material y tamaño previos)
+            # y el índice único parcial rechaza duplicados activos
+            try:
+                existing_doc = collection_encuadernacion.find_one_and_update(
                     {"_id": ObjectId(id)},
-                    {"$set": update_data}
+                    {"$set": update_data},
+                    return_document=ReturnDocument.BEFORE
                 )
+            except DuplicateKeyError:
+                # Solo en el error se lee el documento, para completar el mensaje
+                current_doc = collection_encuadernacion.find_one({"_id": ObjectId(id)}) or {}
+                new_material = update_data.get("material", current_doc.get("material"))
+                new_tamano = update_data.get("tamano", current_doc.get("tamano"))
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Ya existe otra encuadernación activa con material '{new_material}' y tamaño '{new_tamano}'"
+                )
+            if not existing_doc:
+                raise HTTPException(status_code=404, detail="Encuadernación no encontrada")
+
+            if "precio" in update_data:
+                price_history_service.record(TIPO_ENCUADERNACION, ObjectId(id), update_data["precio"], update_data["fecha_actualizacion"])
+            invalidation_bus.publish(CANAL_ENCUADERNACION, id)
+            if "precio" in update_data:
+                if REPRECIO_AUTOMATICO and update_data["precio"] != existing_doc.get("precio"):
+                    repricing_service.start(
+                        RepricingService.build_query(encuadernaciones=[(
+                            update_data.get("material", existing_doc["material"]),
+                            update_data.get("tamano", existing_doc["tamano"])
+                        )]),
+                        motivo=f"precio de encuadernación {id}"
+                    )
             
-            # Obtener el documento actualizado
-            updated_doc = collection_encuadernacion.find_one({"_id": ObjectId(id)})
-            updated_doc["_id"] = str(updated_doc["_id"])
-            
-            return EncuadernacionSchema(**updated_doc)
+            return EncuadernacionSchema(**{**existing_doc, **update_data})
         except HTTPException:
             raise
         except Exception as e:
@@ -162,6 +246,8 @@ def get_encuadernacion_routes(collection_encuadernacion: Collection) -> APIRoute
             if result.deleted_count == 0:
                 raise HTTPException(status_code=404, detail="No se pudo eliminar la encuadernación")
             
+            sync_service.record_delete("encuadernacion", id)
+            invalidation_bus.publish(CANAL_ENCUADERNACION, id)
             return
         except HTTPException:
             raise
@@ -175,36 +261,28 @@ def get_encuadernacion_routes(collection_encuadernacion: Collection) -> APIRoute
             if not ObjectId.is_valid(id):
                 raise HTTPException(status_code=400, detail="ID inválido")
             
-            # Obtener el documento actual
-            current_doc = collection_encuadernacion.find_one({"_id": ObjectId(id)})
-            if not current_doc:
+            # Una sola operación con pipeline: el nuevo estado se calcula en el servidor
+            # (sin lectura previa) y el índice único parcial rechaza activar un duplicado
+            try:
+                updated_doc = collection_encuadernacion.find_one_and_update(
+                    {"_id": ObjectId(id)},
+                    [{"$set": {
+                        "activo": {"$not": {"$ifNull": ["$activo", True]}},
+                        "fecha_actualizacion": datetime.now(),
+                        **sync_service.stamp()
+                    }}],
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # Solo en el error se lee el documento, para completar el mensaje
+                current_doc = collection_encuadernacion.find_one({"_id": ObjectId(id)}) or {}
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Ya existe otra encuadernación activa con material '{current_doc.get('material')}' y tamaño '{current_doc.get('tamano')}'"
+                )
+            if not updated_doc:
                 raise HTTPException(status_code=404, detail="Encuadernación no encontrada")
-            
-            new_status = not current_doc.get("activo", True)
-            
-            # Si se está activando, verificar duplicados
-            if new_status:
-                duplicate = collection_encuadernacion.find_one({
-                    "material": current_doc["material"],
-                    "tamano": current_doc["tamano"],
-                    "activo": True,
-                    "_id": {"$ne": ObjectId(id)}
-                })
-                
-                if duplicate:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Ya existe otra encuadernación activa con material '{current_doc['material']}' y tamaño '{current_doc['tamano']}'"
-                    )
-            
-            collection_encuadernacion.update_one(
-                {"_id": ObjectId(id)},
-                {"$set": {"activo": new_status, "fecha_actualizacion": datetime.now()}}
-            )
-            
-            # Obtener el documento actualizado
-            updated_doc = collection_encuadernacion.find_one({"_id": ObjectId(id)})
-            updated_doc["_id"] = str(updated_doc["_id"])
+            invalidation_bus.publish(CANAL_ENCUADERNACION, id)
             
             return EncuadernacionSchema(**updated_doc)
         except HTTPException:
@@ -0,0 +1,166 @@
+from datetime import datetime
+from typing import List, Optional
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Query, status
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+
+from schemas.payment_plan_schemas import (
+    PlanPagoSchema,
+    PlanPagoCreateSchema,
+    PlanPagoUpdateSchema,
+    CalculoCuotasRequest
+)
+from services.payment_plan_service import PaymentPlanService, plan_name
+from services.invalidation_bus import InvalidationBus, CANAL_PLANES_PAGO
+from services.single_flight import SingleFlight
+
+# Máximo de totales por cálculo síncrono
+CALCULO_MAX_TOTALES = 10000
+
+
+def get_payment_plan_routes(
+    payment_plan_service: PaymentPlanService,
+    collection_cotizaciones: Collection,
+    invalidation_bus: InvalidationBus
+) -> APIRouter:
+    router = APIRouter()
+    collection_planes = payment_plan_service.collection
+    # El reporte recorre todas las pendientes: peticiones simultáneas comparten la consulta
+    report_flight = SingleFlight()
+
+    # --- Planes de pago CRUD ---
+
+    @router.get("/planes-pago", response_model=List[PlanPagoSchema])
+    async def get_payment_plans(incluir_inactivos: bool = Query(False, description="Incluir planes desactivados")):
+        """Planes de pago, ordenados por cantidad de cuotas"""
+        try:
+            if not incluir_inactivos:
+                return [PlanPagoSchema(**doc) for doc in payment_plan_service.active_plans()]
+            return [PlanPagoSchema(**doc) for doc in collection_planes.find().sort("cantidad_cuotas", 1)]
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener planes de pago: {str(e)}")
+
+    @router.post("/planes-pago", response_model=PlanPagoSchema, status_code=status.HTTP_201_CREATED)
+    async def create_payment_plan(plan: PlanPagoCreateSchema):
+        """Crear un plan de pago (o reactivarlo si ya existía desactivado)"""
+        try:
+            duplicado = HTTPException(status_code=400, detail=f"Ya existe un plan de {plan.cantidad_cuotas} cuota(s)")
+            existing = collection_planes.find_one({"cantidad_cuotas": plan.cantidad_cuotas})
+            if existing and existing.get("activo", True):
+                raise duplicado
+
+            ahora = datetime.now()
+            plan_dict = {
+                "cantidad_cuotas": plan.cantidad_cuotas,
+                "nombre": plan.nombre or plan_name(plan.cantidad_cuotas),
+                "activo": plan.activo,
+                "fecha_actualizacion": ahora
+            }
+            if existing:
+                # Solo si sigue desactivado: otra petición simultánea pudo reactivarlo
+                result = collection_planes.update_one({"_id": existing["_id"], "activo": False}, {"$set": plan_dict})
+                if result.matched_count == 0:
+                    raise duplicado
+                plan_id = existing["_id"]
+            else:
+                plan_dict["fecha_creacion"] = ahora
+                try:
+                    plan_id = collection_planes.insert_one(plan_dict).inserted_id
+                except DuplicateKeyError:
+                    # Otra petición simultánea creó el mismo plan (índice único de cantidad_cuotas)
+                    raise duplicado
+            invalidation_bus.publish(CANAL_PLANES_PAGO)
+            return PlanPagoSchema(**collection_planes.find_one({"_id": plan_id}))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al crear plan de pago: {str(e)}")
+
+    @router.put("/planes-pago/{id}", response_model=PlanPagoSchema)
+    async def update_payment_plan(id: str, plan: PlanPagoUpdateSchema):
+        """Actualizar nombre o estado de un plan de pago"""
+        try:
+            if not ObjectId.is_valid(id):
+                raise HTTPException(status_code=400, detail="ID inválido")
+            if not collection_planes.find_one({"_id": ObjectId(id)}):
+                raise HTTPException(status_code=404, detail="Plan de pago no encontrado")
+
+            update_data = {field: value for field, value in plan.model_dump(exclude_unset=True).items() if value is not None}
+            if update_data:
+                update_data["fecha_actualizacion"] = datetime.now()
+                collection_planes.update_one({"_id": ObjectId(id)}, {"$set": update_data})
+                invalidation_bus.publish(CANAL_PLANES_PAGO)
+            return PlanPagoSchema(**collection_planes.find_one({"_id": ObjectId(id)}))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al actualizar plan de pago: {str(e)}")
+
+    @router.delete("/planes-pago/{id}")
+    async def delete_payment_plan(id: str):
+        """Desactivar un plan de pago (las cotizaciones existentes lo conservan)"""
+        try:
+            if not ObjectId.is_valid(id):
+                raise HTTPException(status_code=400, detail="ID inválido")
+            result = collection_planes.update_one(
+                {"_id": ObjectId(id)},
+                {"$set": {"activo": False, "fecha_actualizacion": datetime.now()}}
+            )
+            if result.matched_count == 0:
+                raise HTTPException(status_code=404, detail="Plan de pago no encontrado")
+            invalidation_bus.publish(CANAL_PLANES_PAGO)
+            return {"message": "Plan de pago desactivado exitosamente"}
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al eliminar plan de pago: {str(e)}")
+
+    # --- Cálculo de cuotas ---
+
+    @router.post("/planes-pago/calcular")
+    async def calculate_installments(request: CalculoCuotasRequest):
+        """
+        Opciones de pago de varios totales en una sola llamada. Sin
+        `cantidades_cuotas` se calculan todos los planes activos.
+        """
+        if len(request.totales) > CALCULO_MAX_TOTALES:
+            raise HTTPException(status_code=400, detail=f"Máximo {CALCULO_MAX_TOTALES} totales por cálculo")
+        if request.cantidades_cuotas is not None and any(n <= 0 for n in request.cantidades_cuotas):
+            raise HTTPException(status_code=400, detail="La cantidad de cuotas debe ser mayor que cero")
+        try:
+            opciones = payment_plan_service.calculate(request.totales, request.cantidades_cuotas)
+            return [{"total": total, "opciones": fila} for total, fila in zip(request.totales, opciones)]
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al calcular cuotas: {str(e)}")
+
+    @router.get("/planes-pago/cotizaciones-pendientes")
+    async def pending_quotes_installments(limite: Optional[int] = Query(None, ge=1, description="Máximo de cotizaciones")):
+        """Opciones de pago de cada cotización pendiente según los planes activos"""
+        def load_report() -> List[dict]:
+            cursor = collection_cotizaciones.find(
+                {"estado": "pendiente"},
+                {"cliente.nombre": 1, "resumen_costo.total": 1, "opcion_pago": 1}
+            ).sort("_id", 1)
+            if limite:
+                cursor = cursor.limit(limite)
+            docs = list(cursor)
+
+            opciones = payment_plan_service.calculate([doc["resumen_costo"]["total"] for doc in docs])
+            return [
+                {
+                    "id": str(doc["_id"]),
+                    "cliente": doc.get("cliente", {}).get("nombre"),
+                    "total": doc["resumen_costo"]["total"],
+                    "opcion_pago": doc.get("opcion_pago"),
+                    "opciones": fila
+                }
+                for doc, fila in zip(docs, opciones)
+            ]
+
+        try:
+            return await report_flight.do(("pendientes", limite), load_report)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al calcular cuotas de cotizaciones pendientes: {str(e)}")
+
+    return router
@@ -0,0 +1,38 @@
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from services.archive_service import ArchiveService
+from services.cotizacion_storage import CotizacionStorage
+from services.pdf_service import PdfService
+
+
+def get_pdf_routes(archive_service: ArchiveService, cotizacion_storage: CotizacionStorage, pdf_service: PdfService) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/cotizaciones/{id}/pdf", response_class=FileResponse)
+    async def get_cotizacion_pdf(id: str):
+        """
+        PDF de la cotización. Se genera una vez por versión y luego se sirve
+        desde disco en streaming (admite cabecera Range para descargas parciales).
+        """
+        if not ObjectId.is_valid(id):
+            raise HTTPException(status_code=400, detail="ID inválido")
+        try:
+            cotizacion = archive_service.find_one(ObjectId(id))
+            if not cotizacion:
+                raise HTTPException(status_code=404, detail="Cotización no encontrada")
+
+            path = await pdf_service.get_pdf(cotizacion_storage.expand(cotizacion))
+            return FileResponse(
+                path,
+                media_type="application/pdf",
+                filename=f"cotizacion-{id}.pdf",
+                headers={"Cache-Control": "private, max-age=0, must-revalidate"}
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al generar PDF: {str(e)}")
+
+    return router
@@ -0,0 +1,138 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from pymongo.collection import Collection
+
+from services.archive_service import ArchiveService
+from services.cotizacion_storage import CotizacionStorage
+from services.price_history_service import PriceHistoryService, TIPOS_PRECIO
+
+# Máximo de cotizaciones por auditoría síncrona
+AUDITORIA_MAX_IDS = 1000
+
+
+class ConsultaPrecio(BaseModel):
+    tipo: str
+    id: str
+    fecha: datetime
+
+
+class ConsultaPreciosRequest(BaseModel):
+    consultas: List[ConsultaPrecio]
+
+
+class AuditoriaPreciosRequest(BaseModel):
+    ids: List[str]
+
+
+def encuadernacion_index(collection_encuadernacion: Collection) -> Dict[Tuple[str, str], ObjectId]:
+    """(material, tamaño) -> id, prefiriendo las encuadernaciones activas"""
+    index: Dict[Tuple[str, str], ObjectId] = {}
+    for doc in collection_encuadernacion.find({}, {"material": 1, "tamano": 1, "activo": 1}).sort("activo", 1):
+        index[(doc["material"], doc["tamano"])] = doc["_id"]
+    return index
+
+
+def get_price_history_routes(
+    price_history_service: PriceHistoryService,
+    cotizacion_storage: CotizacionStorage,
+    archive_service: ArchiveService,
+    collection_encuadernacion: Collection
+) -> APIRouter:
+    router = APIRouter()
+
+    def validate_item(tipo: str, item_id: str) -> ObjectId:
+        if tipo not in TIPOS_PRECIO:
+            raise HTTPException(status_code=400, detail=f"Tipo inválido. Debe ser uno de: {', '.join(TIPOS_PRECIO)}")
+        if not ObjectId.is_valid(item_id):
+            raise HTTPException(status_code=400, detail="ID inválido")
+        return ObjectId(item_id)
+
+    def audit(docs: List[dict]) -> List[dict]:
+        encuadernaciones = encuadernacion_index(collection_encuadernacion)
+        reportes = []
+        for doc in docs:
+            ley_ids = cotizacion_storage.ley_ids(doc)
+            doc = cotizacion_storage.expand(doc)
+            tipo = (doc.get("agrupamiento_volumenes", {}).get("costo_encuadernacion") or {}).get("tipo_encuadernacion") or {}
+            reportes.append(price_history_service.audit_cotizacion(
+                doc,
+                ley_ids,
+                encuadernaciones.get((tipo.get("material"), tipo.get("tamano")))
+            ))
+        return reportes
+
+    @router.get("/precios/{tipo}/{item_id}/historial")
+    async def get_price_history(tipo: str, item_id: str):
+        """Historial de precios de una ley o encuadernación, del más antiguo al vigente"""
+        oid = validate_item(tipo, item_id)
+        try:
+            return {"tipo": tipo, "id": item_id, "historial": price_history_service.history(tipo, oid)}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener historial de precios: {str(e)}")
+
+    @router.get("/precios/{tipo}/{item_id}")
+    async def get_price_at(tipo: str, item_id: str, fecha: Optional[datetime] = Query(None, description="Fecha de consulta (por defecto, ahora)")):
+        """Precio vigente de una ley o encuadernación en una fecha"""
+        oid = validate_item(tipo, item_id)
+        try:
+            fecha = fecha or datetime.now()
+            precio = price_history_service.price_at(tipo, oid, fecha)
+            if precio is None:
+                raise HTTPException(status_code=404, detail="Sin precio registrado para esa fecha")
+            return {"tipo": tipo, "id": item_id, "fecha": fecha, "precio": precio}
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al consultar precio: {str(e)}")
+
+    @router.post("/precios/consulta")
+    async def get_prices_at(request: ConsultaPreciosRequest):
+        """Varias consultas de precio puntuales en una sola llamada"""
+        consultas = [(c.tipo, validate_item(c.tipo, c.id), c.fecha) for c in request.consultas]
+        try:
+            precios = price_history_service.prices_at(consultas)
+            return [
+                {"tipo": c.tipo, "id": c.id, "fecha": c.fecha, "precio": precio}
+                for c, precio in zip(request.consultas, precios)
+            ]
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al consultar precios: {str(e)}")
+
+    @router.get("/cotizaciones/{id}/auditoria-precios")
+    async def audit_cotizacion_prices(id: str):
+        """Compara los precios de una cotización con los vigentes en su fecha de creación"""
+        if not ObjectId.is_valid(id):
+            raise HTTPException(status_code=400, detail="ID inválido")
+        try:
+            doc = archive_service.find_one(ObjectId(id))
+            if not doc:
+                raise HTTPException(status_code=404, detail="Cotización no encontrada")
+            return audit([doc])[0]
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al auditar precios: {str(e)}")
+
+    @router.post("/precios/auditoria")
+    async def audit_cotizaciones_prices(request: AuditoriaPreciosRequest):
+        """Auditoría de precios de varias cotizaciones (hasta AUDITORIA_MAX_IDS)"""
+        if len(request.ids) > AUDITORIA_MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"Máximo {AUDITORIA_MAX_IDS} cotizaciones por auditoría")
+        invalid_ids = [id for id in request.ids if not ObjectId.is_valid(id)]
+        if invalid_ids:
+            raise HTTPException(status_code=400, detail=f"IDs inválidos: {', '.join(invalid_ids)}")
+        try:
+            docs = archive_service.find({"_id": {"$in": [ObjectId(id) for id in request.ids]}}, incluir_archivadas=True)
+            reportes = audit(docs)
+            return {
+                "total": len(reportes),
+                "con_diferencias": sum(1 for r in reportes if not r["coincide"]),
+                "cotizaciones": reportes
+            }
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al auditar precios: {str(e)}")
+
+    return router
@@ -0,0 +1,80 @@
+from datetime import datetime
+from typing import List, Optional
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from services.repricing_service import RepricingService
+
+
+class EncuadernacionRef(BaseModel):
+    material: str
+    tamano: str
+
+
+class RepricingRequest(BaseModel):
+    ley_ids: List[str] = []
+    ley_nombres: List[str] = []
+    encuadernaciones: List[EncuadernacionRef] = []
+    # Fecha de los precios del historial a aplicar (por defecto, los vigentes)
+    fecha: Optional[datetime] = None
+
+
+def serialize_job(job: dict) -> dict:
+    return jsonable_encoder(job, custom_encoder={ObjectId: str})
+
+
+def get_repricing_routes(repricing_service: RepricingService) -> APIRouter:
+    router = APIRouter()
+
+    @router.post("/cotizaciones/repreciar", status_code=status.HTTP_202_ACCEPTED)
+    async def start_repricing(request: Optional[RepricingRequest] = None):
+        """
+        Recalcula en segundo plano las cotizaciones pendientes con los precios vigentes
+        (o los del historial a `fecha`). Sin filtros recalcula todas las pendientes.
+        Devuelve el id del trabajo.
+        """
+        request = request or RepricingRequest()
+        invalid_ids = [id for id in request.ley_ids if not ObjectId.is_valid(id)]
+        if invalid_ids:
+            raise HTTPException(status_code=400, detail=f"IDs inválidos: {', '.join(invalid_ids)}")
+        try:
+            query = RepricingService.build_query(
+                [ObjectId(id) for id in request.ley_ids],
+                request.ley_nombres,
+                [(e.material, e.tamano) for e in request.encuadernaciones]
+            )
+            fecha = request.fecha
+            if fecha is not None and fecha.tzinfo is not None:
+                # El historial guarda fechas locales sin zona horaria
+                fecha = fecha.astimezone().replace(tzinfo=None)
+            job_id = repricing_service.start(query, fecha=fecha)
+            return {"id": str(job_id), "estado": "en_curso"}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al iniciar reprecio: {str(e)}")
+
+    @router.get("/cotizaciones/repreciar")
+    async def list_repricing_jobs():
+        """Últimos trabajos de reprecio"""
+        try:
+            return [serialize_job(job) for job in repricing_service.recent_jobs()]
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener trabajos de reprecio: {str(e)}")
+
+    @router.get("/cotizaciones/repreciar/{job_id}")
+    async def get_repricing_job(job_id: str):
+        """Progreso de un trabajo de reprecio"""
+        if not ObjectId.is_valid(job_id):
+            raise HTTPException(status_code=400, detail="ID inválido")
+        try:
+            job = repricing_service.get_job(ObjectId(job_id))
+            if not job:
+                raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+            return serialize_job(job)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener trabajo de reprecio: {str(e)}")
+
+    return router
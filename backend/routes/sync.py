@@ -0,0 +1,30 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from services.sync_service import SyncService, SYNC_DEFAULT_LIMIT
+
+def get_sync_routes(sync_service: SyncService) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/sync")
+    async def sync_changes(
+        since: Optional[str] = Query(None, description="Token devuelto por la sincronización anterior"),
+        limit: int = Query(SYNC_DEFAULT_LIMIT, ge=1, le=5000)
+    ):
+        """
+        Cambios de cotizaciones, leyes y encuadernación desde el token indicado.
+        Sin token devuelve todo (sincronización completa). Si `hay_mas` es true,
+        repetir la llamada con el nuevo token. Con `resincronizar: true` el token
+        era anterior a la poda de lápidas: la respuesta es una sincronización
+        completa y los datos locales deben reemplazarse.
+        """
+        try:
+            since_version = SyncService.parse_token(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Token de sincronización inválido")
+
+        try:
+            return sync_service.changes_since(since_version, limit)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al sincronizar: {str(e)}")
+
+    return router
@@ -0,0 +1,117 @@
+from fastapi import APIRouter, HTTPException, Depends, status
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+from typing import List
+from datetime import datetime
+from schemas.telegram_schemas import (
+    TelegramRecipientSchema,
+    TelegramRecipientCreateSchema,
+    TelegramRecipientUpdateSchema,
+    EVENTOS_TELEGRAM
+)
+from services.invalidation_bus import InvalidationBus, CANAL_TELEGRAM
+from services.auth_service import AuthService
+from routes.auth import get_admin_dependency
+
+def _validate_eventos(eventos: List[str]):
+    invalid = [evento for evento in eventos if evento not in EVENTOS_TELEGRAM]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Eventos inválidos: {', '.join(invalid)}. Permitidos: {', '.join(EVENTOS_TELEGRAM)}"
+        )
+
+def ensure_telegram_recipients_indexes(collection_destinatarios: Collection):
+    """Índices del registro: un chat aparece una sola vez y se filtra por evento"""
+    try:
+        collection_destinatarios.create_index("chat_id", unique=True)
+        collection_destinatarios.create_index([("activo", 1), ("eventos", 1)])
+    except Exception as e:
+        print(f"⚠️ Error creando índices de destinatarios de Telegram: {str(e)}")
+
+def get_telegram_recipients_routes(collection_destinatarios: Collection, invalidation_bus: InvalidationBus, auth_service: AuthService) -> APIRouter:
+    # Solo administradores: los destinatarios reciben las contraseñas temporales de recuperación
+    router = APIRouter(dependencies=[Depends(get_admin_dependency(auth_service))])
+
+    # --- Destinatarios de Telegram ---
+
+    @router.get("/telegram/destinatarios", response_model=List[TelegramRecipientSchema])
+    async def get_all_destinatarios():
+        """Obtener todos los destinatarios de notificaciones de Telegram"""
+        try:
+            destinatarios = []
+            for doc in collection_destinatarios.find().sort("nombre", 1):
+                destinatarios.append(TelegramRecipientSchema(**doc))
+            return destinatarios
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener destinatarios: {str(e)}")
+
+    @router.post("/telegram/destinatarios", response_model=TelegramRecipientSchema, status_code=status.HTTP_201_CREATED)
+    async def create_destinatario(destinatario: TelegramRecipientCreateSchema):
+        """Registrar un chat para recibir notificaciones"""
+        try:
+            _validate_eventos(destinatario.eventos)
+
+            destinatario_dict = destinatario.model_dump()
+            destinatario_dict["fecha_creacion"] = datetime.now()
+            destinatario_dict["fecha_actualizacion"] = datetime.now()
+
+            try:
+                result = collection_destinatarios.insert_one(destinatario_dict)
+            except DuplicateKeyError:
+                raise HTTPException(status_code=400, detail=f"El chat '{destinatario.chat_id}' ya está registrado")
+            invalidation_bus.publish(CANAL_TELEGRAM)
+
+            destinatario_dict["_id"] = result.inserted_id
+            return TelegramRecipientSchema(**destinatario_dict)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al crear destinatario: {str(e)}")
+
+    @router.put("/telegram/destinatarios/{id}", response_model=TelegramRecipientSchema)
+    async def update_destinatario(id: str, destinatario: TelegramRecipientUpdateSchema):
+        """Actualizar un destinatario y sus reglas de enrutamiento"""
+        try:
+            if not ObjectId.is_valid(id):
+                raise HTTPException(status_code=400, detail="ID inválido")
+
+            update_data = {k: v for k, v in destinatario.model_dump(exclude_unset=True).items() if v is not None}
+            if "eventos" in update_data:
+                _validate_eventos(update_data["eventos"])
+            update_data["fecha_actualizacion"] = datetime.now()
+
+            try:
+                result = collection_destinatarios.update_one({"_id": ObjectId(id)}, {"$set": update_data})
+            except DuplicateKeyError:
+                raise HTTPException(status_code=400, detail=f"El chat '{update_data.get('chat_id')}' ya está registrado")
+            if result.matched_count == 0:
+                raise HTTPException(status_code=404, detail="Destinatario no encontrado")
+            invalidation_bus.publish(CANAL_TELEGRAM)
+
+            updated_doc = collection_destinatarios.find_one({"_id": ObjectId(id)})
+            return TelegramRecipientSchema(**updated_doc)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al actualizar destinatario: {str(e)}")
+
+    @router.delete("/telegram/destinatarios/{id}", status_code=status.HTTP_204_NO_CONTENT)
+    async def delete_destinatario(id: str):
+        """Eliminar un destinatario"""
+        try:
+            if not ObjectId.is_valid(id):
+                raise HTTPException(status_code=400, detail="ID inválido")
+
+            result = collection_destinatarios.delete_one({"_id": ObjectId(id)})
+            if result.deleted_count == 0:
+                raise HTTPException(status_code=404, detail="Destinatario no encontrado")
+            invalidation_bus.publish(CANAL_TELEGRAM)
+            return
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al eliminar destinatario: {str(e)}")
+
+    return router
@@ -2,21 +2,7 @@ from pydantic import BaseModel, Field, EmailStr
 from typing import Optional, List
 from bson import ObjectId
 from datetime import datetime
-
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v, info):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, schema, handler) -> dict:
-        return {"type": "string"}
+from schemas.object_id import PyObjectId
 
 class ClienteSchema(BaseModel):
     nombre: str
@@ -77,6 +63,7 @@ class CotizacionLegalSchema(BaseModel):
     fecha_creacion: datetime
     estado: str
     fecha_entrega: Optional[datetime] = None
+    fecha_archivo: Optional[datetime] = None
 
     model_config = {
         "arbitrary_types_allowed": True,
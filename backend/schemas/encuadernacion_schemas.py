@@ -2,21 +2,7 @@ from pydantic import BaseModel, Field
 from typing import Optional
 from bson import ObjectId
 from datetime import datetime
-
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v, info):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, schema, handler) -> dict:
-        return {"type": "string"}
+from schemas.object_id import PyObjectId
 
 class EncuadernacionSchema(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
@@ -0,0 +1,45 @@
+from typing import Any
+from bson import ObjectId
+from pydantic import GetCoreSchemaHandler, GetJsonSchemaHandler
+from pydantic.json_schema import JsonSchemaValue
+from pydantic_core import core_schema
+
+
+def _from_str(value: str) -> ObjectId:
+    if not ObjectId.is_valid(value):
+        raise ValueError("ObjectId inválido")
+    return ObjectId(value)
+
+
+class PyObjectId(ObjectId):
+    """
+    ObjectId de Mongo para los esquemas Pydantic v2
+
+    Validación: un ObjectId se acepta tal cual (sin copias ni conversiones,
+    que es lo que llega de Mongo); un str se valida y se convierte. En
+    `model_dump()` se conserva el ObjectId para escribirlo de vuelta en
+    Mongo; en JSON se serializa como str. El JSON schema lo describe como
+    string de 24 caracteres hexadecimales.
+
+    Las rutas pueden pasar el documento de Mongo directamente al esquema,
+    sin convertir `_id` a str antes.
+    """
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        from_str = core_schema.chain_schema([
+            core_schema.str_schema(),
+            core_schema.no_info_plain_validator_function(_from_str),
+        ])
+        return core_schema.json_or_python_schema(
+            json_schema=from_str,
+            python_schema=core_schema.union_schema([
+                core_schema.is_instance_schema(ObjectId),
+                from_str,
+            ]),
+            serialization=core_schema.plain_serializer_function_ser_schema(str, when_used="json"),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema: core_schema.CoreSchema, handler: GetJsonSchemaHandler) -> JsonSchemaValue:
+        return {"type": "string", "pattern": "^[0-9a-fA-F]{24}$", "example": "507f1f77bcf86cd799439011"}
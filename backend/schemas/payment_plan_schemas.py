@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from bson import ObjectId
+from datetime import datetime
+from schemas.object_id import PyObjectId
+
+class PlanPagoSchema(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    cantidad_cuotas: int = Field(gt=0)
+    nombre: str
+    activo: bool = True
+    fecha_creacion: datetime = Field(default_factory=datetime.now)
+    fecha_actualizacion: datetime = Field(default_factory=datetime.now)
+
+    model_config = {
+        "arbitrary_types_allowed": True,
+        "json_encoders": {ObjectId: str, datetime: lambda v: v.isoformat()}
+    }
+
+class PlanPagoCreateSchema(BaseModel):
+    cantidad_cuotas: int = Field(gt=0)
+    nombre: Optional[str] = None
+    activo: bool = True
+
+class PlanPagoUpdateSchema(BaseModel):
+    nombre: Optional[str] = None
+    activo: Optional[bool] = None
+
+class CalculoCuotasRequest(BaseModel):
+    totales: List[float]
+    cantidades_cuotas: Optional[List[int]] = None
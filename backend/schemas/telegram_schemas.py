@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from bson import ObjectId
+from datetime import datetime
+from schemas.object_id import PyObjectId
+
+# Eventos que generan notificaciones de Telegram
+EVENTO_NUEVA_COTIZACION = "nueva_cotizacion"
+EVENTO_RECUPERACION_PASSWORD = "recuperacion_password"
+# Un destinatario con "*" recibe todos los eventos
+EVENTO_TODOS = "*"
+EVENTOS_TELEGRAM = [EVENTO_NUEVA_COTIZACION, EVENTO_RECUPERACION_PASSWORD, EVENTO_TODOS]
+
+class TelegramRecipientSchema(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    chat_id: str
+    nombre: str
+    eventos: List[str] = Field(default_factory=lambda: [EVENTO_TODOS])
+    activo: bool = True
+    fecha_creacion: datetime = Field(default_factory=datetime.now)
+    fecha_actualizacion: datetime = Field(default_factory=datetime.now)
+
+    model_config = {
+        "arbitrary_types_allowed": True,
+        "json_encoders": {ObjectId: str, datetime: lambda v: v.isoformat()}
+    }
+
+class TelegramRecipientCreateSchema(BaseModel):
+    chat_id: str
+    nombre: str
+    eventos: List[str] = Field(default_factory=lambda: [EVENTO_TODOS])
+    activo: bool = True
+
+class TelegramRecipientUpdateSchema(BaseModel):
+    chat_id: Optional[str] = None
+    nombre: Optional[str] = None
+    eventos: Optional[List[str]] = None
+    activo: Optional[bool] = None
@@ -1,24 +1,9 @@
 from pydantic import BaseModel, Field, EmailStr, field_validator
-from typing import Optional, Annotated
+from typing import Any, Dict, List, Optional, Annotated
 from bson import ObjectId
 from datetime import datetime
 import re
-
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid objectid")
-        return ObjectId(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema):
-        field_schema.update(type="string")
-        return field_schema
+from schemas.object_id import PyObjectId
 
 class UserSchema(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
@@ -74,6 +59,10 @@ class UserCreateSchema(BaseModel):
         
         return v
 
+class UserBulkCreateSchema(BaseModel):
+    # Filas sin validar: cada una se valida con UserCreateSchema (is_admin por defecto false) y sus errores se informan por fila
+    usuarios: List[Dict[str, Any]]
+
 class UserUpdateSchema(BaseModel):
     username: Optional[str] = Field(None, min_length=3, max_length=50)
     email: Optional[EmailStr] = None
@@ -97,6 +86,13 @@ class UserResponseSchema(BaseModel):
     class Config:
         populate_by_name = True
 
+class UserPageSchema(BaseModel):
+    usuarios: List[UserResponseSchema]
+    total: int
+    pagina: int
+    limite: int
+    hay_mas: bool
+
 class TokenSchema(BaseModel):
     access_token: str
     token_type: str
@@ -0,0 +1,151 @@
+import os
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from bson import ObjectId
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+from services.invalidation_bus import InvalidationBus, CANAL_COTIZACIONES
+
+if TYPE_CHECKING:
+    from services.sync_service import SyncService
+
+# Días desde la entrega a partir de los cuales una cotización pasa al archivo
+ARCHIVO_EDAD_DIAS = int(os.getenv("ARCHIVO_EDAD_DIAS", "180"))
+# Documentos movidos por lote (acota memoria y duración de cada escritura)
+ARCHIVO_LOTE = int(os.getenv("ARCHIVO_LOTE", "500"))
+# Lotes por ejecución del job; el resto queda para la siguiente
+ARCHIVO_MAX_LOTES = int(os.getenv("ARCHIVO_MAX_LOTES", "20"))
+# Intervalo del job programado (0 lo desactiva)
+ARCHIVO_INTERVALO_SEGUNDOS = float(os.getenv("ARCHIVO_INTERVALO_SEGUNDOS", "3600"))
+
+# Código de error de Mongo para clave duplicada
+DUPLICATE_KEY_ERROR = 11000
+
+
+class ArchiveService:
+    """
+    Archivo de cotizaciones entregadas
+
+    Las cotizaciones con estado "entregado" y `fecha_entrega` anterior a la
+    edad configurada se mueven de la colección activa a una colección de
+    archivo en lotes acotados. El movimiento es primero inserción y después
+    borrado: si el proceso se interrumpe a mitad, la siguiente ejecución
+    encuentra los duplicados en el archivo, los ignora y completa el borrado.
+
+    Cada lote archivado recibe un `sync_version` nuevo junto con
+    `fecha_archivo`: el feed de cotizaciones lo usa para anunciar la
+    cotización como archivada (y no como borrada) tanto en modo change
+    stream como en polling.
+
+    Las consultas (`find_one`, `find`) buscan en ambas colecciones para que
+    las rutas no necesiten saber dónde vive cada cotización.
+    """
+
+    def __init__(
+        self,
+        hot_collection: Collection,
+        archive_collection: Collection,
+        edad_dias: int = ARCHIVO_EDAD_DIAS,
+        batch_size: int = ARCHIVO_LOTE,
+        invalidation_bus: Optional[InvalidationBus] = None,
+        sync_service: Optional["SyncService"] = None
+    ):
+        self.hot_collection = hot_collection
+        self.archive_collection = archive_collection
+        self.edad_dias = edad_dias
+        self.batch_size = batch_size
+        self.invalidation_bus = invalidation_bus
+        self.sync_service = sync_service
+
+    def ensure_indexes(self):
+        """Índices para seleccionar candidatas y consultar el archivo por fecha"""
+        try:
+            self.hot_collection.create_index([("estado", 1), ("fecha_entrega", 1)])
+            self.archive_collection.create_index("fecha_entrega")
+            self.archive_collection.create_index("sync_version")
+        except Exception as e:
+            print(f"⚠️ Error creando índices de archivo: {str(e)}")
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        return (now or datetime.now()) - timedelta(days=self.edad_dias)
+
+    def archive_batch(self, cutoff: datetime) -> int:
+        """
+        Mueve un lote de cotizaciones entregadas antes de `cutoff`
+
+        Returns:
+            int: Cantidad de cotizaciones eliminadas de la colección activa
+        """
+        docs = list(
+            self.hot_collection.find({"estado": "entregado", "fecha_entrega": {"$lt": cutoff}})
+            .sort("fecha_entrega", 1)
+            .limit(self.batch_size)
+        )
+        if not docs:
+            return 0
+
+        archivo = {"fecha_archivo": datetime.now()}
+        if self.sync_service:
+            # Una versión por lote: el paso al archivo cuenta como una modificación
+            archivo.update(self.sync_service.stamp())
+        for doc in docs:
+            doc.update(archivo)
+
+        try:
+            self.archive_collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Reintento tras una ejecución interrumpida: ya estaban archivadas
+            otros = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY_ERROR]
+            if otros:
+                raise
+
+        result = self.hot_collection.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+        return result.deleted_count
+
+    def run(self, max_batches: int = ARCHIVO_MAX_LOTES, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Ejecuta hasta `max_batches` lotes
+
+        Returns:
+            Dict: {"archivadas": int, "lotes": int, "pendientes": bool, "fecha_corte": datetime}
+        """
+        cutoff = self.cutoff(now)
+        archivadas = 0
+        lotes = 0
+        pendientes = False
+
+        while lotes < max_batches:
+            moved = self.archive_batch(cutoff)
+            if moved == 0:
+                break
+            archivadas += moved
+            lotes += 1
+        else:
+            pendientes = self.hot_collection.find_one(
+                {"estado": "entregado", "fecha_entrega": {"$lt": cutoff}}, {"_id": 1}
+            ) is not None
+
+        if archivadas:
+            print(f"📦 {archivadas} cotizaciones archivadas en {lotes} lote(s)")
+            # Las archivadas ganan fecha_archivo: descartar las copias en caché
+            if self.invalidation_bus:
+                self.invalidation_bus.publish(CANAL_COTIZACIONES)
+        return {"archivadas": archivadas, "lotes": lotes, "pendientes": pendientes, "fecha_corte": cutoff}
+
+    # --- Consultas sobre ambas colecciones ---
+
+    def find_one(self, doc_id: ObjectId) -> Optional[Dict[str, Any]]:
+        doc = self.hot_collection.find_one({"_id": doc_id})
+        if doc is None:
+            doc = self.archive_collection.find_one({"_id": doc_id})
+        return doc
+
+    def find(self, query: Optional[Dict[str, Any]] = None, incluir_archivadas: bool = False) -> List[Dict[str, Any]]:
+        query = query or {}
+        docs = list(self.hot_collection.find(query))
+        if incluir_archivadas:
+            docs.extend(self.archive_collection.find(query))
+        return docs
+
+    def delete_archived(self, doc_id: ObjectId) -> bool:
+        return self.archive_collection.delete_one({"_id": doc_id}).deleted_count > 0
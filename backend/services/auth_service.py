@@ -1,19 +1,25 @@
 import os
+import re
 import secrets
-import bcrypt
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pymongo.collection import Collection
 from bson import ObjectId
 from dotenv import load_dotenv
 from services.telegram_service import TelegramService
+from services.email_service import EmailService
+from services.template_service import TemplateService
 
 load_dotenv()
 
+# Costo de bcrypt (ver calibrate_bcrypt.py); los hashes con otro costo se rehacen al iniciar sesión
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 # Configuración de seguridad
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
@@ -21,16 +27,112 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "
 # Configuración de expiración de contraseñas (2 meses)
 PASSWORD_EXPIRE_DAYS = 60
 
+# Paginación del listado de usuarios
+USUARIOS_POR_PAGINA = int(os.getenv("USUARIOS_POR_PAGINA", "25"))
+USUARIOS_MAX_POR_PAGINA = 200
+
+# Único campo con el hash de la contraseña; los demás son de versiones anteriores
+PASSWORD_FIELD = "hashed_password"
+LEGACY_PASSWORD_FIELDS = ("password", "password_hash")
+# Prioridad al leer: `password` lo escribían el cambio y la recuperación de contraseña
+# (más reciente que `hashed_password`) y `password_hash` solo fix_user_passwords.py
+PASSWORD_FIELDS_PRIORIDAD = ("password", PASSWORD_FIELD, "password_hash")
+
+
+def stored_password_hash(user: Dict[str, Any]) -> Optional[str]:
+    """Hash vigente del usuario, esté en el campo actual o en uno antiguo"""
+    for field in PASSWORD_FIELDS_PRIORIDAD:
+        if user.get(field):
+            return user[field]
+    return None
+
+
+def password_update(hashed: str) -> Dict[str, Any]:
+    """Operación de actualización que guarda `hashed` en el campo único y borra los antiguos"""
+    return {
+        "$set": {PASSWORD_FIELD: hashed},
+        "$unset": {field: "" for field in LEGACY_PASSWORD_FIELDS}
+    }
+
+
+def calibrate_bcrypt_rounds(objetivo_ms: float, min_rounds: int = 10, max_rounds: int = 16, muestras: int = 3) -> Tuple[int, Dict[int, float]]:
+    """
+    Mide cuánto tarda verificar una contraseña con cada costo de bcrypt
+
+    Returns:
+        Tuple[int, Dict[int, float]]: El mayor costo cuya verificación (mediana
+        de `muestras`) no supera `objetivo_ms` (como mínimo `min_rounds`) y los
+        milisegundos medidos por costo
+    """
+    medidos: Dict[int, float] = {}
+    elegido = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        hashed = context.hash("calibracion")
+        tiempos = []
+        for _ in range(muestras):
+            inicio = time.perf_counter()
+            context.verify("calibracion", hashed)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        medidos[rounds] = sorted(tiempos)[len(tiempos) // 2]
+        if medidos[rounds] > objetivo_ms:
+            # Cada costo duplica el tiempo: los siguientes también superan el objetivo
+            break
+        elegido = rounds
+    return elegido, medidos
+
+
 class AuthService:
-    def __init__(self, users_collection: Collection):
+    def __init__(self, users_collection: Collection, recipients_collection: Optional[Collection] = None):
         self.users_collection = users_collection
-        self.telegram_service = TelegramService()
+        self.telegram_service = TelegramService(recipients_collection)
+
+    def ensure_indexes(self):
+        """Índices únicos de username y email (también sirven a la búsqueda por prefijo del listado)"""
+        try:
+            self.users_collection.create_index("username", unique=True)
+            self.users_collection.create_index("email", unique=True)
+            self.users_collection.create_index("reset_token")
+        except Exception as e:
+            print(f"⚠️ Error creando índices de usuarios: {str(e)}")
+
+    def migrate_password_fields(self) -> int:
+        """
+        Mueve los hashes de los campos antiguos a `hashed_password`
+
+        No necesita la contraseña: copia el hash vigente (ver
+        `stored_password_hash`). Devuelve los usuarios actualizados.
+        """
+        migrados = 0
+        try:
+            legacy = {"$or": [{field: {"$exists": True}} for field in LEGACY_PASSWORD_FIELDS]}
+            for user in self.users_collection.find(legacy, {PASSWORD_FIELD: 1, **{field: 1 for field in LEGACY_PASSWORD_FIELDS}}):
+                hashed = stored_password_hash(user)
+                if hashed is None:
+                    self.users_collection.update_one({"_id": user["_id"]}, {"$unset": {field: "" for field in LEGACY_PASSWORD_FIELDS}})
+                else:
+                    self.users_collection.update_one({"_id": user["_id"]}, password_update(hashed))
+                migrados += 1
+            if migrados:
+                print(f"🔐 {migrados} usuario(s) con el hash de contraseña movido a '{PASSWORD_FIELD}'")
+        except Exception as e:
+            print(f"⚠️ Error migrando campos de contraseña: {str(e)}")
+        return migrados
 
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verificar contraseña"""
+        if not hashed_password:
+            return False
         return pwd_context.verify(plain_password, hashed_password)
 
+    @staticmethod
+    def verify_and_update_password(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """Verificar contraseña; si el hash usa otro costo devuelve también uno nuevo con BCRYPT_ROUNDS"""
+        if not hashed_password:
+            return False, None
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Generar hash de contraseña"""
@@ -73,13 +175,18 @@ class AuthService:
         if user.get("locked_until") and user["locked_until"] > datetime.utcnow():
             return None
         
-        # Verificar contraseña - usar el campo correcto
-        password_field = user.get("password", user.get("hashed_password"))
-        if not self.verify_password(password, password_field):
+        # Verificar contraseña
+        hashed = stored_password_hash(user)
+        valid, new_hash = self.verify_and_update_password(password, hashed)
+        if not valid:
             # Incrementar intentos fallidos
             self.increment_failed_attempts(user["_id"])
             return None
         
+        # Rehacer el hash si cambió BCRYPT_ROUNDS (o moverlo al campo único)
+        if new_hash or any(field in user for field in LEGACY_PASSWORD_FIELDS):
+            self.users_collection.update_one({"_id": user["_id"]}, password_update(new_hash or hashed))
+        
         # Resetear intentos fallidos y actualizar último login
         self.reset_failed_attempts(user["_id"])
         self.update_last_login(user["_id"])
@@ -128,6 +235,51 @@ class AuthService:
         expiry_date = password_created_at + timedelta(days=PASSWORD_EXPIRE_DAYS)
         return datetime.utcnow() > expiry_date
 
+    def list_users(self, buscar: Optional[str] = None, pagina: int = 1, limite: int = USUARIOS_POR_PAGINA) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Página de usuarios ordenada por username, con el total en la misma consulta
+
+        La búsqueda es por prefijo de username o email (expresión anclada, que
+        usa los índices de ambos campos). La proyección solo incluye los campos
+        de UserResponseSchema, sin hashes ni datos de recuperación, y
+        `password_needs_reset` se calcula en Mongo con el mismo criterio que
+        `is_password_expired`.
+
+        Returns:
+            Tuple[List[Dict], int]: Usuarios de la página y total de coincidencias
+        """
+        query: Dict[str, Any] = {}
+        if buscar:
+            prefijo = {"$regex": f"^{re.escape(buscar)}"}
+            query = {"$or": [{"username": prefijo}, {"email": prefijo}]}
+
+        vencimiento = datetime.utcnow() - timedelta(days=PASSWORD_EXPIRE_DAYS)
+        proyeccion = {
+            "username": 1,
+            "email": 1,
+            "is_active": 1,
+            "is_admin": 1,
+            "created_at": 1,
+            "last_login": 1,
+            "password_needs_reset": {
+                "$cond": [
+                    {"$ifNull": ["$password_created_at", False]},
+                    {"$lt": ["$password_created_at", vencimiento]},
+                    True
+                ]
+            }
+        }
+        resultado = next(self.users_collection.aggregate([
+            {"$match": query},
+            {"$sort": {"username": 1}},
+            {"$facet": {
+                "usuarios": [{"$skip": (pagina - 1) * limite}, {"$limit": limite}, {"$project": proyeccion}],
+                "total": [{"$count": "n"}]
+            }}
+        ]), {"usuarios": [], "total": []})
+        total = resultado["total"][0]["n"] if resultado["total"] else 0
+        return resultado["usuarios"], total
+
     def create_user(self, username: str, email: str, password: str, is_admin: bool = True) -> Dict[str, Any]:
         """Crear nuevo usuario"""
         # Verificar si el usuario ya existe
@@ -177,25 +329,20 @@ class AuthService:
             
             # Hash de la contraseña temporal
             print(f"🔒 Hasheando contraseña temporal...")
-            temp_password_hash = bcrypt.hashpw(temp_password.encode('utf-8'), bcrypt.gensalt())
+            update = password_update(self.get_password_hash(temp_password))
             print(f"✅ Hash generado correctamente")
             
             # Actualizar usuario con contraseña temporal y marcar que necesita cambio
             print(f"💾 Actualizando usuario en base de datos...")
-            result = self.users_collection.update_one(
-                {"_id": user["_id"]},
-                {
-                    "$set": {
-                        "password": temp_password_hash.decode('utf-8'),
-                        "password_needs_reset": True,
-                        "temp_password_created": datetime.utcnow()
-                    },
-                    "$unset": {
-                        "reset_token": "",
-                        "reset_token_expires": ""
-                    }
-                }
-            )
+            update["$set"].update({
+                "password_needs_reset": True,
+                "temp_password_created": datetime.utcnow()
+            })
+            update["$unset"].update({
+                "reset_token": "",
+                "reset_token_expires": ""
+            })
+            result = self.users_collection.update_one({"_id": user["_id"]}, update)
             print(f"✅ Usuario actualizado. Modified count: {result.modified_count}")
             
             # Enviar contraseña temporal por Telegram
@@ -216,26 +363,18 @@ class AuthService:
             raise e
 
     def generate_temporary_password(self) -> str:
-        """Generar contraseña temporal segura"""
+        """Generar contraseña temporal segura (siempre cumple UserCreateSchema)"""
         import string
-        import random
         import secrets
         
-        # Generar contraseña de 12 caracteres con mayúsculas, minúsculas, números y símbolos
-        characters = string.ascii_letters + string.digits + "!@#$%&*"
-        temp_password = ''.join(random.choice(characters) for _ in range(12))
-        
-        # Asegurar que tenga al menos una mayúscula, minúscula, número y símbolo
-        if not any(c.isupper() for c in temp_password):
-            temp_password = temp_password[:-1] + random.choice(string.ascii_uppercase)
-        if not any(c.islower() for c in temp_password):
-            temp_password = temp_password[:-1] + random.choice(string.ascii_lowercase)
-        if not any(c.isdigit() for c in temp_password):
-            temp_password = temp_password[:-1] + random.choice(string.digits)
-        if not any(c in "!@#$%&*" for c in temp_password):
-            temp_password = temp_password[:-1] + random.choice("!@#$%&*")
-            
-        return temp_password
+        # 12 caracteres con al menos una mayúscula, minúscula, número y símbolo
+        symbols = "!@#$%&*"
+        classes = [string.ascii_uppercase, string.ascii_lowercase, string.digits, symbols]
+        characters = "".join(classes)
+        chars = [secrets.choice(group) for group in classes]
+        chars += [secrets.choice(characters) for _ in range(12 - len(chars))]
+        secrets.SystemRandom().shuffle(chars)
+        return "".join(chars)
 
     def send_temporary_password_telegram(self, email: str, temp_password: str, username: str) -> bool:
         """Enviar contraseña temporal por Telegram (método legacy - ahora usa telegram_service directamente)"""
@@ -251,54 +390,11 @@ class AuthService:
             # URL de recuperación (ajustar según tu frontend)
             reset_url = f"http://localhost:3000/reset-password?token={token}"
             
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <title>Recuperación de Contraseña - LeyesVzla</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                    .header {{ background-color: #dc2626; color: white; padding: 20px; text-align: center; }}
-                    .content {{ padding: 20px; background-color: #f9fafb; }}
-                    .button {{ display: inline-block; padding: 12px 24px; background-color: #dc2626; color: white; text-decoration: none; border-radius: 6px; margin: 20px 0; }}
-                    .warning {{ background-color: #fef3c7; border: 1px solid #f59e0b; padding: 15px; border-radius: 6px; margin: 20px 0; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>LeyesVzla</h1>
-                        <p>Recuperación de Contraseña</p>
-                    </div>
-                    
-                    <div class="content">
-                        <h2>Hola {username},</h2>
-                        <p>Recibimos una solicitud para restablecer la contraseña de tu cuenta en LeyesVzla.</p>
-                        
-                        <p>Haz clic en el siguiente botón para crear una nueva contraseña:</p>
-                        
-                        <a href="{reset_url}" class="button">Restablecer Contraseña</a>
-                        
-                        <div class="warning">
-                            <strong>⚠️ Importante:</strong>
-                            <ul>
-                                <li>Este enlace es válido por 1 hora solamente</li>
-                                <li>Si no solicitaste este cambio, ignora este email</li>
-                                <li>Tu contraseña actual seguirá siendo válida hasta que la cambies</li>
-                            </ul>
-                        </div>
-                        
-                        <p>Si el botón no funciona, copia y pega este enlace en tu navegador:</p>
-                        <p style="word-break: break-all; color: #6b7280;">{reset_url}</p>
-                        
-                        <p>Si tienes problemas, contacta al administrador del sistema.</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
+            html_content = TemplateService.render(
+                "email/recuperacion_password.html",
+                username=username,
+                reset_url=reset_url
+            )
             
             return EmailService.send_custom_email(
                 to_email=email,
@@ -323,17 +419,15 @@ class AuthService:
             return False
         
         # Actualizar contraseña y limpiar token
-        self.users_collection.update_one(
-            {"_id": user["_id"]},
-            {"$set": {
-                "hashed_password": self.get_password_hash(new_password),
-                "password_created_at": datetime.utcnow(),
-                "reset_token": None,
-                "reset_token_expires": None,
-                "failed_login_attempts": 0,
-                "locked_until": None
-            }}
-        )
+        update = password_update(self.get_password_hash(new_password))
+        update["$set"].update({
+            "password_created_at": datetime.utcnow(),
+            "reset_token": None,
+            "reset_token_expires": None,
+            "failed_login_attempts": 0,
+            "locked_until": None
+        })
+        self.users_collection.update_one({"_id": user["_id"]}, update)
         
         return True
 
@@ -346,20 +440,17 @@ class AuthService:
         if not user:
             return False
         
-        # Verificar contraseña actual - usar el campo correcto
-        password_field = user.get("password", user.get("hashed_password"))
-        if not self.verify_password(current_password, password_field):
+        # Verificar contraseña actual
+        if not self.verify_password(current_password, stored_password_hash(user)):
             return False
         
         # Actualizar contraseña
-        self.users_collection.update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": {
-                "password": self.get_password_hash(new_password),
-                "password_created_at": datetime.utcnow(),
-                "password_needs_reset": False
-            }}
-        )
+        update = password_update(self.get_password_hash(new_password))
+        update["$set"].update({
+            "password_created_at": datetime.utcnow(),
+            "password_needs_reset": False
+        })
+        self.users_collection.update_one({"_id": ObjectId(user_id)}, update)
         
         return True
 
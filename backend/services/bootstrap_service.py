@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo.collection import Collection
+from services.payment_plan_service import PaymentPlanService
+from services.sync_service import SyncService
+
+# Segundos que se reutiliza la respuesta serializada (además de invalidarse al escribir)
+BOOTSTRAP_TTL_SEGUNDOS = float(os.getenv("BOOTSTRAP_TTL_SEGUNDOS", "300"))
+# max-age del Cache-Control; con 0 el navegador guarda la respuesta pero la revalida con If-None-Match
+BOOTSTRAP_MAX_AGE = int(os.getenv("BOOTSTRAP_MAX_AGE", "0"))
+
+# Campos que necesita el cotizador (sin fechas ni versiones)
+CAMPOS_LEY = {"nombre": 1, "precio": 1, "grosor": 1, "categoria": 1}
+CAMPOS_ENCUADERNACION = {"material": 1, "tamano": 1, "precio": 1}
+
+
+class BootstrapService:
+    """
+    Respuesta única para abrir el cotizador: leyes, encuadernaciones activas y planes de pago
+
+    Se arma una vez y se guarda ya serializada (JSON compacto) junto con su
+    ETag, que combina las versiones de cada componente: el `sync_version`
+    más alto de leyes y de encuadernación (incluidas sus lápidas) y un hash
+    de los planes activos. Las escrituras del catálogo la invalidan a
+    través del bus de invalidación. Una respuesta construida mientras llegaba
+    una invalidación no se guarda.
+    """
+
+    def __init__(
+        self,
+        collection_leyes: Collection,
+        collection_encuadernacion: Collection,
+        payment_plan_service: PaymentPlanService,
+        sync_service: SyncService,
+        ttl_seconds: float = BOOTSTRAP_TTL_SEGUNDOS
+    ):
+        self.collection_leyes = collection_leyes
+        self.collection_encuadernacion = collection_encuadernacion
+        self.payment_plan_service = payment_plan_service
+        self.sync_service = sync_service
+        self.ttl_seconds = ttl_seconds
+        self._cached: Optional[Tuple[str, bytes]] = None
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._cached = None
+
+    def cached(self) -> Optional[Tuple[str, bytes]]:
+        """(ETag, cuerpo) vigentes, o None si hay que reconstruir"""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+            return None
+        return self._cached
+
+    @staticmethod
+    def _plans_version(planes: List[Dict[str, Any]]) -> str:
+        contenido = json.dumps([(plan["cantidad_cuotas"], plan["nombre"]) for plan in planes])
+        return format(zlib.crc32(contenido.encode()), "08x")
+
+    def refresh(self) -> Tuple[str, bytes]:
+        """Reconstruye la respuesta (bloqueante: consulta Mongo)"""
+        generation = self._generation
+        # Versiones antes que datos: si algo cambia entremedias, el cuerpo es
+        # más nuevo que el ETag y la invalidación descarta el resultado
+        version_leyes = self.sync_service.collection_version("leyes")
+        version_encuadernacion = self.sync_service.collection_version("encuadernacion")
+        planes = self.payment_plan_service.active_plans()
+        version = f"{version_leyes}-{version_encuadernacion}-{self._plans_version(planes)}"
+
+        body = {
+            "version": version,
+            "leyes": [
+                {"_id": str(doc["_id"]), "nombre": doc["nombre"], "precio": doc["precio"], "grosor": doc["grosor"], "categoria": doc.get("categoria", "")}
+                for doc in self.collection_leyes.find({}, CAMPOS_LEY)
+            ],
+            "encuadernaciones": [
+                {"_id": str(doc["_id"]), "material": doc["material"], "tamano": doc["tamano"], "precio": doc["precio"]}
+                for doc in self.collection_encuadernacion.find({"activo": True}, CAMPOS_ENCUADERNACION).sort("material", 1)
+            ],
+            "planes_pago": [
+                {"_id": str(plan["_id"]), "cantidad_cuotas": plan["cantidad_cuotas"], "nombre": plan["nombre"]}
+                for plan in planes
+            ]
+        }
+        result = (f'"{version}"', json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+        with self._lock:
+            if generation == self._generation:
+                self._cached = result
+                self._loaded_at = time.monotonic()
+        return result
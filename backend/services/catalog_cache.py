@@ -0,0 +1,59 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from pymongo.collection import Collection
+
+# Segundos que se reutiliza el catálogo de leyes en memoria
+CATALOGO_TTL_SEGUNDOS = float(os.getenv("CATALOGO_TTL_SEGUNDOS", "300"))
+
+CATALOG_FIELDS = {"nombre": 1, "grosor": 1, "precio": 1, "categoria": 1}
+
+
+class CatalogCache:
+    """
+    Catálogo de leyes en memoria (id -> nombre, grosor, precio, categoría)
+
+    Se recarga completo al vencer el TTL o tras `invalidate()`, que las rutas
+    de leyes llaman después de cada escritura. Lo usa el formato compacto de
+    cotizaciones para resolver nombres al leer.
+    """
+
+    def __init__(self, collection_leyes: Collection, ttl_seconds: float = CATALOGO_TTL_SEGUNDOS):
+        self.collection_leyes = collection_leyes
+        self.ttl_seconds = ttl_seconds
+        self._by_id: Dict[ObjectId, Dict[str, Any]] = {}
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        by_id = {doc["_id"]: doc for doc in self.collection_leyes.find({}, CATALOG_FIELDS)}
+        self._by_id = by_id
+        self._by_name = {doc["nombre"]: doc for doc in by_id.values()}
+        self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+            with self._lock:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+                    self._load()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def get(self, ley_id: ObjectId) -> Optional[Dict[str, Any]]:
+        """Ley por id; si no está en memoria (creada tras la última carga) se consulta Mongo"""
+        self._ensure_fresh()
+        ley = self._by_id.get(ley_id)
+        if ley is None:
+            ley = self.collection_leyes.find_one({"_id": ley_id}, CATALOG_FIELDS)
+            if ley is not None:
+                self.invalidate()
+        return ley
+
+    def find_by_name(self, nombre: str) -> Optional[Dict[str, Any]]:
+        self._ensure_fresh()
+        return self._by_name.get(nombre)
@@ -0,0 +1,173 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence
+from bson import ObjectId
+from pymongo.collection import Collection
+from services.catalog_cache import CatalogCache
+
+# Guardar las cotizaciones nuevas en formato compacto
+COTIZACIONES_FORMATO_COMPACTO = os.getenv("COTIZACIONES_FORMATO_COMPACTO", "false").lower() in ("1", "true", "si", "sí")
+
+# Texto para una ley que ya no existe en el catálogo
+LEY_NO_DISPONIBLE = "Ley no disponible"
+SEPARADOR_VOLUMEN = ", "
+
+
+class CotizacionStorage:
+    """
+    Formato de almacenamiento de los items de una cotización
+
+    Formato expandido (el de la API):
+        leyes_seleccionadas.items = [{"nombre", "grosor", "precio"}, ...]
+        agrupamiento_volumenes.volumenes = [{"numero", "leyes": "Ley A, Ley B"}, ...]
+
+    Formato compacto (opcional, solo en Mongo):
+        leyes_seleccionadas.ley_ids = [ObjectId, ...]
+        leyes_seleccionadas.precios = [float, ...]   # precio al momento de cotizar
+        agrupamiento_volumenes.volumenes = [{"numero", "indices": [0, 1]}, ...]
+
+    Nombre y grosor se resuelven al leer desde el catálogo en memoria. Una
+    cotización solo se compacta si cada item coincide con una ley del
+    catálogo (nombre y grosor) y cada volumen se puede reconstruir; si no,
+    se guarda expandida. Antes de renombrar o eliminar una ley, las
+    cotizaciones compactas que la referencian se expanden para conservar el
+    texto original (`expand_references`).
+    """
+
+    def __init__(self, catalog: CatalogCache, collections: Sequence[Collection] = (), compact: bool = COTIZACIONES_FORMATO_COMPACTO):
+        self.catalog = catalog
+        self.collections = list(collections)
+        self.compact_enabled = compact
+
+    @staticmethod
+    def is_compact(doc: Dict[str, Any]) -> bool:
+        return "ley_ids" in (doc.get("leyes_seleccionadas") or {})
+
+    # --- Escritura ---
+
+    def for_write(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Documento a guardar: compacto si está habilitado y es representable"""
+        if not self.compact_enabled:
+            return doc
+        return self.compact(doc) or doc
+
+    @staticmethod
+    def _split_volume(texto: str, nombres: List[str]) -> Optional[List[int]]:
+        """Índices de items cuyos nombres unidos con ", " forman el texto del volumen"""
+        if texto == "":
+            return []
+        for index, nombre in enumerate(nombres):
+            if texto == nombre:
+                return [index]
+            prefix = nombre + SEPARADOR_VOLUMEN
+            if texto.startswith(prefix):
+                rest = CotizacionStorage._split_volume(texto[len(prefix):], nombres)
+                if rest:
+                    return [index] + rest
+        return None
+
+    def compact(self, doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Versión compacta del documento
+
+        Returns:
+            Optional[Dict]: Copia compacta, o None si algún item o volumen no se puede representar
+        """
+        if self.is_compact(doc):
+            return doc
+        leyes = doc.get("leyes_seleccionadas")
+        agrupamiento = doc.get("agrupamiento_volumenes")
+        if not leyes or agrupamiento is None:
+            return None
+
+        items = leyes.get("items", [])
+        ley_ids = []
+        for item in items:
+            ley = self.catalog.find_by_name(item["nombre"])
+            if ley is None or ley.get("grosor") != item["grosor"]:
+                return None
+            ley_ids.append(ley["_id"])
+
+        nombres = [item["nombre"] for item in items]
+        volumenes = []
+        for volumen in agrupamiento.get("volumenes", []):
+            indices = self._split_volume(volumen["leyes"], nombres)
+            if indices is None:
+                return None
+            volumenes.append({"numero": volumen["numero"], "indices": indices})
+
+        compacted = dict(doc)
+        compacted["leyes_seleccionadas"] = {
+            key: value for key, value in leyes.items() if key != "items"
+        }
+        compacted["leyes_seleccionadas"]["ley_ids"] = ley_ids
+        compacted["leyes_seleccionadas"]["precios"] = [item["precio"] for item in items]
+        compacted["agrupamiento_volumenes"] = {**agrupamiento, "volumenes": volumenes}
+        return compacted
+
+    # --- Lectura ---
+
+    def expand(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Documento en formato de la API (los expandidos se devuelven tal cual)"""
+        if not self.is_compact(doc):
+            return doc
+
+        leyes = doc["leyes_seleccionadas"]
+        items = []
+        for ley_id, precio in zip(leyes["ley_ids"], leyes["precios"]):
+            ley = self.catalog.get(ley_id) or {}
+            items.append({
+                "nombre": ley.get("nombre", LEY_NO_DISPONIBLE),
+                "grosor": ley.get("grosor", ""),
+                "precio": precio
+            })
+
+        expanded = dict(doc)
+        expanded["leyes_seleccionadas"] = {
+            key: value for key, value in leyes.items() if key not in ("ley_ids", "precios")
+        }
+        expanded["leyes_seleccionadas"]["items"] = items
+
+        agrupamiento = doc.get("agrupamiento_volumenes")
+        if agrupamiento is not None:
+            expanded["agrupamiento_volumenes"] = {
+                **agrupamiento,
+                "volumenes": [
+                    {
+                        "numero": volumen["numero"],
+                        "leyes": SEPARADOR_VOLUMEN.join(items[i]["nombre"] for i in volumen["indices"])
+                    } if "indices" in volumen else volumen
+                    for volumen in agrupamiento.get("volumenes", [])
+                ]
+            }
+        return expanded
+
+    def ley_ids(self, doc: Dict[str, Any]) -> List[Optional[ObjectId]]:
+        """Id de catálogo de cada item (por nombre en las expandidas; None si ya no existe)"""
+        leyes = doc.get("leyes_seleccionadas") or {}
+        if self.is_compact(doc):
+            return list(leyes["ley_ids"])
+        ids = []
+        for item in leyes.get("items", []):
+            ley = self.catalog.find_by_name(item["nombre"])
+            ids.append(ley["_id"] if ley else None)
+        return ids
+
+    def expand_references(self, ley_id: ObjectId) -> int:
+        """
+        Expande en sitio las cotizaciones compactas que referencian una ley
+
+        Se llama antes de renombrar o eliminar la ley. Returns: cotizaciones reescritas.
+        """
+        reescritas = 0
+        for collection in self.collections:
+            for doc in collection.find({"leyes_seleccionadas.ley_ids": ley_id}):
+                expanded = self.expand(doc)
+                collection.update_one(
+                    {"_id": doc["_id"]},
+                    {"$set": {
+                        "leyes_seleccionadas": expanded["leyes_seleccionadas"],
+                        "agrupamiento_volumenes": expanded["agrupamiento_volumenes"]
+                    }}
+                )
+                reescritas += 1
+        return reescritas
@@ -0,0 +1,279 @@
+import asyncio
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
+
+if TYPE_CHECKING:
+    from services.sync_service import SyncService
+
+# Intervalo del modo polling (mongod standalone, sin change streams)
+COTIZACIONES_POLL_INTERVAL_SECONDS = float(os.getenv("COTIZACIONES_POLL_INTERVAL_SECONDS", "3"))
+# Mensajes pendientes por suscriptor antes de descartar los más antiguos
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Campos que pueden estar en formato compacto y deben expandirse antes de enviarse
+DECODED_FIELDS = ("leyes_seleccionadas", "agrupamiento_volumenes")
+# Campos que cambian al pasar una cotización al archivo (ver ArchiveService)
+ARCHIVE_FIELDS = ("fecha_archivo", "sync_version", "updated_at")
+
+
+def serialize_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte un documento de Mongo a JSON (ObjectId -> str, datetime -> ISO)"""
+    return jsonable_encoder(doc, custom_encoder={ObjectId: str})
+
+
+class CotizacionesChangeFeed:
+    """
+    Difunde los cambios de la colección de cotizaciones como deltas pequeños
+
+    Un único hilo por proceso escucha el change stream de Mongo y reparte
+    cada cambio a las colas asyncio de los dashboards conectados. Si el
+    servidor es un mongod standalone sin replica set, cada pocos segundos
+    lee solo lo que cambió: cotizaciones con `sync_version` mayor que la
+    última vista y lápidas de borrado (ver SyncService). El cursor avanza
+    hasta `committed_version()`, así que una escritura que se confirma tarde
+    no se pierde; lo ya publicado por encima del cursor no se repite.
+
+    Archivar una cotización la borra de la colección activa, pero sigue
+    existiendo: en ambos modos se anuncia como un update con `fecha_archivo`
+    y no como un delete. En modo change stream se escucha además el borrado
+    de cotizaciones archivadas.
+
+    Deltas:
+        {"tipo": "insert", "id": ..., "cotizacion": {...}}
+        {"tipo": "update", "id": ..., "campos": {"estado": ..., "fecha_entrega": ...}}
+        {"tipo": "update", "id": ..., "campos": {"fecha_archivo": ..., ...}}   (archivada)
+        {"tipo": "upsert", "id": ..., "cotizacion": {...}}   (polling: nueva o modificada)
+        {"tipo": "delete", "id": ...}
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        sync_service: "SyncService",
+        poll_interval: float = COTIZACIONES_POLL_INTERVAL_SECONDS,
+        decode: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        coleccion: str = "cotizaciones",
+        archive_collection: Optional[Collection] = None
+    ):
+        self.collection = collection
+        self.archive_collection = archive_collection
+        self.sync_service = sync_service
+        # Nombre de la colección en las lápidas de SyncService
+        self.coleccion = coleccion
+        self.decode = decode or (lambda doc: doc)
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None
+        self._subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # --- Suscripciones ---
+
+    def subscribe(self) -> asyncio.Queue:
+        """Registra un suscriptor en el event loop actual"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="cotizaciones-feed", daemon=True)
+                self._thread.start()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = {(loop, q) for loop, q in self._subscribers if q is not queue}
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def stop(self):
+        self._stop.set()
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, delta: Dict[str, Any]):
+        if queue.full():
+            # El cliente va atrasado: descartar lo más antiguo antes que bloquear al resto
+            queue.get_nowait()
+        queue.put_nowait(delta)
+
+    def publish(self, delta: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, delta)
+            except RuntimeError:
+                # El event loop del suscriptor ya se cerró
+                self.unsubscribe(queue)
+
+    # --- Origen de los cambios ---
+
+    def _run(self):
+        try:
+            self.mode = "change_stream"
+            self._watch()
+        except (OperationFailure, NotImplementedError, TypeError, AttributeError) as e:
+            print(f"⚠️ Change streams no disponibles ({str(e)[:80]}). Usando polling cada {self.poll_interval}s")
+            self.mode = "polling"
+            self._poll()
+        except Exception as e:
+            print(f"❌ Error en el feed de cotizaciones: {str(e)}")
+            self.mode = None
+
+    def _watch(self):
+        resume_token = None
+        while not self._stop.is_set():
+            try:
+                with self._source().watch(
+                    pipeline=self._pipeline(),
+                    full_document="updateLookup",
+                    resume_after=resume_token,
+                    max_await_time_ms=1000
+                ) as stream:
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        resume_token = stream.resume_token
+                        delta = self._delta_from_change(change)
+                        if delta:
+                            self.publish(delta)
+            except OperationFailure:
+                if resume_token is None:
+                    raise
+                # Token de reanudación caducado: seguir desde ahora
+                resume_token = None
+            except PyMongoError as e:
+                print(f"⚠️ Change stream interrumpido: {str(e)}. Reconectando...")
+                time.sleep(1)
+
+    def _source(self):
+        # Con archivo se escucha la base de datos completa, filtrada por _pipeline
+        return self.collection if self.archive_collection is None else self.collection.database
+
+    def _pipeline(self) -> List[Dict[str, Any]]:
+        if self.archive_collection is None:
+            return []
+        return [{"$match": {"$or": [
+            {"ns.coll": self.collection.name},
+            {"ns.coll": self.archive_collection.name, "operationType": "delete"}
+        ]}}]
+
+    @staticmethod
+    def _archived_delta(doc: Dict[str, Any]) -> Dict[str, Any]:
+        campos = {name: doc.get(name) for name in ARCHIVE_FIELDS}
+        return {"tipo": "update", "id": str(doc["_id"]), "campos": serialize_document(campos)}
+
+    def _top_level_fields(self, campos: Dict[str, Any], full_document: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Campos de primer nivel para el delta de un update
+
+        Mongo informa los `$set` anidados con rutas con punto
+        ("opcion_pago.valor_cuota"). El dashboard mezcla el delta con un
+        spread superficial, así que cada campo tocado por una ruta se
+        reemplaza por su valor completo tomado de `fullDocument` (expandido,
+        por si está en formato compacto).
+        """
+        touched = {key.split(".")[0] for key in campos if "." in key}
+        touched.update(name for name in DECODED_FIELDS if name in campos)
+        if not touched:
+            return campos
+        campos = {key: value for key, value in campos.items() if key.split(".")[0] not in touched}
+        if not full_document:
+            # El documento ya no existe (llegará su delete): sin valor completo no se envían las rutas
+            return campos
+        expanded = self.decode(full_document)
+        for name in touched:
+            campos[name] = expanded.get(name)
+        return campos
+
+    def _delta_from_change(self, change: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        operation = change.get("operationType")
+        doc_id = str(change.get("documentKey", {}).get("_id"))
+
+        if operation == "insert":
+            return {"tipo": "insert", "id": doc_id, "cotizacion": serialize_document(self.decode(change["fullDocument"]))}
+        if operation == "update":
+            description = change.get("updateDescription", {})
+            campos = dict(description.get("updatedFields", {}))
+            for field in description.get("removedFields", []):
+                campos[field] = None
+            campos = self._top_level_fields(campos, change.get("fullDocument"))
+            return {"tipo": "update", "id": doc_id, "campos": serialize_document(campos)}
+        if operation == "replace":
+            return {"tipo": "update", "id": doc_id, "campos": serialize_document(self.decode(change.get("fullDocument") or {}))}
+        if operation == "delete":
+            archivada = None
+            if self.archive_collection is not None and change.get("ns", {}).get("coll") == self.collection.name:
+                # Borrada de la colección activa tras copiarse al archivo: sigue existiendo
+                archivada = self.archive_collection.find_one({"_id": change["documentKey"]["_id"]}, dict.fromkeys(ARCHIVE_FIELDS, 1))
+            if archivada:
+                return self._archived_delta(archivada)
+            return {"tipo": "delete", "id": doc_id}
+        return None
+
+    def _poll(self):
+        desde: Optional[int] = None
+        # (clave, versión) ya publicadas por encima de `desde`
+        publicados: Set[Tuple[Any, int]] = set()
+        while not self._stop.is_set():
+            if not self._subscribers:
+                # Sin dashboards conectados no se consulta la base de datos
+                desde = None
+                publicados.clear()
+                self._stop.wait(self.poll_interval)
+                continue
+
+            try:
+                confirmada = self.sync_service.committed_version()
+                if desde is None:
+                    desde = confirmada
+                for delta in self._changes(desde, publicados):
+                    self.publish(delta)
+                if confirmada > desde:
+                    desde = confirmada
+                    publicados = {(clave, version) for clave, version in publicados if version > desde}
+            except PyMongoError as e:
+                print(f"⚠️ Error en el polling de cotizaciones: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+    def _changes(self, desde: int, publicados: Set[Tuple[Any, int]]) -> List[Dict[str, Any]]:
+        """Deltas de las escrituras y borrados con versión mayor que `desde` aún no publicados"""
+        deltas = []
+        for doc in self.collection.find({"sync_version": {"$gt": desde}}).sort("sync_version", 1):
+            clave = (doc["_id"], doc["sync_version"])
+            if clave in publicados:
+                continue
+            publicados.add(clave)
+            deltas.append({"tipo": "upsert", "id": str(doc["_id"]), "cotizacion": serialize_document(self.decode(doc))})
+
+        if self.archive_collection is not None:
+            for doc in self.archive_collection.find(
+                {"sync_version": {"$gt": desde}},
+                dict.fromkeys(ARCHIVE_FIELDS, 1)
+            ).sort("sync_version", 1):
+                clave = (doc["_id"], doc["sync_version"])
+                if clave in publicados:
+                    continue
+                publicados.add(clave)
+                deltas.append(self._archived_delta(doc))
+
+        for tombstone in self.sync_service.tombstones_collection.find(
+            {"coleccion": self.coleccion, "sync_version": {"$gt": desde}},
+            {"doc_id": 1, "sync_version": 1}
+        ).sort("sync_version", 1):
+            clave = (tombstone["_id"], tombstone["sync_version"])
+            if clave in publicados:
+                continue
+            publicados.add(clave)
+            deltas.append({"tipo": "delete", "id": tombstone["doc_id"]})
+        return deltas
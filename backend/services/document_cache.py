@@ -0,0 +1,94 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Límites de cada caché de documentos (lo que se alcance primero)
+CACHE_DOCUMENTOS_MAX_ITEMS = int(os.getenv("CACHE_DOCUMENTOS_MAX_ITEMS", "2000"))
+CACHE_DOCUMENTOS_MAX_BYTES = int(os.getenv("CACHE_DOCUMENTOS_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+class DocumentCache:
+    """
+    Caché LRU de documentos ya serializados (JSON) por id
+
+    Guarda la respuesta final de los endpoints de detalle para servirla sin
+    consultar Mongo ni volver a validar/serializar. Se limita por cantidad
+    de documentos y por bytes; al superar cualquiera de los dos se descartan
+    los menos usados. Las rutas de escritura llaman a `evict` (a través del
+    bus de invalidación, para alcanzar a todos los workers).
+    """
+
+    def __init__(self, name: str, max_items: int = CACHE_DOCUMENTOS_MAX_ITEMS, max_bytes: int = CACHE_DOCUMENTOS_MAX_BYTES):
+        self.name = name
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Aumenta con cada `evict`: una lectura que empezó antes no debe guardar un documento viejo
+        self.generation = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: str, body: bytes, generation: Optional[int] = None):
+        """
+        Guarda un documento serializado
+
+        Args:
+            key: Id del documento
+            body: JSON de la respuesta
+            generation: `self.generation` leído antes de consultar Mongo; si hubo una invalidación desde entonces no se guarda
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while len(self._entries) > self.max_items or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def evict(self, key: Optional[str] = None):
+        """Descarta un documento, o todos si `key` es None"""
+        with self._lock:
+            self.generation += 1
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            body = self._entries.pop(key, None)
+            if body is not None:
+                self._bytes -= len(body)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "nombre": self.name,
+                "documentos": len(self._entries),
+                "bytes": self._bytes,
+                "max_documentos": self.max_items,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.hits,
+                "fallos": self.misses,
+                "tasa_aciertos": round(self.hits / total, 4) if total else 0.0,
+                "descartes": self.evictions
+            }
@@ -1,7 +1,9 @@
 import os
+import asyncio
 import resend
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from dotenv import load_dotenv
+from services.template_service import TemplateService
 
 # Forzar recarga del archivo .env
 import dotenv
@@ -12,6 +14,20 @@ load_dotenv(dotenv_path, override=True)
 api_key = os.getenv("RESEND_API_KEY")
 resend.api_key = api_key
 
+# Permite apuntar el SDK a un servidor Resend local (ver fake_resend_server.py)
+if os.getenv("RESEND_API_URL"):
+    resend.api_url = os.getenv("RESEND_API_URL")
+
+DEFAULT_SENDER = "LeyesVzla <onboarding@resend.dev>"
+QUOTATION_SENDER = "LeyesVzla <noreply@leyesvzla.com>"
+
+# Resend acepta como máximo 100 emails por petición batch
+RESEND_BATCH_SIZE = 100
+RESEND_BATCH_CONCURRENCY = int(os.getenv("RESEND_BATCH_CONCURRENCY", "4"))
+# Errores de validación de un lote (p. ej. una dirección rechazada): se reintenta
+# cada mensaje por separado. Con el resto (401, 429, 5xx, red) fallarían todos igual
+RESEND_CODIGOS_REINTENTO_INDIVIDUAL = ("400", "422")
+
 # Debug: Mostrar información de la API key al cargar
 
 
@@ -34,7 +50,7 @@ class EmailService:
             print(f"📧 API Key configurada: {resend.api_key[:10] if resend.api_key else 'NO CONFIGURADA'}...")
             
             result = resend.Emails.send({
-                "from": "LeyesVzla <onboarding@resend.dev>",  # Usar dominio de prueba de Resend
+                "from": DEFAULT_SENDER,  # Usar dominio de prueba de Resend
                 "to": [to_email],
                 "subject": subject,
                 "html": html_content
@@ -48,6 +64,48 @@ class EmailService:
             print(f"📧 Tipo de error: {type(e).__name__}")
             return False
 
+    @staticmethod
+    def build_quotation_email(to_email: str, quotation_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Construye el mensaje de Resend para una cotización
+        
+        Args:
+            to_email: Email del destinatario
+            quotation_data: Datos de la cotización
+            
+        Returns:
+            Dict: Parámetros listos para resend.Emails.send o resend.Batch.send
+        """
+        # Extraer datos de la cotización
+        client_name = quotation_data.get("clientName", "Cliente")
+        client_email = quotation_data.get("clientEmail", "")
+        client_phone = quotation_data.get("clientPhone", "")
+        selected_laws = quotation_data.get("selectedLaws", [])
+        encuadernacion = quotation_data.get("encuadernacion", {})
+        total_cost = quotation_data.get("totalCost", 0)
+        payment_option = quotation_data.get("paymentOption", "")
+        created_at = quotation_data.get("createdAt", "")
+        
+        # Renderizar la plantilla compilada (los estilos y el pie ya vienen pre-renderizados)
+        html_content = TemplateService.render(
+            "email/cotizacion.html",
+            client_name=client_name,
+            client_email=client_email,
+            client_phone=client_phone,
+            selected_laws=selected_laws,
+            encuadernacion=encuadernacion,
+            total_cost=total_cost,
+            payment_option=payment_option,
+            created_at=created_at
+        )
+        
+        return {
+            "from": QUOTATION_SENDER,
+            "to": [to_email],
+            "subject": f"Cotización Legal - {client_name}",
+            "html": html_content
+        }
+
     @staticmethod
     def send_quotation_email(to_email: str, quotation_data: Dict[str, Any]) -> bool:
         """
@@ -61,114 +119,123 @@ class EmailService:
             bool: True si se envió correctamente, False en caso contrario
         """
         try:
-            # Extraer datos de la cotización
-            client_name = quotation_data.get("clientName", "Cliente")
-            client_email = quotation_data.get("clientEmail", "")
-            client_phone = quotation_data.get("clientPhone", "")
-            selected_laws = quotation_data.get("selectedLaws", [])
-            encuadernacion = quotation_data.get("encuadernacion", {})
-            total_cost = quotation_data.get("totalCost", 0)
-            payment_option = quotation_data.get("paymentOption", "")
-            created_at = quotation_data.get("createdAt", "")
-            
-            # Construir lista de leyes
-            laws_html = ""
-            if selected_laws:
-                laws_html = "<ul>"
-                for law in selected_laws:
-                    law_name = law.get("name", "Ley sin nombre")
-                    law_price = law.get("price", 0)
-                    laws_html += f"<li>{law_name} - ${law_price:,.2f}</li>"
-                laws_html += "</ul>"
-            else:
-                laws_html = "<p>No se seleccionaron leyes</p>"
-            
-            # Información de encuadernación
-            binding_html = ""
-            if encuadernacion:
-                binding_type = encuadernacion.get("type", "No especificado")
-                binding_cost = encuadernacion.get("cost", 0)
-                binding_html = f"""
-                <p><strong>Tipo:</strong> {binding_type}</p>
-                <p><strong>Costo:</strong> ${binding_cost:,.2f}</p>
-                """
-            else:
-                binding_html = "<p>Sin encuadernación</p>"
-            
-            # Crear contenido HTML del email
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <title>Cotización Legal - LeyesVzla</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                    .header {{ background-color: #dc2626; color: white; padding: 20px; text-align: center; }}
-                    .content {{ padding: 20px; background-color: #f9fafb; }}
-                    .section {{ margin-bottom: 20px; padding: 15px; background-color: white; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
-                    .total {{ background-color: #dc2626; color: white; padding: 15px; text-align: center; font-size: 1.2em; font-weight: bold; border-radius: 8px; }}
-                    .footer {{ text-align: center; padding: 20px; color: #6b7280; font-size: 0.9em; }}
-                    ul {{ padding-left: 20px; }}
-                    li {{ margin-bottom: 5px; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>LeyesVzla</h1>
-                        <p>Cotización Legal</p>
-                    </div>
-                    
-                    <div class="content">
-                        <div class="section">
-                            <h2>Información del Cliente</h2>
-                            <p><strong>Nombre:</strong> {client_name}</p>
-                            <p><strong>Email:</strong> {client_email}</p>
-                            <p><strong>Teléfono:</strong> {client_phone}</p>
-                            <p><strong>Fecha:</strong> {created_at}</p>
-                        </div>
-                        
-                        <div class="section">
-                            <h2>Leyes Seleccionadas</h2>
-                            {laws_html}
-                        </div>
-                        
-                        <div class="section">
-                            <h2>Encuadernación</h2>
-                            {binding_html}
-                        </div>
-                        
-                        <div class="section">
-                            <h2>Opción de Pago</h2>
-                            <p>{payment_option}</p>
-                        </div>
-                        
-                        <div class="total">
-                            Total: ${total_cost:,.2f}
-                        </div>
-                    </div>
-                    
-                    <div class="footer">
-                        <p>Gracias por confiar en LeyesVzla</p>
-                        <p>Para cualquier consulta, no dudes en contactarnos</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
             # Enviar email
-            result = resend.Emails.send({
-                "from": "LeyesVzla <noreply@leyesvzla.com>",
-                "to": [to_email],
-                "subject": f"Cotización Legal - {client_name}",
-                "html": html_content
-            })
+            result = resend.Emails.send(EmailService.build_quotation_email(to_email, quotation_data))
             
             return True
             
         except Exception as e:
             print(f"Error enviando cotización por email: {str(e)}")
             return False
+
+    @staticmethod
+    async def send_batch_emails(
+        messages: List[Dict[str, Any]],
+        batch_size: int = RESEND_BATCH_SIZE,
+        max_concurrency: int = RESEND_BATCH_CONCURRENCY
+    ) -> List[Dict[str, Any]]:
+        """
+        Envía muchos emails agrupándolos en peticiones batch de Resend
+        
+        Los mensajes se dividen en lotes de hasta `batch_size` (máximo 100 por
+        petición en Resend) y los lotes se envían en paralelo con, como mucho,
+        `max_concurrency` peticiones HTTP simultáneas. Las llamadas bloqueantes
+        del SDK se ejecutan en hilos para no bloquear el event loop.
+
+        Resend rechaza el lote completo si un mensaje no es válido: en ese caso
+        los mensajes del lote se reenvían de uno en uno (con la misma
+        concurrencia), y solo los rechazados quedan con estado "error".
+        
+        Args:
+            messages: Mensajes con "to", "subject", "html" y opcionalmente "from"
+            batch_size: Mensajes por petición batch
+            max_concurrency: Peticiones batch simultáneas
+            
+        Returns:
+            List[Dict]: Un resultado por mensaje, en el mismo orden:
+                {"to", "status": "enviado" | "error", "id", "error"}
+        """
+        batch_size = max(1, min(batch_size, RESEND_BATCH_SIZE))
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        chunks = [messages[i:i + batch_size] for i in range(0, len(messages), batch_size)]
+
+        async def send_one(p: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    response = await asyncio.to_thread(resend.Emails.send, p)
+                except Exception as e:
+                    print(f"❌ Error enviando email a {', '.join(p['to'])}: {str(e)}")
+                    return {"to": ", ".join(p["to"]), "status": "error", "id": None, "error": str(e)}
+            email_id = response.get("id") if isinstance(response, dict) else None
+            return {
+                "to": ", ".join(p["to"]),
+                "status": "enviado" if email_id else "error",
+                "id": email_id,
+                "error": None if email_id else "Resend no devolvió un ID para este mensaje"
+            }
+
+        async def send_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            params = []
+            for message in chunk:
+                to = message["to"] if isinstance(message["to"], list) else [message["to"]]
+                params.append({
+                    "from": message.get("from", DEFAULT_SENDER),
+                    "to": to,
+                    "subject": message["subject"],
+                    "html": message["html"]
+                })
+
+            error = None
+            async with semaphore:
+                try:
+                    response = await asyncio.to_thread(resend.Batch.send, params)
+                except Exception as e:
+                    print(f"❌ Error enviando lote de {len(params)} emails: {str(e)}")
+                    error = e
+
+            if error is not None:
+                if len(params) > 1 and str(getattr(error, "code", "")) in RESEND_CODIGOS_REINTENTO_INDIVIDUAL:
+                    # Un destinatario inválido no debe hacer fallar al resto del lote
+                    print(f"🔁 Reenviando individualmente los {len(params)} emails del lote rechazado")
+                    return list(await asyncio.gather(*(send_one(p) for p in params)))
+                return [
+                    {"to": ", ".join(p["to"]), "status": "error", "id": None, "error": str(error)}
+                    for p in params
+                ]
+
+            data = response.get("data", []) if isinstance(response, dict) else []
+            results = []
+            for index, p in enumerate(params):
+                email_id = data[index].get("id") if index < len(data) else None
+                results.append({
+                    "to": ", ".join(p["to"]),
+                    "status": "enviado" if email_id else "error",
+                    "id": email_id,
+                    "error": None if email_id else "Resend no devolvió un ID para este mensaje"
+                })
+            return results
+
+        chunk_results = await asyncio.gather(*(send_chunk(chunk) for chunk in chunks))
+        results = [result for chunk in chunk_results for result in chunk]
+
+        sent = sum(1 for r in results if r["status"] == "enviado")
+        print(f"📧 Envío batch completado: {sent}/{len(results)} emails enviados en {len(chunks)} lotes")
+        return results
+
+    @staticmethod
+    async def send_quotation_emails(recipients: List[Tuple[str, Dict[str, Any]]], **kwargs) -> List[Dict[str, Any]]:
+        """
+        Envía cotizaciones a varios destinatarios usando el API batch de Resend
+        
+        Args:
+            recipients: Pares (email destinatario, datos de la cotización)
+            **kwargs: batch_size / max_concurrency para send_batch_emails
+            
+        Returns:
+            List[Dict]: Estado de envío por destinatario
+        """
+        messages = [
+            EmailService.build_quotation_email(to_email, quotation_data)
+            for to_email, quotation_data in recipients
+        ]
+        return await EmailService.send_batch_emails(messages, **kwargs)
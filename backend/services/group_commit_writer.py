@@ -0,0 +1,131 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+from services.sync_service import SyncService
+
+# Agrupar las inserciones de cotizaciones simultáneas en un solo insert_many
+COTIZACIONES_GRUPO_COMMIT = os.getenv("COTIZACIONES_GRUPO_COMMIT", "false").lower() in ("1", "true", "si", "sí")
+# Documentos por insert_many (al llegar a este tamaño el lote se escribe sin esperar)
+GRUPO_COMMIT_MAX_LOTE = int(os.getenv("GRUPO_COMMIT_MAX_LOTE", "100"))
+# Espera máxima de la primera inserción de un lote antes de escribirlo
+GRUPO_COMMIT_LATENCIA_MS = float(os.getenv("GRUPO_COMMIT_LATENCIA_MS", "5"))
+
+
+def _truncate_datetimes(value: Any) -> Any:
+    """Fechas a milisegundos (la precisión de BSON), para que el documento local coincida con el guardado"""
+    if isinstance(value, datetime):
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            value[key] = _truncate_datetimes(item)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            value[index] = _truncate_datetimes(item)
+    return value
+
+
+class GroupCommitWriter:
+    """
+    Inserciones agrupadas (group commit) sobre una colección
+
+    Cada `insert` encola su documento y espera; el lote se escribe con un
+    único insert_many al cumplirse GRUPO_COMMIT_LATENCIA_MS desde la primera
+    inserción pendiente o al juntar GRUPO_COMMIT_MAX_LOTE documentos, lo que
+    ocurra antes. Las versiones de sincronización del lote se reservan con
+    una sola operación. Cada petición recibe su propio documento (con el
+    `_id` asignado por el driver) sin volver a leerlo, o la excepción de su
+    inserción: un documento rechazado no hace fallar al resto del lote.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        sync_service: Optional[SyncService] = None,
+        max_batch: int = GRUPO_COMMIT_MAX_LOTE,
+        max_latency_ms: float = GRUPO_COMMIT_LATENCIA_MS
+    ):
+        self.collection = collection
+        self.sync_service = sync_service
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max(0.0, max_latency_ms) / 1000
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writes: Set[asyncio.Task] = set()
+        # Escrituras realizadas y documentos insertados (para métricas y pruebas)
+        self.batches = 0
+        self.documents = 0
+
+    async def insert(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Inserta `doc` en el próximo lote
+
+        Returns:
+            Dict[str, Any]: El mismo documento, con `_id` y (si hay SyncService) `sync_version` y `updated_at`
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((doc, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_latency, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_latency, self._flush)
+        if batch:
+            # Guardar la referencia: una tarea sin referencias puede ser recolectada a mitad
+            task = asyncio.ensure_future(self._write(batch))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        docs = [doc for doc, _ in batch]
+        try:
+            errors = await asyncio.to_thread(self._insert_many, docs)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for index, (doc, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(doc)
+
+    def _insert_many(self, docs: List[Dict[str, Any]]) -> Dict[int, Exception]:
+        """Escribe el lote; devuelve el error de cada documento rechazado (por posición)"""
+        if self.sync_service is not None:
+            first = self.sync_service.reserve_versions(len(docs))
+            now = datetime.utcnow()
+            for offset, doc in enumerate(docs):
+                doc["sync_version"] = first + offset
+                doc["updated_at"] = now
+        for doc in docs:
+            _truncate_datetimes(doc)
+
+        self.batches += 1
+        try:
+            # ordered=False: un documento rechazado no impide insertar los siguientes
+            self.collection.insert_many(docs, ordered=False)
+            self.documents += len(docs)
+            return {}
+        except BulkWriteError as e:
+            errors = {}
+            for error in e.details.get("writeErrors", []):
+                error_class = DuplicateKeyError if error.get("code") == 11000 else WriteError
+                errors[error["index"]] = error_class(error.get("errmsg", "Error al insertar"), error.get("code"), error)
+            self.documents += len(docs) - len(errors)
+            return errors
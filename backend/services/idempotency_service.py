@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from pymongo.collection import Collection
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Tiempo que se conserva una clave (los reintentos llegan en segundos/minutos)
+IDEMPOTENCIA_TTL_SEGUNDOS = int(os.getenv("IDEMPOTENCIA_TTL_SEGUNDOS", "86400"))
+# Respuestas completadas que se sirven desde memoria sin consultar Mongo
+IDEMPOTENCIA_CACHE_SIZE = int(os.getenv("IDEMPOTENCIA_CACHE_SIZE", "1000"))
+IDEMPOTENCIA_MAX_KEY_LENGTH = 255
+# Tiempo que una petición en curso conserva la clave; vencido, un reintento la retoma
+# (la petición original se cayó entre reservar la clave y guardar la respuesta)
+IDEMPOTENCIA_LEASE_SEGUNDOS = int(os.getenv("IDEMPOTENCIA_LEASE_SEGUNDOS", "60"))
+
+ESTADO_EN_PROCESO = "en_proceso"
+ESTADO_COMPLETADO = "completado"
+
+
+class IdempotencyConflict(Exception):
+    """La clave ya se usó con otro cuerpo o su primera petición sigue en curso"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class IdempotencyService:
+    """
+    Soporte para la cabecera `Idempotency-Key`
+
+    La primera petición con una clave reserva el documento (`_id` = ámbito +
+    clave, inserción atómica) y al terminar guarda el código y el cuerpo de
+    la respuesta. Los reintentos con la misma clave y el mismo cuerpo reciben
+    la respuesta guardada sin volver a escribir ni notificar; las respuestas
+    completadas recientes se guardan además en memoria, de modo que una
+    ráfaga de reintentos no llega a Mongo. Un índice TTL limpia las claves.
+
+    La reserva guarda el id del recurso que la petición va a crear y un
+    lease: si la petición original se cae antes de `complete`, un reintento
+    con el lease vencido retoma la clave con el mismo id, de modo que crear
+    el recurso otra vez choca con el `_id` existente en lugar de duplicarlo.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        ttl_seconds: int = IDEMPOTENCIA_TTL_SEGUNDOS,
+        cache_size: int = IDEMPOTENCIA_CACHE_SIZE,
+        lease_seconds: int = IDEMPOTENCIA_LEASE_SEGUNDOS
+    ):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self.lease_seconds = lease_seconds
+        self._cache: "OrderedDict[str, Tuple[float, str, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ensure_indexes(self):
+        try:
+            self.collection.create_index("fecha_creacion", expireAfterSeconds=self.ttl_seconds)
+        except Exception as e:
+            print(f"⚠️ Error creando índice TTL de idempotencia: {str(e)}")
+
+    @staticmethod
+    def request_hash(payload: Dict[str, Any]) -> str:
+        """Hash estable del cuerpo de la petición"""
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _doc_id(scope: str, key: str) -> str:
+        return f"{scope}:{key}"
+
+    def _check_hash(self, stored_hash: str, request_hash: str):
+        if stored_hash != request_hash:
+            raise IdempotencyConflict(422, "La clave de idempotencia ya se usó con un cuerpo distinto")
+
+    def _remember(self, doc_id: str, request_hash: str, status_code: int, body: Any):
+        with self._lock:
+            self._cache[doc_id] = (time.monotonic(), request_hash, status_code, body)
+            self._cache.move_to_end(doc_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def begin(self, scope: str, key: str, request_hash: str, resource_id: str) -> Tuple[Optional[Tuple[int, Any]], str]:
+        """
+        Reserva la clave o devuelve la respuesta guardada
+
+        Args:
+            resource_id: Id que usará el recurso creado por esta petición
+
+        Returns:
+            Tuple: ((código, cuerpo), id) si es un reintento de una petición completada;
+            (None, id) si la petición debe procesarse creando el recurso con ese id
+            (el propio, o el de la petición original si se retomó su clave)
+
+        Raises:
+            IdempotencyConflict: Cuerpo distinto (422) o petición original aún en curso (409)
+        """
+        if not key or len(key) > IDEMPOTENCIA_MAX_KEY_LENGTH:
+            raise IdempotencyConflict(400, f"Idempotency-Key debe tener entre 1 y {IDEMPOTENCIA_MAX_KEY_LENGTH} caracteres")
+
+        doc_id = self._doc_id(scope, key)
+        with self._lock:
+            cached = self._cache.get(doc_id)
+            if cached and time.monotonic() - cached[0] > self.ttl_seconds:
+                del self._cache[doc_id]
+                cached = None
+        if cached:
+            self._check_hash(cached[1], request_hash)
+            return (cached[2], cached[3]), None
+
+        now = datetime.utcnow()
+        lease = now + timedelta(seconds=self.lease_seconds)
+        try:
+            self.collection.insert_one({
+                "_id": doc_id,
+                "hash": request_hash,
+                "estado": ESTADO_EN_PROCESO,
+                "recurso_id": resource_id,
+                "lease_hasta": lease,
+                "fecha_creacion": now
+            })
+            return None, resource_id
+        except DuplicateKeyError:
+            pass
+
+        existing = self.collection.find_one({"_id": doc_id})
+        if existing is None:
+            # Expiró entre la inserción y la lectura: tratar como nueva
+            return self.begin(scope, key, request_hash, resource_id)
+        self._check_hash(existing["hash"], request_hash)
+        if existing["estado"] != ESTADO_COMPLETADO:
+            # Retomar la clave solo si el lease venció (un único reintento lo consigue)
+            taken = self.collection.find_one_and_update(
+                {"_id": doc_id, "estado": ESTADO_EN_PROCESO, "lease_hasta": {"$lt": now}},
+                {"$set": {"lease_hasta": lease}},
+                return_document=ReturnDocument.AFTER
+            )
+            if taken is None:
+                raise IdempotencyConflict(409, "Hay una petición con esta clave de idempotencia en curso")
+            print(f"♻️ Clave de idempotencia '{key}' retomada tras vencer su lease")
+            return None, taken.get("recurso_id") or resource_id
+
+        self._remember(doc_id, existing["hash"], existing["status_code"], existing["respuesta"])
+        return (existing["status_code"], existing["respuesta"]), None
+
+    def complete(self, scope: str, key: str, request_hash: str, status_code: int, body: Any):
+        """Guarda la respuesta de la petición original"""
+        doc_id = self._doc_id(scope, key)
+        self.collection.update_one(
+            {"_id": doc_id},
+            {"$set": {"estado": ESTADO_COMPLETADO, "status_code": status_code, "respuesta": body}}
+        )
+        self._remember(doc_id, request_hash, status_code, body)
+
+    def release(self, scope: str, key: str):
+        """
+        Libera la clave si la petición falló sin crear el recurso, para que el
+        cliente pueda reintentar. Si el recurso ya se creó no debe llamarse: la
+        clave se conserva y un reintento tras el lease lo recupera.
+        """
+        self.collection.delete_one({"_id": self._doc_id(scope, key), "estado": ESTADO_EN_PROCESO})
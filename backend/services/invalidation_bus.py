@@ -0,0 +1,186 @@
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.collection import Collection
+
+# Tamaño de la colección capped de eventos (los más antiguos se sobrescriben)
+INVALIDACION_TAMANO_BYTES = int(os.getenv("INVALIDACION_TAMANO_BYTES", str(1024 * 1024)))
+# Espera máxima del cursor tailable por evento nuevo
+INVALIDACION_ESPERA_MS = int(os.getenv("INVALIDACION_ESPERA_MS", "1000"))
+# Intervalo del modo polling (sin colección capped, p. ej. mongomock)
+INVALIDACION_POLL_SEGUNDOS = float(os.getenv("INVALIDACION_POLL_SEGUNDOS", "0.5"))
+# Retención de eventos en el modo polling (índice TTL)
+INVALIDACION_RETENCION_SEGUNDOS = 3600
+# Margen del modo polling para eventos con reloj desfasado entre servidores
+MARGEN_POLL = timedelta(seconds=5)
+
+CANAL_LEYES = "leyes"
+CANAL_COTIZACIONES = "cotizaciones"
+CANAL_ENCUADERNACION = "encuadernacion"
+CANAL_PLANES_PAGO = "planes_pago"
+CANAL_TELEGRAM = "telegram_destinatarios"
+
+# Evento interno que abre la colección capped (un cursor tailable sobre una colección vacía muere al instante)
+CANAL_INICIO = "_inicio"
+
+Handler = Callable[[Optional[str]], None]
+
+
+class InvalidationBus:
+    """
+    Bus de invalidación de cachés entre workers
+
+    Las rutas de escritura publican `(canal, clave)` en una colección capped
+    de Mongo; cada proceso la sigue con un cursor tailable (await) en un hilo
+    y, por cada evento de otro proceso, ejecuta los handlers del canal para
+    vaciar sus cachés locales. El proceso que publica invalida en el momento,
+    sin esperar a su propio evento.
+
+    Si la colección no puede ser capped (mongomock) se usa una colección
+    normal con índice TTL y se consulta cada INVALIDACION_POLL_SEGUNDOS. Cada
+    vez que el cursor se reabre tras un error se invalidan todos los canales,
+    porque pudieron perderse eventos mientras tanto. Los handlers deben ser
+    idempotentes y rápidos.
+    """
+
+    def __init__(self, collection: Collection, poll_interval: float = INVALIDACION_POLL_SEGUNDOS):
+        self.collection = collection
+        self.poll_interval = poll_interval
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.mode: Optional[str] = None
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def ensure_collection(self):
+        db = self.collection.database
+        try:
+            if self.collection.name not in db.list_collection_names():
+                db.create_collection(self.collection.name, capped=True, size=INVALIDACION_TAMANO_BYTES)
+            capped = bool(self.collection.options().get("capped"))
+        except Exception as e:
+            print(f"⚠️ No se pudo crear la colección capped de invalidación: {str(e)}")
+            capped = False
+
+        try:
+            if capped:
+                if self.collection.find_one() is None:
+                    self.collection.insert_one(self._event(CANAL_INICIO, None))
+                self.mode = "tailable"
+            else:
+                self.collection.create_index("fecha", expireAfterSeconds=INVALIDACION_RETENCION_SEGUNDOS)
+                self.mode = "polling"
+            print(f"📡 Bus de invalidación en modo {self.mode} ({self.origin})")
+        except Exception as e:
+            print(f"⚠️ Error preparando el bus de invalidación: {str(e)}")
+
+    # --- Publicación y suscripción ---
+
+    def subscribe(self, canal: str, handler: Handler):
+        """Registra un handler local; recibe la clave del evento (None = todo el canal)"""
+        self._handlers.setdefault(canal, []).append(handler)
+
+    def _event(self, canal: str, clave: Optional[str]) -> Dict[str, Any]:
+        return {"canal": canal, "clave": clave, "origen": self.origin, "fecha": datetime.now()}
+
+    def publish(self, canal: str, clave: Optional[str] = None):
+        """
+        Invalida en este proceso y avisa al resto
+
+        Un fallo al escribir el evento no interrumpe la escritura que lo
+        origina: los demás workers se ponen al día al vencer el TTL de sus cachés.
+        """
+        self._dispatch(canal, clave)
+        try:
+            self.collection.insert_one(self._event(canal, clave))
+        except Exception as e:
+            print(f"⚠️ Error publicando invalidación '{canal}': {str(e)}")
+
+    def _dispatch(self, canal: str, clave: Optional[str]):
+        for handler in self._handlers.get(canal, []):
+            try:
+                handler(clave)
+            except Exception as e:
+                print(f"⚠️ Error invalidando caché '{canal}': {str(e)}")
+
+    def _dispatch_all(self):
+        for canal in list(self._handlers):
+            self._dispatch(canal, None)
+
+    def _receive(self, event: Dict[str, Any]):
+        if event.get("origen") != self.origin and event.get("canal") != CANAL_INICIO:
+            self._dispatch(event["canal"], event.get("clave"))
+
+    # --- Hilo suscriptor ---
+
+    def start(self):
+        if self.mode is None or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        target = self._tail if self.mode == "tailable" else self._poll
+        self._thread = threading.Thread(target=target, name="bus-invalidacion", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _last_id(self) -> Optional[ObjectId]:
+        last = self.collection.find_one({}, sort=[("$natural", -1)])
+        return last["_id"] if last else None
+
+    def _tail(self):
+        # Los eventos se leen en orden natural (de inserción); los anteriores
+        # a `ultimo` ya se aplicaron y se saltan al (re)abrir el cursor
+        ultimo = None
+        primera_vez = True
+        while not self._stop.is_set():
+            try:
+                if primera_vez:
+                    ultimo = self._last_id()
+                elif ultimo is not None and self.collection.find_one({"_id": ultimo}, {"_id": 1}) is None:
+                    # El último evento visto ya fue sobrescrito: aplicar todo lo que quede
+                    ultimo = None
+                if not primera_vez:
+                    self._dispatch_all()
+                primera_vez = False
+
+                cursor = self.collection.find(
+                    {},
+                    cursor_type=CursorType.TAILABLE_AWAIT,
+                    max_await_time_ms=INVALIDACION_ESPERA_MS
+                )
+                saltando = ultimo is not None
+                while cursor.alive and not self._stop.is_set():
+                    for event in cursor:
+                        if saltando:
+                            saltando = event["_id"] != ultimo
+                            continue
+                        self._receive(event)
+                        ultimo = event["_id"]
+                        if self._stop.is_set():
+                            break
+            except Exception as e:
+                print(f"⚠️ Cursor del bus de invalidación interrumpido: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+    def _poll(self):
+        desde = datetime.now()
+        vistos: Dict[ObjectId, datetime] = {}
+        while not self._stop.wait(self.poll_interval):
+            try:
+                for event in self.collection.find({"fecha": {"$gte": desde - MARGEN_POLL}}).sort("fecha", 1):
+                    if event["_id"] in vistos:
+                        continue
+                    vistos[event["_id"]] = event["fecha"]
+                    self._receive(event)
+                    desde = max(desde, event["fecha"])
+                # Olvidar los eventos que ya quedaron fuera de la ventana
+                limite = desde - MARGEN_POLL
+                vistos = {event_id: fecha for event_id, fecha in vistos.items() if fecha >= limite}
+            except Exception as e:
+                print(f"⚠️ Error consultando el bus de invalidación: {str(e)}")
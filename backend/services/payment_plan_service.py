@@ -0,0 +1,142 @@
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+from pymongo.collection import Collection
+
+# Segundos que se reutilizan los planes activos en memoria
+PLANES_PAGO_TTL_SEGUNDOS = float(os.getenv("PLANES_PAGO_TTL_SEGUNDOS", "300"))
+# Planes sembrados si la colección está vacía (los que traía el panel de administración)
+PLANES_PAGO_POR_DEFECTO = [int(n) for n in os.getenv("PLANES_PAGO_POR_DEFECTO", "1,2,3,4").split(",") if n.strip()]
+# Rechazar en POST /cotizaciones opciones de pago que no correspondan a un plan activo
+PLANES_PAGO_VALIDAR = os.getenv("PLANES_PAGO_VALIDAR", "true").lower() in ("1", "true", "si", "sí")
+
+# Diferencia admitida entre la cuota recibida y la calculada
+TOLERANCIA_CUOTA = 0.01
+
+
+def plan_name(cantidad_cuotas: int) -> str:
+    return "contado" if cantidad_cuotas == 1 else f"{cantidad_cuotas} cuotas"
+
+
+class PaymentPlanService:
+    """
+    Planes de pago configurables (cantidad de cuotas) y cálculo de cuotas
+
+    Los planes viven en Mongo y los activos se mantienen en memoria hasta
+    que vence el TTL o una escritura llama a `invalidate()`. La cuota de un
+    plan es `ceil(total / cuotas)`, igual que el cálculo del navegador, de
+    modo que las cotizaciones creadas desde el frontend validan sin
+    diferencias de redondeo.
+    """
+
+    def __init__(self, collection: Collection, ttl_seconds: float = PLANES_PAGO_TTL_SEGUNDOS):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self._active: List[Dict[str, Any]] = []
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def ensure_indexes(self):
+        try:
+            self.collection.create_index("cantidad_cuotas", unique=True)
+            self.seed_defaults()
+        except Exception as e:
+            print(f"⚠️ Error creando índices de planes de pago: {str(e)}")
+
+    def seed_defaults(self):
+        """
+        Siembra PLANES_PAGO_POR_DEFECTO si la colección está vacía
+
+        Se llama al arrancar y al cargar la caché, para que una base de datos
+        nueva (o una app montada sin lifespan, como el benchmark) no rechace
+        todas las cotizaciones. Los upserts hacen que varios workers puedan
+        sembrar a la vez sin duplicar planes.
+        """
+        if self.collection.count_documents({}, limit=1) > 0:
+            return
+        ahora = datetime.now()
+        creados = 0
+        for cuotas in PLANES_PAGO_POR_DEFECTO:
+            result = self.collection.update_one(
+                {"cantidad_cuotas": cuotas},
+                {"$setOnInsert": {
+                    "nombre": plan_name(cuotas),
+                    "activo": True,
+                    "fecha_creacion": ahora,
+                    "fecha_actualizacion": ahora
+                }},
+                upsert=True
+            )
+            creados += result.upserted_id is not None
+        if creados:
+            print(f"💳 Planes de pago por defecto creados: {PLANES_PAGO_POR_DEFECTO}")
+
+    # --- Caché ---
+
+    def _load(self):
+        self.seed_defaults()
+        self._active = list(self.collection.find({"activo": True}).sort("cantidad_cuotas", 1))
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def active_plans(self) -> List[Dict[str, Any]]:
+        """Planes activos ordenados por cantidad de cuotas"""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+            with self._lock:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+                    self._load()
+        return self._active
+
+    # --- Cálculo ---
+
+    @staticmethod
+    def installment(total: float, cantidad_cuotas: int) -> float:
+        return float(math.ceil(total / cantidad_cuotas))
+
+    def calculate(self, totales: Sequence[float], cantidades_cuotas: Optional[Sequence[int]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Opciones de pago para muchos totales en una sola pasada
+
+        Args:
+            totales: Totales a financiar
+            cantidades_cuotas: Planes a calcular (por defecto, los activos)
+
+        Returns:
+            List[List[Dict]]: Por cada total, una opción (tipo, valor_cuota, cantidad_cuotas) por plan
+        """
+        if cantidades_cuotas is None:
+            planes = [(plan["cantidad_cuotas"], plan["nombre"]) for plan in self.active_plans()]
+        else:
+            planes = [(cuotas, plan_name(cuotas)) for cuotas in cantidades_cuotas]
+
+        ceil = math.ceil
+        return [
+            [
+                {"tipo": nombre, "valor_cuota": float(ceil(total / cuotas)), "cantidad_cuotas": cuotas}
+                for cuotas, nombre in planes
+            ]
+            for total in totales
+        ]
+
+    def validate(self, opcion_pago: Dict[str, Any], total: float) -> Optional[str]:
+        """
+        Comprueba la opción de pago de una cotización
+
+        Returns:
+            Optional[str]: Motivo del rechazo, o None si corresponde a un plan activo
+        """
+        cuotas = opcion_pago.get("cantidad_cuotas")
+        permitidas = [plan["cantidad_cuotas"] for plan in self.active_plans()]
+        if cuotas not in permitidas:
+            return f"Plan de {cuotas} cuota(s) no disponible. Permitidos: {', '.join(str(n) for n in permitidas)}"
+
+        esperado = self.installment(total, cuotas)
+        if abs(opcion_pago.get("valor_cuota", 0) - esperado) > TOLERANCIA_CUOTA:
+            return f"Valor de cuota inválido: {opcion_pago.get('valor_cuota')} (esperado {esperado} para {cuotas} cuota(s) de {total})"
+        return None
@@ -0,0 +1,227 @@
+import asyncio
+import glob
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, Iterable, Optional
+from xml.sax.saxutils import escape
+
+# Directorio de PDFs generados (uno por cotización y versión)
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "pdf"))
+# Procesos dedicados a maquetar PDFs (fuera de los workers de la API)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+
+def _moneda(valor: Any) -> str:
+    try:
+        return f"${float(valor):,.2f}"
+    except (TypeError, ValueError):
+        return "$0.00"
+
+
+def render_cotizacion_pdf(data: Dict[str, Any]) -> bytes:
+    """
+    Maqueta el PDF de una cotización
+
+    Se ejecuta en los procesos del pool: recibe solo tipos básicos
+    (ver `PdfService.pdf_data`) y devuelve los bytes del documento. Los
+    valores que van dentro de un Paragraph se escapan: su texto es markup
+    de reportlab (p. ej. `<img src=...>` lee archivos o URLs).
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        title=f"Cotización {data['id']}",
+        author="LeyesVzla",
+        leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm
+    )
+    tabla_estilo = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1e3a8a")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d1d5db")),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f3f4f6")]),
+        ("ALIGN", (-1, 1), (-1, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ])
+
+    story = [
+        Paragraph("LeyesVzla — Cotización", styles["Title"]),
+        Paragraph(f"<b>Cliente:</b> {escape(str(data['cliente_nombre']))} ({escape(str(data['cliente_email']))})", styles["Normal"]),
+        Paragraph(f"<b>Fecha:</b> {escape(str(data['fecha']))}", styles["Normal"]),
+        Paragraph(f"<b>Estado:</b> {escape(str(data['estado']))}", styles["Normal"]),
+        Paragraph(f"<b>Referencia:</b> {escape(str(data['id']))}", styles["Normal"]),
+        Spacer(1, 0.6 * cm),
+        Paragraph("Leyes seleccionadas", styles["Heading2"]),
+    ]
+
+    filas = [["#", "Ley", "Grosor", "Precio"]]
+    filas += [
+        [str(n), Paragraph(escape(str(item["nombre"])), styles["Normal"]), item["grosor"], _moneda(item["precio"])]
+        for n, item in enumerate(data["items"], start=1)
+    ]
+    tabla = Table(filas, colWidths=[1 * cm, 10 * cm, 2.5 * cm, 3 * cm], repeatRows=1)
+    tabla.setStyle(tabla_estilo)
+    story.append(tabla)
+
+    if data["volumenes"]:
+        story += [Spacer(1, 0.6 * cm), Paragraph("Agrupamiento de volúmenes", styles["Heading2"])]
+        filas = [["Volumen", "Leyes"]] + [
+            [str(volumen["numero"]), Paragraph(escape(str(volumen["leyes"])), styles["Normal"])] for volumen in data["volumenes"]
+        ]
+        tabla = Table(filas, colWidths=[2.5 * cm, 14 * cm], repeatRows=1)
+        tabla.setStyle(tabla_estilo)
+        story.append(tabla)
+
+    story += [Spacer(1, 0.6 * cm), Paragraph("Resumen", styles["Heading2"])]
+    resumen = [
+        ["Concepto", "Monto"],
+        ["Subtotal leyes", _moneda(data["subtotal_leyes"])],
+        [f"Encuadernación {data['encuadernacion']}".strip(), _moneda(data["costo_encuadernacion"])],
+        ["Total", _moneda(data["total"])],
+        [f"Forma de pago: {data['opcion_pago']}", ""],
+    ]
+    tabla = Table(resumen, colWidths=[12.5 * cm, 4 * cm])
+    tabla.setStyle(tabla_estilo)
+    tabla.setStyle(TableStyle([("FONTNAME", (0, 3), (-1, 3), "Helvetica-Bold")]))
+    story.append(tabla)
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+class PdfService:
+    """
+    PDFs de cotizaciones con caché en disco
+
+    El maquetado corre en un ProcessPoolExecutor (procesos "spawn", sin
+    heredar conexiones de Mongo) para que el CPU que consume no bloquee a
+    los workers de la API. Cada PDF se guarda como `<id>-<versión>.pdf`,
+    donde la versión es el `sync_version` de la cotización: cualquier
+    escritura produce una versión nueva y la anterior se borra al generar la
+    siguiente o al llamar a `invalidate`. Peticiones simultáneas del mismo
+    PDF comparten una sola generación.
+    """
+
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    def __init__(self, cache_dir: str = PDF_CACHE_DIR, max_workers: int = PDF_WORKERS):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self._pending: Dict[str, asyncio.Future] = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def _get_pool(cls, max_workers: int) -> ProcessPoolExecutor:
+        if cls._pool is None:
+            cls._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return cls._pool
+
+    @classmethod
+    def shutdown(cls):
+        if cls._pool is not None:
+            cls._pool.shutdown(wait=False, cancel_futures=True)
+            cls._pool = None
+
+    @staticmethod
+    def version(cotizacion: Dict[str, Any]) -> str:
+        return str(cotizacion.get("sync_version") or int(cotizacion.get("fecha_creacion").timestamp()))
+
+    def cache_path(self, cotizacion_id: str, version: str) -> str:
+        return os.path.join(self.cache_dir, f"{cotizacion_id}-{version}.pdf")
+
+    @staticmethod
+    def pdf_data(cotizacion: Dict[str, Any]) -> Dict[str, Any]:
+        """Datos del PDF a partir de la cotización expandida (solo tipos básicos, para enviarlos al pool)"""
+        agrupamiento = cotizacion.get("agrupamiento_volumenes", {})
+        tipo = (agrupamiento.get("costo_encuadernacion") or {}).get("tipo_encuadernacion") or {}
+        resumen = cotizacion.get("resumen_costo", {})
+        opcion = cotizacion.get("opcion_pago", {})
+        return {
+            "id": str(cotizacion["_id"]),
+            "cliente_nombre": cotizacion["cliente"]["nombre"],
+            "cliente_email": cotizacion["cliente"]["email"],
+            "fecha": cotizacion.get("fecha", {}).get("fecha_completa", ""),
+            "estado": cotizacion.get("estado", ""),
+            "items": [
+                {"nombre": item["nombre"], "grosor": item.get("grosor", ""), "precio": item.get("precio", 0)}
+                for item in cotizacion.get("leyes_seleccionadas", {}).get("items", [])
+            ],
+            "volumenes": [
+                {"numero": volumen["numero"], "leyes": volumen["leyes"]} for volumen in agrupamiento.get("volumenes", [])
+            ],
+            "encuadernacion": f"{tipo.get('material', '')} {tipo.get('tamano', '')}".strip(),
+            "subtotal_leyes": resumen.get("subtotal_leyes", 0),
+            "costo_encuadernacion": resumen.get("costo_encuadernacion", 0),
+            "total": resumen.get("total", 0),
+            "opcion_pago": f"{opcion.get('tipo', '')} - {opcion.get('cantidad_cuotas', 1)} cuota(s) de {_moneda(opcion.get('valor_cuota', 0))}",
+        }
+
+    def invalidate(self, cotizacion_id: str, keep: Optional[str] = None):
+        """Borra los PDFs en caché de una cotización (salvo la ruta `keep`)"""
+        for path in glob.glob(os.path.join(self.cache_dir, f"{cotizacion_id}-*.pdf")):
+            if path != keep:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def invalidate_many(self, cotizacion_ids: Iterable[str]):
+        """Borra los PDFs en caché de varias cotizaciones recorriendo el directorio una sola vez"""
+        ids = set(cotizacion_ids)
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pdf") and name.rsplit("-", 1)[0] in ids:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    async def get_pdf(self, cotizacion: Dict[str, Any]) -> str:
+        """
+        Ruta del PDF de la cotización, generándolo si no está en caché
+
+        Args:
+            cotizacion: Cotización en formato expandido
+
+        Returns:
+            str: Ruta del archivo en disco
+        """
+        cotizacion_id = str(cotizacion["_id"])
+        path = self.cache_path(cotizacion_id, self.version(cotizacion))
+        if os.path.exists(path):
+            return path
+
+        pending = self._pending.get(path)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[path] = future
+        try:
+            loop = asyncio.get_running_loop()
+            content = await loop.run_in_executor(self._get_pool(self.max_workers), render_cotizacion_pdf, self.pdf_data(cotizacion))
+            # Escritura atómica: nunca se sirve un PDF a medio escribir
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            self.invalidate(cotizacion_id, keep=path)
+            future.set_result(path)
+            return path
+        except Exception as e:
+            future.set_exception(e)
+            # Marcar la excepción como recuperada si nadie más esperaba
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(path, None)
@@ -0,0 +1,248 @@
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bson import ObjectId
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+# Tipos de item con precio versionado
+TIPO_LEY = "ley"
+TIPO_ENCUADERNACION = "encuadernacion"
+TIPOS_PRECIO = (TIPO_LEY, TIPO_ENCUADERNACION)
+
+# Segundos que se reutilizan las líneas de tiempo en memoria (otros procesos pueden escribir)
+PRECIOS_CACHE_SEGUNDOS = float(os.getenv("PRECIOS_CACHE_SEGUNDOS", "300"))
+
+# Vigencia para precios anteriores al historial (items sin fecha de creación)
+INICIO_HISTORIAL = datetime(1970, 1, 1)
+
+# Tolerancia al comparar precios cotizados con los vigentes
+TOLERANCIA_PRECIO = 0.005
+
+# Rechazar cotizaciones nuevas con precios distintos a los vigentes
+PRECIOS_VALIDAR = os.getenv("PRECIOS_VALIDAR", "true").lower() in ("1", "true", "si", "sí")
+
+# Orden de las entradas: a igual vigencia prevalece la registrada después
+CLAVE_HISTORIAL = [("tipo", 1), ("item_id", 1), ("vigente_desde", 1), ("registrado_en", 1)]
+# Índice único de versiones anteriores, incompatible con solo inserción
+CLAVE_HISTORIAL_ANTERIOR = [("tipo", 1), ("item_id", 1), ("vigente_desde", 1)]
+INDICE_PRECIO_INICIAL = "precio_inicial_unico"
+
+
+class PriceHistoryService:
+    """
+    Historial de precios de leyes y encuadernaciones (solo inserción)
+
+    Cada cambio de precio agrega un documento {tipo, item_id, precio,
+    vigente_desde, registrado_en}; nunca se modifica ni se borra. Dos
+    cambios con la misma vigencia se conservan y prevalece el registrado
+    después. La consulta "precio de X
+    en la fecha F" se resuelve en memoria: el historial de un tipo se carga
+    con una sola consulta y se guarda como listas ordenadas por fecha por
+    item, y cada búsqueda es un bisect. Así auditar o recalcular miles de
+    cotizaciones no hace una consulta por item.
+    """
+
+    def __init__(self, collection: Collection, cache_seconds: float = PRECIOS_CACHE_SEGUNDOS):
+        self.collection = collection
+        self.cache_seconds = cache_seconds
+        self._timelines: Dict[str, Tuple[float, Dict[ObjectId, Tuple[List[datetime], List[float]]]]] = {}
+        self._lock = threading.Lock()
+
+    def ensure_indexes(self, items: Optional[Dict[str, Collection]] = None):
+        """
+        Índices del historial y precio inicial de los items sin historial
+
+        El precio inicial se marca con `inicial: true` y un índice único
+        parcial admite uno solo por item: el backfill hace upsert sobre esa
+        clave, así que varios workers que arrancan a la vez no duplican
+        entradas.
+
+        Args:
+            items: Colecciones por tipo ({"ley": leyes, "encuadernacion": ...}) para el backfill
+        """
+        try:
+            for nombre, info in self.collection.index_information().items():
+                if info.get("key") == CLAVE_HISTORIAL_ANTERIOR:
+                    try:
+                        self.collection.drop_index(nombre)
+                    except OperationFailure:
+                        # Otro worker ya lo eliminó
+                        pass
+            self.collection.create_index(CLAVE_HISTORIAL)
+            self.collection.create_index(
+                [("tipo", 1), ("item_id", 1)],
+                name=INDICE_PRECIO_INICIAL,
+                unique=True,
+                partialFilterExpression={"inicial": True}
+            )
+            for tipo, collection in (items or {}).items():
+                con_historial = set(self.collection.distinct("item_id", {"tipo": tipo}))
+                insertados = 0
+                for doc in collection.find({}, {"precio": 1, "fecha_creacion": 1}):
+                    if doc["_id"] in con_historial or doc.get("precio") is None:
+                        continue
+                    entry = {**self._entry(tipo, doc["_id"], doc["precio"], doc.get("fecha_creacion") or INICIO_HISTORIAL), "inicial": True}
+                    try:
+                        result = self.collection.update_one(
+                            {"tipo": tipo, "item_id": doc["_id"], "inicial": True},
+                            {"$setOnInsert": entry},
+                            upsert=True
+                        )
+                    except DuplicateKeyError:
+                        # Otro worker lo insertó entre la búsqueda y la inserción
+                        continue
+                    insertados += 1 if result.upserted_id is not None else 0
+                if insertados:
+                    print(f"💲 Historial de precios inicializado para {insertados} item(s) de tipo '{tipo}'")
+        except Exception as e:
+            print(f"⚠️ Error preparando historial de precios: {str(e)}")
+
+    @staticmethod
+    def _entry(tipo: str, item_id: ObjectId, precio: float, vigente_desde: datetime) -> Dict[str, Any]:
+        return {
+            "tipo": tipo,
+            "item_id": item_id,
+            "precio": precio,
+            "vigente_desde": vigente_desde,
+            "registrado_en": datetime.now()
+        }
+
+    def record(self, tipo: str, item_id: ObjectId, precio: float, vigente_desde: Optional[datetime] = None):
+        """Registra un precio nuevo; no hace nada si coincide con el vigente"""
+        vigente_desde = vigente_desde or datetime.now()
+        actual = self.price_at(tipo, item_id, vigente_desde)
+        if actual is not None and abs(actual - precio) < TOLERANCIA_PRECIO:
+            return
+        self.collection.insert_one(self._entry(tipo, item_id, precio, vigente_desde))
+        self.invalidate(tipo)
+
+    def invalidate(self, tipo: Optional[str] = None):
+        with self._lock:
+            if tipo is None:
+                self._timelines.clear()
+            else:
+                self._timelines.pop(tipo, None)
+
+    def _timeline(self, tipo: str) -> Dict[ObjectId, Tuple[List[datetime], List[float]]]:
+        cached = self._timelines.get(tipo)
+        if cached and time.monotonic() - cached[0] <= self.cache_seconds:
+            return cached[1]
+
+        timeline: Dict[ObjectId, Tuple[List[datetime], List[float]]] = {}
+        for entry in self.collection.find({"tipo": tipo}).sort(CLAVE_HISTORIAL[1:]):
+            fechas, precios = timeline.setdefault(entry["item_id"], ([], []))
+            fechas.append(entry["vigente_desde"])
+            precios.append(entry["precio"])
+        with self._lock:
+            self._timelines[tipo] = (time.monotonic(), timeline)
+        return timeline
+
+    def price_at(self, tipo: str, item_id: ObjectId, fecha: datetime) -> Optional[float]:
+        """Precio vigente de un item en una fecha (None si no hay historial a esa fecha)"""
+        serie = self._timeline(tipo).get(item_id)
+        if not serie:
+            return None
+        fechas, precios = serie
+        index = bisect_right(fechas, fecha) - 1
+        return precios[index] if index >= 0 else None
+
+    def prices_at(self, consultas: Iterable[Tuple[str, ObjectId, datetime]]) -> List[Optional[float]]:
+        """Varias consultas (tipo, item_id, fecha) contra la misma carga del historial"""
+        return [self.price_at(tipo, item_id, fecha) for tipo, item_id, fecha in consultas]
+
+    def history(self, tipo: str, item_id: ObjectId) -> List[Dict[str, Any]]:
+        fechas, precios = self._timeline(tipo).get(item_id, ([], []))
+        return [{"vigente_desde": fecha, "precio": precio} for fecha, precio in zip(fechas, precios)]
+
+    def audit_cotizacion(
+        self,
+        cotizacion: Dict[str, Any],
+        ley_ids: List[Optional[ObjectId]],
+        encuadernacion_id: Optional[ObjectId] = None,
+        fecha: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Compara los precios guardados en una cotización con los vigentes a su fecha de creación
+
+        Args:
+            cotizacion: Cotización en formato expandido
+            ley_ids: Id de catálogo de cada item (None si la ley ya no existe)
+            encuadernacion_id: Id de la encuadernación cotizada, si se identificó
+            fecha: Fecha de los precios a comparar (por defecto, `fecha_creacion` de la cotización)
+
+        Returns:
+            Dict: {"id", "fecha", "items", "encuadernacion", "subtotal_cotizado", "subtotal_vigente", "diferencia", "coincide"}
+        """
+        fecha = fecha or cotizacion["fecha_creacion"]
+        items = []
+        subtotal_vigente = 0.0
+        for item, ley_id in zip(cotizacion["leyes_seleccionadas"]["items"], ley_ids):
+            vigente = self.price_at(TIPO_LEY, ley_id, fecha) if ley_id is not None else None
+            subtotal_vigente += item["precio"] if vigente is None else vigente
+            items.append({
+                "nombre": item["nombre"],
+                "ley_id": str(ley_id) if ley_id is not None else None,
+                "precio_cotizado": item["precio"],
+                "precio_vigente": vigente
+            })
+
+        encuadernacion = None
+        costo = cotizacion.get("agrupamiento_volumenes", {}).get("costo_encuadernacion") or {}
+        if costo.get("tipo_encuadernacion"):
+            vigente = self.price_at(TIPO_ENCUADERNACION, encuadernacion_id, fecha) if encuadernacion_id else None
+            encuadernacion = {
+                "encuadernacion_id": str(encuadernacion_id) if encuadernacion_id else None,
+                "precio_cotizado": costo.get("costo_unitario"),
+                "precio_vigente": vigente
+            }
+
+        subtotal_cotizado = cotizacion["leyes_seleccionadas"].get("subtotal", 0)
+        diferencia = round(subtotal_vigente - subtotal_cotizado, 2)
+        coincide = abs(diferencia) < TOLERANCIA_PRECIO and all(
+            i["precio_vigente"] is None or abs(i["precio_vigente"] - i["precio_cotizado"]) < TOLERANCIA_PRECIO
+            for i in items + ([encuadernacion] if encuadernacion else [])
+        )
+        return {
+            "id": str(cotizacion.get("_id")),
+            "fecha": fecha,
+            "items": items,
+            "encuadernacion": encuadernacion,
+            "subtotal_cotizado": subtotal_cotizado,
+            "subtotal_vigente": round(subtotal_vigente, 2),
+            "diferencia": diferencia,
+            "coincide": coincide
+        }
+
+    def validate_prices(
+        self,
+        cotizacion: Dict[str, Any],
+        ley_ids: List[Optional[ObjectId]],
+        encuadernacion_id: Optional[ObjectId] = None,
+        fecha: Optional[datetime] = None
+    ) -> Optional[str]:
+        """
+        Comprueba que una cotización nueva use los precios vigentes
+
+        Los items sin historial (o que no están en el catálogo) no se comprueban.
+
+        Returns:
+            Optional[str]: Motivo del rechazo, o None si los precios coinciden
+        """
+        reporte = self.audit_cotizacion(cotizacion, ley_ids, encuadernacion_id, fecha or datetime.now())
+        if reporte["coincide"]:
+            return None
+        diferencias = [
+            f"{item['nombre']}: {item['precio_cotizado']} (vigente {item['precio_vigente']})"
+            for item in reporte["items"]
+            if item["precio_vigente"] is not None and abs(item["precio_vigente"] - item["precio_cotizado"]) >= TOLERANCIA_PRECIO
+        ]
+        encuadernacion = reporte["encuadernacion"]
+        if encuadernacion and encuadernacion["precio_vigente"] is not None and abs(encuadernacion["precio_vigente"] - encuadernacion["precio_cotizado"]) >= TOLERANCIA_PRECIO:
+            diferencias.append(f"encuadernación: {encuadernacion['precio_cotizado']} (vigente {encuadernacion['precio_vigente']})")
+        if not diferencias:
+            diferencias.append(f"subtotal {reporte['subtotal_cotizado']} (vigente {reporte['subtotal_vigente']})")
+        return f"Precios desactualizados: {'; '.join(diferencias)}"
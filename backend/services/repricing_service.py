@@ -0,0 +1,265 @@
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from services.cotizacion_storage import CotizacionStorage
+from services.sync_service import SyncService
+from services.payment_plan_service import PaymentPlanService
+from services.invalidation_bus import InvalidationBus, CANAL_COTIZACIONES
+from services.price_history_service import PriceHistoryService, TIPO_LEY, TIPO_ENCUADERNACION
+
+# Cotizaciones leídas y escritas por lote (una consulta + un bulk_write por lote)
+REPRECIO_LOTE = int(os.getenv("REPRECIO_LOTE", "1000"))
+# Lanzar el job al cambiar el precio de una ley o encuadernación
+REPRECIO_AUTOMATICO = os.getenv("REPRECIO_AUTOMATICO", "true").lower() in ("1", "true", "si", "sí")
+
+ESTADO_EN_CURSO = "en_curso"
+ESTADO_COMPLETADO = "completado"
+ESTADO_ERROR = "error"
+
+CAMPO_MATERIAL = "agrupamiento_volumenes.costo_encuadernacion.tipo_encuadernacion.material"
+CAMPO_TAMANO = "agrupamiento_volumenes.costo_encuadernacion.tipo_encuadernacion.tamano"
+
+# Solo los campos necesarios para recalcular
+PROYECCION = {
+    "leyes_seleccionadas": 1,
+    "agrupamiento_volumenes.cantidad_volumenes": 1,
+    "agrupamiento_volumenes.costo_encuadernacion": 1,
+    "opcion_pago": 1,
+    "resumen_costo": 1
+}
+
+
+def _round(value: float) -> float:
+    return round(value, 2)
+
+
+class RepricingService:
+    """
+    Recalcula las cotizaciones pendientes tras un cambio de precios del catálogo
+
+    Las cotizaciones afectadas se localizan con índices parciales (solo
+    estado "pendiente") sobre los ids/nombres de leyes y el tipo de
+    encuadernación. Se recorren por _id en lotes: los precios se toman del
+    historial de precios a la fecha del job (ahora, o la indicada) con la
+    búsqueda en memoria de PriceHistoryService, y del catálogo para los
+    items sin historial. Cada lote se recalcula en Python y se escribe con
+    un único bulk_write. El progreso se guarda en la colección de trabajos
+    para consultarlo desde cualquier proceso.
+    """
+
+    def __init__(
+        self,
+        collection_cotizaciones: Collection,
+        collection_encuadernacion: Collection,
+        jobs_collection: Collection,
+        cotizacion_storage: CotizacionStorage,
+        sync_service: SyncService,
+        batch_size: int = REPRECIO_LOTE,
+        invalidation_bus: Optional[InvalidationBus] = None,
+        price_history_service: Optional[PriceHistoryService] = None
+    ):
+        self.collection_cotizaciones = collection_cotizaciones
+        self.collection_encuadernacion = collection_encuadernacion
+        self.jobs_collection = jobs_collection
+        self.cotizacion_storage = cotizacion_storage
+        self.sync_service = sync_service
+        self.batch_size = batch_size
+        self.invalidation_bus = invalidation_bus
+        self.price_history_service = price_history_service
+
+    def ensure_indexes(self):
+        pendientes = {"partialFilterExpression": {"estado": "pendiente"}}
+        try:
+            self.collection_cotizaciones.create_index("leyes_seleccionadas.ley_ids", **pendientes)
+            self.collection_cotizaciones.create_index("leyes_seleccionadas.items.nombre", **pendientes)
+            self.collection_cotizaciones.create_index([(CAMPO_MATERIAL, 1), (CAMPO_TAMANO, 1)], **pendientes)
+            self.jobs_collection.create_index("inicio")
+        except Exception as e:
+            print(f"⚠️ Error creando índices de reprecio: {str(e)}")
+
+    # --- Selección ---
+
+    @staticmethod
+    def build_query(
+        ley_ids: Iterable[ObjectId] = (),
+        ley_nombres: Iterable[str] = (),
+        encuadernaciones: Iterable[Tuple[str, str]] = ()
+    ) -> Dict[str, Any]:
+        """Cotizaciones pendientes que contienen alguna de las leyes/encuadernaciones (todas si no se indica nada)"""
+        condiciones = []
+        ley_ids, ley_nombres = list(ley_ids), list(ley_nombres)
+        if ley_ids:
+            condiciones.append({"leyes_seleccionadas.ley_ids": {"$in": ley_ids}})
+        if ley_nombres:
+            condiciones.append({"leyes_seleccionadas.items.nombre": {"$in": ley_nombres}})
+        for material, tamano in encuadernaciones:
+            condiciones.append({CAMPO_MATERIAL: material, CAMPO_TAMANO: tamano})
+
+        query: Dict[str, Any] = {"estado": "pendiente"}
+        if condiciones:
+            query["$or"] = condiciones
+        return query
+
+    def _price_at(self, tipo: str, item_id: ObjectId, fecha: datetime, catalogo: float) -> float:
+        """Precio del historial a la fecha, o el del catálogo si el item no tiene historial"""
+        if self.price_history_service is None:
+            return catalogo
+        precio = self.price_history_service.price_at(tipo, item_id, fecha)
+        return catalogo if precio is None else precio
+
+    def _binding_prices(self, fecha: Optional[datetime] = None) -> Dict[Tuple[str, str], float]:
+        fecha = fecha or datetime.now()
+        precios: Dict[Tuple[str, str], float] = {}
+        # Las activas se leen al final y prevalecen sobre las inactivas del mismo tipo
+        for doc in self.collection_encuadernacion.find({}, {"material": 1, "tamano": 1, "precio": 1, "activo": 1}).sort("activo", 1):
+            precios[(doc["material"], doc["tamano"])] = self._price_at(TIPO_ENCUADERNACION, doc["_id"], fecha, doc["precio"])
+        return precios
+
+    # --- Cálculo ---
+
+    def reprice(self, doc: Dict[str, Any], binding_prices: Dict[Tuple[str, str], float], fecha: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Campos a actualizar para una cotización ($set), o None si sus precios ya están al día
+
+        Args:
+            doc: Cotización (compacta o expandida) con los campos de PROYECCION
+            binding_prices: Precios de encuadernación por (material, tamaño) a la fecha
+            fecha: Fecha de los precios de las leyes (por defecto, ahora)
+        """
+        fecha = fecha or datetime.now()
+        catalog = self.cotizacion_storage.catalog
+        leyes = doc["leyes_seleccionadas"]
+        compacta = self.cotizacion_storage.is_compact(doc)
+        precios_actuales = list(leyes["precios"]) if compacta else [item["precio"] for item in leyes.get("items", [])]
+
+        precios = []
+        for ley_id, actual in zip(self.cotizacion_storage.ley_ids(doc), precios_actuales):
+            ley = catalog.get(ley_id) if ley_id is not None else None
+            # Leyes eliminadas del catálogo conservan el precio cotizado
+            precios.append(self._price_at(TIPO_LEY, ley_id, fecha, ley["precio"]) if ley else actual)
+
+        costo = (doc.get("agrupamiento_volumenes") or {}).get("costo_encuadernacion") or {}
+        tipo = costo.get("tipo_encuadernacion") or {}
+        costo_unitario = costo.get("costo_unitario", 0)
+        if tipo:
+            costo_unitario = binding_prices.get((tipo.get("material"), tipo.get("tamano")), costo_unitario)
+        cantidad = costo.get("cantidad", 0)
+
+        subtotal = _round(sum(precios))
+        costo_encuadernacion = _round(costo_unitario * cantidad)
+        total = _round(subtotal + costo_encuadernacion)
+        cuotas = doc.get("opcion_pago", {}).get("cantidad_cuotas", 1)
+        valor_cuota = PaymentPlanService.installment(total, cuotas) if cuotas > 0 else total
+
+        if precios == precios_actuales and total == doc.get("resumen_costo", {}).get("total") and costo_unitario == costo.get("costo_unitario"):
+            return None
+
+        update: Dict[str, Any] = {
+            "leyes_seleccionadas.subtotal": subtotal,
+            "resumen_costo": {"subtotal_leyes": subtotal, "costo_encuadernacion": costo_encuadernacion, "total": total},
+            "opcion_pago.valor_cuota": valor_cuota
+        }
+        if compacta:
+            update["leyes_seleccionadas.precios"] = precios
+        else:
+            update["leyes_seleccionadas.items"] = [
+                {**item, "precio": precio} for item, precio in zip(leyes["items"], precios)
+            ]
+        if costo:
+            update["agrupamiento_volumenes.costo_encuadernacion.costo_unitario"] = costo_unitario
+            update["agrupamiento_volumenes.costo_encuadernacion.total"] = costo_encuadernacion
+            if tipo:
+                update["agrupamiento_volumenes.costo_encuadernacion.tipo_encuadernacion.precio"] = costo_unitario
+        return update
+
+    # --- Jobs ---
+
+    def start(self, query: Dict[str, Any], motivo: str = "manual", fecha: Optional[datetime] = None) -> ObjectId:
+        """
+        Registra el job y lo ejecuta en un hilo; devuelve su id para consultar el progreso
+
+        Args:
+            query: Cotizaciones a recalcular (ver build_query)
+            motivo: Descripción del job
+            fecha: Fecha de los precios a aplicar (por defecto, los vigentes al ejecutarse)
+        """
+        job_id = self.jobs_collection.insert_one({
+            "estado": ESTADO_EN_CURSO,
+            "motivo": motivo,
+            "fecha_precios": fecha,
+            "total": None,
+            "procesadas": 0,
+            "actualizadas": 0,
+            "lotes": 0,
+            "inicio": datetime.now(),
+            "fin": None,
+            "error": None
+        }).inserted_id
+        threading.Thread(target=self.run, args=(job_id, query, fecha), name=f"reprecio-{job_id}", daemon=True).start()
+        return job_id
+
+    def run(self, job_id: ObjectId, query: Dict[str, Any], fecha: Optional[datetime] = None):
+        try:
+            fecha = fecha or datetime.now()
+            self.cotizacion_storage.catalog.invalidate()
+            if self.price_history_service:
+                # Una sola carga del historial por job; después, búsquedas en memoria
+                self.price_history_service.invalidate()
+            binding_prices = self._binding_prices(fecha)
+            total = self.collection_cotizaciones.count_documents(query)
+            self.jobs_collection.update_one({"_id": job_id}, {"$set": {"total": total}})
+
+            procesadas = actualizadas = lotes = 0
+            ultimo_id = None
+            while True:
+                filtro = dict(query)
+                if ultimo_id is not None:
+                    filtro["_id"] = {"$gt": ultimo_id}
+                docs = list(self.collection_cotizaciones.find(filtro, PROYECCION).sort("_id", 1).limit(self.batch_size))
+                if not docs:
+                    break
+                ultimo_id = docs[-1]["_id"]
+
+                operaciones: List[UpdateOne] = []
+                stamp = None
+                for doc in docs:
+                    update = self.reprice(doc, binding_prices, fecha)
+                    if update is None:
+                        continue
+                    # Una versión de sincronización por lote
+                    stamp = stamp or self.sync_service.stamp()
+                    operaciones.append(UpdateOne({"_id": doc["_id"], "estado": "pendiente"}, {"$set": {**update, **stamp}}))
+                if operaciones:
+                    actualizadas += self.collection_cotizaciones.bulk_write(operaciones, ordered=False).modified_count
+                    # Un solo evento por lote: vaciar la caché de cotizaciones
+                    if self.invalidation_bus:
+                        self.invalidation_bus.publish(CANAL_COTIZACIONES)
+
+                procesadas += len(docs)
+                lotes += 1
+                self.jobs_collection.update_one(
+                    {"_id": job_id},
+                    {"$set": {"procesadas": procesadas, "actualizadas": actualizadas, "lotes": lotes}}
+                )
+
+            self.jobs_collection.update_one({"_id": job_id}, {"$set": {"estado": ESTADO_COMPLETADO, "fin": datetime.now()}})
+            print(f"💲 Reprecio {job_id}: {actualizadas} de {procesadas} cotizaciones pendientes actualizadas")
+        except Exception as e:
+            print(f"❌ Error en el reprecio {job_id}: {str(e)}")
+            self.jobs_collection.update_one(
+                {"_id": job_id},
+                {"$set": {"estado": ESTADO_ERROR, "error": str(e), "fin": datetime.now()}}
+            )
+
+    def get_job(self, job_id: ObjectId) -> Optional[Dict[str, Any]]:
+        job = self.jobs_collection.find_one({"_id": job_id})
+        if job:
+            job["progreso"] = round(100 * job["procesadas"] / job["total"], 1) if job.get("total") else (100.0 if job["estado"] == ESTADO_COMPLETADO else 0.0)
+        return job
+
+    def recent_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return list(self.jobs_collection.find().sort("inicio", -1).limit(limit))
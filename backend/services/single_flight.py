@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Agrupa las cargas simultáneas de una misma clave en una sola ejecución
+
+    La primera petición que no encuentra la clave en curso ejecuta la carga
+    (una función bloqueante de pymongo) en un hilo; las que llegan mientras
+    tanto esperan ese mismo resultado en lugar de lanzar su propia consulta.
+    Al terminar la clave se libera: no es una caché, solo evita la estampida
+    de consultas idénticas cuando una caché vence o se invalida. Los
+    resultados se comparten entre las peticiones y no deben modificarse.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        # Cargas ejecutadas realmente (las peticiones agrupadas no suman)
+        self.executions = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Resultado de `fn(*args)`, compartido con las demás peticiones de `key` en curso
+
+        Args:
+            key: Identifica la carga (p. ej. "leyes" o el id de un usuario)
+            fn: Función bloqueante que hace la consulta
+
+        Returns:
+            Any: Lo que devuelve `fn`; si falla, la excepción se propaga a todas las peticiones agrupadas
+        """
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            self.executions += 1
+            result = await asyncio.to_thread(fn, *args)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Marcar la excepción como recuperada si nadie más esperaba
+            future.exception()
+            raise
+        finally:
+            # La petición que cargaba fue cancelada: no dejar esperando a las demás
+            if not future.done():
+                future.cancel()
+            self._pending.pop(key, None)
@@ -0,0 +1,255 @@
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.collection import Collection
+from services.cotizaciones_stream import serialize_document
+
+# Límite de documentos por colección en una respuesta de /sync
+SYNC_DEFAULT_LIMIT = 1000
+# Tiempo máximo entre reservar una versión y que la escritura sea visible;
+# el token devuelto no avanza sobre versiones más recientes que este margen
+SYNC_MARGEN_COMMIT_SEGUNDOS = float(os.getenv("SYNC_MARGEN_COMMIT_SEGUNDOS", "30"))
+# Días que se conservan las lápidas; un token más antiguo exige sincronización completa
+SYNC_LAPIDAS_RETENCION_DIAS = float(os.getenv("SYNC_LAPIDAS_RETENCION_DIAS", "30"))
+# Intervalo mínimo entre podas de lápidas en un proceso
+SYNC_PODA_INTERVALO_SEGUNDOS = 3600
+
+COUNTER_ID = "sync_version"
+# Mayor versión de lápida eliminada por la poda
+PODA_COUNTER_ID = "sync_lapidas_podadas"
+
+
+class SyncService:
+    """
+    Sincronización incremental ("cambios desde") de cotizaciones, leyes y encuadernación
+
+    Cada escritura recibe un `sync_version` tomado de un contador global
+    monotónico (colección de contadores, $inc atómico) junto con `updated_at`.
+    Los borrados dejan una lápida con su propio `sync_version`. Así el cliente
+    guarda el último token recibido y pide solo lo que cambió después.
+
+    La versión se reserva antes de escribir, así que una escritura puede
+    hacerse visible después de otra con versión mayor. Para no saltarla, el
+    token devuelto se limita a la mayor versión estampada (`updated_at`) hace
+    más de SYNC_MARGEN_COMMIT_SEGUNDOS: lo posterior se entrega igualmente,
+    pero se vuelve a entregar en la siguiente llamada. Los clientes deben
+    tratar los documentos como upserts idempotentes.
+
+    Las lápidas se podan tras SYNC_LAPIDAS_RETENCION_DIAS; un token anterior
+    a la poda recibe una sincronización completa (`completo: true` y
+    `resincronizar: true`), y el cliente debe reemplazar sus datos locales.
+    """
+
+    def __init__(
+        self,
+        counters_collection: Collection,
+        tombstones_collection: Collection,
+        collections: Dict[str, Collection],
+        decoders: Optional[Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]] = None
+    ):
+        self.counters_collection = counters_collection
+        self.tombstones_collection = tombstones_collection
+        self.collections = collections
+        # Conversión del formato guardado al de la API (p. ej. cotizaciones compactas)
+        self.decoders = decoders or {}
+        self._last_prune: Optional[float] = None
+
+    def ensure_indexes(self):
+        """
+        Índices de sync_version y asignación de versión a documentos antiguos
+
+        Un fallo del backfill no se ignora: los documentos sin versión nunca
+        aparecerían en changes_since, así que el error detiene el arranque.
+        """
+        for name, collection in self.collections.items():
+            try:
+                collection.create_index("sync_version")
+            except Exception as e:
+                print(f"⚠️ Error creando el índice de sincronización de '{name}': {str(e)}")
+            pendientes = self._backfill(collection)
+            if pendientes:
+                print(f"🔢 Versión de sincronización asignada a {pendientes} documento(s) de '{name}'")
+        try:
+            self.tombstones_collection.create_index([("coleccion", 1), ("sync_version", 1)])
+            self.tombstones_collection.create_index("sync_version")
+            self.prune_tombstones()
+        except Exception as e:
+            print(f"⚠️ Error preparando índices de sincronización: {str(e)}")
+
+    def _backfill(self, collection: Collection, chunk_size: int = 1000) -> int:
+        """
+        Asigna una versión propia a cada documento anterior a la sincronización
+
+        Returns:
+            int: Documentos actualizados
+        """
+        total = 0
+        bulk = True
+        while True:
+            ids = [doc["_id"] for doc in collection.find({"sync_version": {"$exists": False}}, {"_id": 1}).limit(chunk_size)]
+            if not ids:
+                return total
+            first = self.reserve_versions(len(ids))
+            now = datetime.utcnow()
+            updates = [
+                ({"_id": doc_id, "sync_version": {"$exists": False}}, {"$set": {"sync_version": first + offset, "updated_at": now}})
+                for offset, doc_id in enumerate(ids)
+            ]
+            if bulk:
+                try:
+                    collection.bulk_write([UpdateOne(filtro, update) for filtro, update in updates], ordered=False)
+                except (TypeError, NotImplementedError) as e:
+                    # Backends sin bulk_write completo (mongomock): una escritura por documento
+                    print(f"⚠️ bulk_write no disponible en '{collection.name}' ({str(e)[:80]}); backfill documento a documento")
+                    bulk = False
+            if not bulk:
+                for filtro, update in updates:
+                    collection.update_one(filtro, update)
+            total += len(ids)
+
+    def reserve_versions(self, count: int) -> int:
+        """Reserva `count` versiones consecutivas y devuelve la primera"""
+        counter = self.counters_collection.find_one_and_update(
+            {"_id": COUNTER_ID},
+            {"$inc": {"value": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["value"] - count + 1
+
+    def next_version(self) -> int:
+        return self.reserve_versions(1)
+
+    def current_version(self) -> int:
+        counter = self.counters_collection.find_one({"_id": COUNTER_ID})
+        return counter["value"] if counter else 0
+
+    def committed_version(self) -> int:
+        """
+        Mayor versión que ya no puede tener escrituras pendientes por debajo
+
+        Las versiones se reservan en orden, así que todo lo reservado antes
+        que un documento estampado hace más de SYNC_MARGEN_COMMIT_SEGUNDOS ya
+        se escribió (o falló). Recorre el índice de sync_version desde el
+        final y solo salta las escrituras de ese margen.
+        """
+        corte = datetime.utcnow() - timedelta(seconds=SYNC_MARGEN_COMMIT_SEGUNDOS)
+        versions = [0]
+        for collection in self.collections.values():
+            doc = collection.find_one({"updated_at": {"$lte": corte}}, {"sync_version": 1}, sort=[("sync_version", -1)])
+            if doc and doc.get("sync_version"):
+                versions.append(doc["sync_version"])
+        tombstone = self.tombstones_collection.find_one({"fecha_eliminacion": {"$lte": corte}}, {"sync_version": 1}, sort=[("sync_version", -1)])
+        if tombstone:
+            versions.append(tombstone["sync_version"])
+        return max(versions)
+
+    def pruned_version(self) -> int:
+        counter = self.counters_collection.find_one({"_id": PODA_COUNTER_ID})
+        return counter["value"] if counter else 0
+
+    def prune_tombstones(self, force: bool = False):
+        """Elimina las lápidas más antiguas que SYNC_LAPIDAS_RETENCION_DIAS (como mucho una vez por hora)"""
+        if not force and self._last_prune is not None and time.monotonic() - self._last_prune < SYNC_PODA_INTERVALO_SEGUNDOS:
+            return
+        self._last_prune = time.monotonic()
+        limite = datetime.utcnow() - timedelta(days=SYNC_LAPIDAS_RETENCION_DIAS)
+        last = self.tombstones_collection.find_one({"fecha_eliminacion": {"$lt": limite}}, {"sync_version": 1}, sort=[("sync_version", -1)])
+        if not last:
+            return
+        # Registrar la marca antes de borrar: un token anterior nunca ve una lista de eliminados incompleta
+        self.counters_collection.update_one({"_id": PODA_COUNTER_ID}, {"$max": {"value": last["sync_version"]}}, upsert=True)
+        result = self.tombstones_collection.delete_many({"sync_version": {"$lte": last["sync_version"]}})
+        print(f"🪦 {result.deleted_count} lápida(s) de sincronización podadas (hasta la versión {last['sync_version']})")
+
+    def collection_version(self, coleccion: str) -> int:
+        """Última versión escrita o borrada en una colección (0 si no hay ninguna)"""
+        versions = [0]
+        last_doc = self.collections[coleccion].find_one({}, {"sync_version": 1}, sort=[("sync_version", -1)])
+        if last_doc:
+            versions.append(last_doc.get("sync_version") or 0)
+        last_tombstone = self.tombstones_collection.find_one({"coleccion": coleccion}, {"sync_version": 1}, sort=[("sync_version", -1)])
+        if last_tombstone:
+            versions.append(last_tombstone["sync_version"])
+        return max(versions)
+
+    def stamp(self) -> Dict[str, Any]:
+        """Campos a incluir en el $set (o en el documento insertado) de cada escritura"""
+        return {"sync_version": self.next_version(), "updated_at": datetime.utcnow()}
+
+    def record_delete(self, coleccion: str, doc_id: Any):
+        """Registra una lápida para que los clientes sepan que el documento se eliminó"""
+        self.tombstones_collection.insert_one({
+            "coleccion": coleccion,
+            "doc_id": str(doc_id),
+            "sync_version": self.next_version(),
+            "fecha_eliminacion": datetime.utcnow()
+        })
+        self.prune_tombstones()
+
+    @staticmethod
+    def parse_token(token: Optional[str]) -> int:
+        if token in (None, ""):
+            return 0
+        version = int(token)
+        if version < 0:
+            raise ValueError("Token negativo")
+        return version
+
+    def changes_since(self, since: int, limit: int = SYNC_DEFAULT_LIMIT) -> Dict[str, Any]:
+        """
+        Documentos insertados/actualizados y eliminados después de `since`
+
+        Returns:
+            Dict: {"token", "hay_mas", "completo", "resincronizar", <coleccion>: {"actualizados", "eliminados"}}
+        """
+        # Las lápidas posteriores al token ya se podaron: sincronización completa
+        resincronizar = 0 < since < self.pruned_version()
+        if resincronizar:
+            since = 0
+
+        upper = self.current_version()
+        result: Dict[str, Any] = {"completo": since == 0, "resincronizar": resincronizar}
+        # No avanzar sobre escrituras que aún pueden estar en curso (ni retroceder)
+        next_token = max(since, min(upper, self.committed_version()))
+        hay_mas = False
+
+        for name, collection in self.collections.items():
+            docs: List[Dict[str, Any]] = list(
+                collection.find({"sync_version": {"$gt": since, "$lte": upper}})
+                .sort("sync_version", 1)
+                .limit(limit + 1)
+            )
+            if len(docs) > limit:
+                boundary = docs[limit - 1]["sync_version"]
+                docs = docs[:limit]
+                if docs[-1]["sync_version"] == boundary:
+                    # Escrituras en lote comparten versión: no cortar a mitad de una
+                    seen = {doc["_id"] for doc in docs}
+                    docs += [
+                        doc for doc in collection.find({"sync_version": boundary})
+                        if doc["_id"] not in seen
+                    ]
+                hay_mas = True
+                # No avanzar el token más allá de lo entregado en la colección truncada
+                next_token = min(next_token, docs[-1]["sync_version"])
+
+            eliminados = [] if since == 0 else [
+                tombstone["doc_id"]
+                for tombstone in self.tombstones_collection.find(
+                    {"coleccion": name, "sync_version": {"$gt": since, "$lte": upper}},
+                    {"doc_id": 1}
+                )
+            ]
+            decode = self.decoders.get(name, lambda doc: doc)
+            result[name] = {
+                "actualizados": [serialize_document(decode(doc)) for doc in docs],
+                "eliminados": eliminados
+            }
+
+        result["token"] = str(next_token)
+        # Si el token no avanzó (página entera dentro del margen) repetir la llamada daría lo mismo
+        result["hay_mas"] = hay_mas and next_token > since
+        return result
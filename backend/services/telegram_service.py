@@ -1,56 +1,397 @@
 import os
+import time
+import asyncio
+import threading
 import requests
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+from pymongo.collection import Collection
+from schemas.telegram_schemas import EVENTO_NUEVA_COTIZACION, EVENTO_RECUPERACION_PASSWORD, EVENTO_TODOS
+from services.template_service import TemplateService
 
 load_dotenv()
 
+# Límite de caracteres de un mensaje de Telegram
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+# Reintentos ante 429 (Too Many Requests) respetando retry_after
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "5"))
+# Ventana de agrupación de notificaciones por chat (0 = desactivado)
+TELEGRAM_COALESCE_WINDOW_SECONDS = float(os.getenv("TELEGRAM_COALESCE_WINDOW_SECONDS", "0"))
+# Reintentos de un buffer con la ventana normal; después la espera se duplica en cada intento
+TELEGRAM_COALESCE_MAX_ATTEMPTS = 5
+# Espera máxima entre reintentos de un buffer que no se puede entregar
+TELEGRAM_COALESCE_MAX_DELAY_SECONDS = float(os.getenv("TELEGRAM_COALESCE_MAX_DELAY_SECONDS", "300"))
+# Mensajes pendientes por chat; los más antiguos que excedan se escriben completos en el log
+TELEGRAM_COALESCE_MAX_PENDING = int(os.getenv("TELEGRAM_COALESCE_MAX_PENDING", "500"))
+# Intentos de un buffer antes de descartarlo (escribiéndolo en el log)
+TELEGRAM_COALESCE_GIVE_UP_ATTEMPTS = int(os.getenv("TELEGRAM_COALESCE_GIVE_UP_ATTEMPTS", "20"))
+# Respuestas que no mejoran al reintentar: 400 (mensaje demasiado largo, HTML inválido)
+# afecta solo a ese mensaje; 401/403/404 (token inválido, bot bloqueado) a todo el chat
+TELEGRAM_ERROR_MENSAJE = 400
+TELEGRAM_ERRORES_CHAT = (401, 403, 404)
+
+# Reintentos por destinatario ante errores distintos de 429 (red, 5xx)
+TELEGRAM_RECIPIENT_RETRIES = int(os.getenv("TELEGRAM_RECIPIENT_RETRIES", "2"))
+# Segundos que se cachea la lista de destinatarios de cada evento
+TELEGRAM_RECIPIENTS_CACHE_SECONDS = float(os.getenv("TELEGRAM_RECIPIENTS_CACHE_SECONDS", "30"))
+
+# Pool compartido para entregar a varios destinatarios en paralelo
+_DELIVERY_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("TELEGRAM_DELIVERY_WORKERS", "16")), thread_name_prefix="telegram")
+
+DIGEST_SEPARATOR = "\n\n〰️〰️〰️〰️〰️〰️〰️〰️〰️〰️\n\n"
+
+
+def group_messages(messages: List[str], max_length: int = TELEGRAM_MAX_MESSAGE_LENGTH) -> List[List[str]]:
+    """
+    Reparte los mensajes en el menor número de grupos que quepan en un mensaje de Telegram
+
+    Los mensajes nunca se parten (cortar HTML a la mitad rompería el formato);
+    un mensaje que por sí solo supera el límite queda solo en su grupo.
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_length = 0
+    # Reservar espacio para la cabecera "📦 Resumen: N notificaciones"
+    header_room = 64
+
+    for message in messages:
+        added = len(message.strip()) + (len(DIGEST_SEPARATOR) if current else 0)
+        if current and current_length + added + header_room > max_length:
+            groups.append(current)
+            current, current_length = [], 0
+            added = len(message.strip())
+        current.append(message)
+        current_length += added
+    if current:
+        groups.append(current)
+    return groups
+
+
+def render_digest(group: List[str]) -> str:
+    """Texto de un grupo: el mensaje tal cual si es uno solo, o un resumen con cabecera"""
+    if len(group) == 1:
+        return group[0]
+    header = f"📦 <b>Resumen: {len(group)} notificaciones</b>\n\n"
+    return header + DIGEST_SEPARATOR.join(message.strip() for message in group)
+
+
+def build_digests(messages: List[str], max_length: int = TELEGRAM_MAX_MESSAGE_LENGTH) -> List[str]:
+    """Combina varios mensajes en el menor número de resúmenes que respeten el límite de Telegram"""
+    return [render_digest(group) for group in group_messages(messages, max_length)]
+
+
+class TelegramCoalescer:
+    """
+    Agrupa las notificaciones de cada chat_id durante una ventana de tiempo
+
+    La primera notificación de un chat abre la ventana; al cerrarse, todo lo
+    acumulado se envía como uno o varios resúmenes de hasta 4096 caracteres.
+    Si un envío falla por un error transitorio (red, 5xx, 429 persistente)
+    los mensajes originales de los resúmenes no entregados vuelven al buffer
+    (se reagrupan en el siguiente intento, sin anidar resúmenes), con una
+    espera que se duplica tras TELEGRAM_COALESCE_MAX_ATTEMPTS. Los errores
+    permanentes no se reintentan: un 400 descarta ese resumen y un
+    401/403/404 todo lo pendiente del chat. También se descartan mensajes
+    tras TELEGRAM_COALESCE_GIVE_UP_ATTEMPTS intentos, al superar
+    TELEGRAM_COALESCE_MAX_PENDING por chat o si fallan al apagar la
+    aplicación. Todo lo descartado se escribe completo en el log para
+    poder reenviarlo.
+    """
+
+    def __init__(self, service: "TelegramService", window_seconds: float):
+        self.service = service
+        self.window_seconds = window_seconds
+        self._buffers: Dict[Tuple[str, str], List[str]] = {}
+        self._attempts: Dict[Tuple[str, str], int] = {}
+        self._timers: Dict[Tuple[str, str], threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def add(self, chat_id: str, message: str, parse_mode: str = "HTML"):
+        key = (str(chat_id), parse_mode)
+        with self._lock:
+            self._buffers.setdefault(key, []).append(message)
+            if key not in self._timers:
+                self._schedule(key, self.window_seconds)
+
+    def _schedule(self, key: Tuple[str, str], delay: float):
+        timer = threading.Timer(delay, self.flush, args=(key,))
+        timer.daemon = True
+        self._timers[key] = timer
+        timer.start()
+
+    def flush(self, key: Tuple[str, str], final: bool = False):
+        """
+        Envía todo lo acumulado para un chat
+
+        Args:
+            final: Último intento (al apagar): lo que no se entregue se escribe en el log
+        """
+        with self._lock:
+            self._timers.pop(key, None)
+            messages = self._buffers.pop(key, [])
+        if not messages:
+            return
+
+        chat_id, parse_mode = key
+        groups = group_messages(messages)
+        print(f"📦 Enviando {len(messages)} notificaciones agrupadas en {len(groups)} mensaje(s) al chat {chat_id}")
+
+        for index, group in enumerate(groups):
+            status = self.service.send_message_status(render_digest(group), parse_mode, chat_id=chat_id)
+            if status == 200:
+                continue
+            if status == TELEGRAM_ERROR_MENSAJE:
+                self._log_undelivered(chat_id, group, f"Telegram rechazó el mensaje ({status})")
+                continue
+
+            # Devolver al buffer los mensajes originales que no se pudieron entregar
+            pending = [message for group in groups[index:] for message in group]
+            if status in TELEGRAM_ERRORES_CHAT:
+                self._log_undelivered(chat_id, pending, f"Telegram rechazó el chat ({status})")
+                break
+            if final:
+                self._log_undelivered(chat_id, pending, "no se pudieron entregar al apagar")
+                return
+            with self._lock:
+                attempts = self._attempts.pop(key, 0) + 1
+                agotado = attempts >= TELEGRAM_COALESCE_GIVE_UP_ATTEMPTS
+                if not agotado:
+                    self._attempts[key] = attempts
+                    buffer = pending + self._buffers.get(key, [])
+                    overflow = len(buffer) - TELEGRAM_COALESCE_MAX_PENDING
+                    if overflow > 0:
+                        dropped, buffer = buffer[:overflow], buffer[overflow:]
+                    self._buffers[key] = buffer
+                    if key not in self._timers:
+                        self._schedule(key, self._retry_delay(attempts))
+            if agotado:
+                self._log_undelivered(chat_id, pending, f"{attempts} intentos fallidos")
+                return
+            if overflow > 0:
+                self._log_undelivered(chat_id, dropped, f"superan {TELEGRAM_COALESCE_MAX_PENDING} pendientes")
+            print(f"⚠️ {len(pending) - max(overflow, 0)} notificación(es) para el chat {chat_id} vuelven al buffer (intento {attempts})")
+            return
+
+        with self._lock:
+            self._attempts.pop(key, None)
+
+    def _retry_delay(self, attempts: int) -> float:
+        if attempts < TELEGRAM_COALESCE_MAX_ATTEMPTS:
+            return self.window_seconds
+        backoff = self.window_seconds * 2 ** (attempts - TELEGRAM_COALESCE_MAX_ATTEMPTS + 1)
+        return min(max(backoff, 1.0), TELEGRAM_COALESCE_MAX_DELAY_SECONDS)
+
+    @staticmethod
+    def _log_undelivered(chat_id: str, messages: List[str], reason: str):
+        print(f"❌ {len(messages)} notificación(es) para el chat {chat_id} descartadas: {reason}. Contenido:")
+        for message in messages:
+            print(f"--- chat {chat_id} ---\n{message}")
+
+    def flush_all(self):
+        """Envía inmediatamente todos los buffers (p. ej. al apagar la aplicación)"""
+        with self._lock:
+            keys = list(self._buffers.keys())
+            for key in keys:
+                timer = self._timers.pop(key, None)
+                if timer:
+                    timer.cancel()
+        for key in keys:
+            self.flush(key, final=True)
+
+
 class TelegramService:
     """Servicio para enviar mensajes a través de Telegram Bot API"""
+
+    # Un único agrupador por proceso: las instancias del servicio son efímeras
+    _coalescer: Optional[TelegramCoalescer] = None
+    _coalescer_lock = threading.Lock()
+    
+    # Caché de destinatarios por evento: {evento: (expira_en, [chat_id, ...])}
+    _recipients_cache: Dict[str, Tuple[float, List[str]]] = {}
+    _recipients_lock = threading.Lock()
     
-    def __init__(self):
+    def __init__(self, recipients_collection: Optional[Collection] = None, coalesce_window: Optional[float] = None):
         self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.chat_id = os.getenv("TELEGRAM_CHAT_ID", "5567606129")
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.recipients_collection = recipients_collection
+        self.coalesce_window = TELEGRAM_COALESCE_WINDOW_SECONDS if coalesce_window is None else coalesce_window
     
-    def send_message(self, message: str, parse_mode: str = "HTML") -> bool:
+    def send_message(self, message: str, parse_mode: str = "HTML", chat_id: Optional[str] = None) -> bool:
         """
         Envía un mensaje a través de Telegram
         
+        Ante un 429 espera el retry_after indicado por Telegram y reintenta,
+        hasta TELEGRAM_MAX_RETRIES veces.
+        
         Args:
             message: Contenido del mensaje a enviar
             parse_mode: Formato del mensaje (HTML o Markdown)
+            chat_id: Chat destino (por defecto TELEGRAM_CHAT_ID)
             
         Returns:
             bool: True si se envió correctamente, False en caso contrario
         """
+        return self.send_message_status(message, parse_mode, chat_id=chat_id) == 200
+
+    def send_message_status(self, message: str, parse_mode: str = "HTML", chat_id: Optional[str] = None) -> int:
+        """
+        Igual que send_message, pero devuelve el código HTTP de la última respuesta
+
+        Returns:
+            int: 200 si se envió, el código de error de Telegram, o 0 si no hubo
+                respuesta (sin token, error de red)
+        """
         try:
             if not self.bot_token:
                 print("❌ Error: TELEGRAM_BOT_TOKEN no configurado")
-                return False
+                return 0
             
+            chat_id = chat_id or self.chat_id
             url = f"{self.base_url}/sendMessage"
             payload = {
-                "chat_id": self.chat_id,
+                "chat_id": chat_id,
                 "text": message,
                 "parse_mode": parse_mode
             }
             
-            print(f"📱 Enviando mensaje a Telegram (Chat ID: {self.chat_id})...")
-            response = requests.post(url, json=payload, timeout=10)
-            
-            if response.status_code == 200:
-                print(f"✅ Mensaje enviado exitosamente a Telegram")
-                return True
-            else:
+            for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+                print(f"📱 Enviando mensaje a Telegram (Chat ID: {chat_id})...")
+                response = requests.post(url, json=payload, timeout=10)
+                
+                if response.status_code == 200:
+                    print(f"✅ Mensaje enviado exitosamente a Telegram")
+                    return 200
+                
+                if response.status_code == 429 and attempt < TELEGRAM_MAX_RETRIES:
+                    retry_after = self._retry_after(response)
+                    print(f"⏳ Telegram limitó el envío (429). Reintentando en {retry_after}s...")
+                    time.sleep(retry_after)
+                    continue
+                
                 print(f"❌ Error al enviar mensaje a Telegram: {response.status_code}")
                 print(f"📄 Respuesta: {response.text}")
-                return False
+                return response.status_code
+            return 0
                 
         except Exception as e:
             print(f"❌ Error enviando mensaje a Telegram: {str(e)}")
             print(f"📧 Tipo de error: {type(e).__name__}")
+            return 0
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        """Segundos de espera indicados por Telegram en una respuesta 429"""
+        try:
+            return float(response.json().get("parameters", {}).get("retry_after", 1))
+        except Exception:
+            return float(response.headers.get("Retry-After", 1))
+
+    def queue_message(self, message: str, parse_mode: str = "HTML", chat_id: Optional[str] = None) -> bool:
+        """
+        Encola un mensaje en el agrupador por chat si el modo de agrupación está activo
+        
+        Con TELEGRAM_COALESCE_WINDOW_SECONDS = 0 se envía inmediatamente.
+        
+        Returns:
+            bool: True si se encoló o envió correctamente
+        """
+        if self.coalesce_window <= 0:
+            return self.send_message(message, parse_mode, chat_id=chat_id)
+        
+        TelegramService.get_coalescer(self.coalesce_window).add(chat_id or self.chat_id, message, parse_mode)
+        return True
+
+    @classmethod
+    def get_coalescer(cls, window_seconds: float) -> TelegramCoalescer:
+        with cls._coalescer_lock:
+            if cls._coalescer is None:
+                cls._coalescer = TelegramCoalescer(cls(coalesce_window=0), window_seconds)
+            return cls._coalescer
+
+    @classmethod
+    def flush_pending(cls):
+        """Envía las notificaciones que sigan en los buffers de agrupación"""
+        if cls._coalescer is not None:
+            cls._coalescer.flush_all()
+    
+    def get_recipients(self, event: str) -> List[str]:
+        """
+        Chats que deben recibir un evento según el registro de destinatarios
+        
+        Sin registro configurado (o sin destinatarios activos para el evento)
+        se usa el chat por defecto TELEGRAM_CHAT_ID.
+        """
+        if self.recipients_collection is None:
+            return [self.chat_id]
+        
+        now = time.monotonic()
+        cached = TelegramService._recipients_cache.get(event)
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        try:
+            cursor = self.recipients_collection.find(
+                {"activo": True, "eventos": {"$in": [event, EVENTO_TODOS]}},
+                {"chat_id": 1}
+            )
+            chat_ids = list(dict.fromkeys(str(doc["chat_id"]) for doc in cursor))
+        except Exception as e:
+            print(f"❌ Error consultando destinatarios de Telegram: {str(e)}")
+            chat_ids = []
+        
+        chat_ids = chat_ids or [self.chat_id]
+        with TelegramService._recipients_lock:
+            TelegramService._recipients_cache[event] = (now + TELEGRAM_RECIPIENTS_CACHE_SECONDS, chat_ids)
+        return chat_ids
+
+    @classmethod
+    def invalidate_recipients(cls):
+        """Descarta la caché de destinatarios (llamar tras modificar el registro)"""
+        with cls._recipients_lock:
+            cls._recipients_cache.clear()
+
+    def _deliver(self, chat_id: str, message: str, parse_mode: str, coalesce: bool) -> bool:
+        """Entrega a un destinatario con reintentos propios (backoff exponencial)"""
+        if not self.bot_token:
+            print("❌ Error: TELEGRAM_BOT_TOKEN no configurado")
             return False
+        
+        if coalesce:
+            return self.queue_message(message, parse_mode, chat_id=chat_id)
+        
+        for attempt in range(TELEGRAM_RECIPIENT_RETRIES + 1):
+            if self.send_message(message, parse_mode, chat_id=chat_id):
+                return True
+            if attempt < TELEGRAM_RECIPIENT_RETRIES:
+                time.sleep(0.5 * 2 ** attempt)
+        return False
+
+    def _submit_all(self, event: str, message: str, parse_mode: str, coalesce: bool) -> Dict[str, Future]:
+        return {
+            chat_id: _DELIVERY_POOL.submit(self._deliver, chat_id, message, parse_mode, coalesce)
+            for chat_id in self.get_recipients(event)
+        }
+
+    def notify_event_sync(self, event: str, message: str, parse_mode: str = "HTML", coalesce: bool = False) -> Dict[str, bool]:
+        """
+        Envía un mensaje a todos los destinatarios de un evento en paralelo
+        
+        Los envíos se lanzan a la vez en un pool de hilos, así que añadir
+        destinatarios no suma latencia secuencial.
+        
+        Returns:
+            Dict[str, bool]: Resultado por chat_id
+        """
+        futures = self._submit_all(event, message, parse_mode, coalesce)
+        return {chat_id: future.result() for chat_id, future in futures.items()}
+
+    async def notify_event(self, event: str, message: str, parse_mode: str = "HTML", coalesce: bool = False) -> Dict[str, bool]:
+        """Versión async de notify_event_sync: no bloquea el event loop mientras se entrega"""
+        futures = await asyncio.to_thread(self._submit_all, event, message, parse_mode, coalesce)
+        results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures.values()))
+        return dict(zip(futures.keys(), results))
     
     def send_password_recovery(self, username: str, email: str, temp_password: str) -> bool:
         """
@@ -64,23 +405,15 @@ class TelegramService:
         Returns:
             bool: True si se envió correctamente, False en caso contrario
         """
-        message = f"""
-🔐 <b>Recuperación de Contraseña - LeyesVzla</b>
-
-👤 <b>Usuario:</b> {username}
-📧 <b>Email:</b> {email}
-
-🔑 <b>Contraseña Temporal:</b>
-<code>{temp_password}</code>
-
-⚠️ <b>Instrucciones:</b>
-• Esta contraseña es temporal
-• Debe ser cambiada inmediatamente al iniciar sesión
-• Por seguridad, expira en 24 horas
-
-"""
+        message = TemplateService.render(
+            "telegram/recuperacion_password.html",
+            username=username,
+            email=email,
+            temp_password=temp_password
+        )
         
-        return self.send_message(message)
+        results = self.notify_event_sync(EVENTO_RECUPERACION_PASSWORD, message)
+        return any(results.values())
     
     def send_cotizacion_notification(self, cotizacion_data: dict) -> bool:
         """
@@ -105,31 +438,20 @@ class TelegramService:
             total = resumen_costo.get("total", 0) if isinstance(resumen_costo, dict) else 0
             
             estado = cotizacion_data.get("estado", "pendiente")
-            cotizacion_id = cotizacion_data.get("_id", "No especificado")
             
-            # Formatear el mensaje según el diseño deseado
-            message = f"""
-📋 <b>NUEVA COTIZACIÓN GENERADA</b>
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-👤 <b>Cliente:</b> {cliente_nombre}
-📧 <b>Email:</b> {cliente_email}
-📅 <b>Fecha:</b> {fecha_completa}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-💰 <b>Total:</b> ${total}
-🏷️ <b>Estado:</b> {estado}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-✅ <b>Acciones:</b>
-• Revisar detalles completos
-• Contactar al cliente
-• Seguir el proceso de venta
-
-📋 Esta cotización ha sido registrada en el sistema y está lista para su procesamiento.
-            """
+            # Formatear el mensaje con la plantilla compilada
+            message = TemplateService.render(
+                "telegram/nueva_cotizacion.html",
+                cliente_nombre=cliente_nombre,
+                cliente_email=cliente_email,
+                fecha_completa=fecha_completa,
+                total=total,
+                estado=estado
+            )
             
-            return self.send_message(message)
+            # En ráfagas de cotizaciones los mensajes se agrupan por chat (si está activo)
+            results = self.notify_event_sync(EVENTO_NUEVA_COTIZACION, message, coalesce=True)
+            return any(results.values())
             
         except Exception as e:
             print(f"❌ Error enviando notificación de cotización: {str(e)}")
@@ -0,0 +1,83 @@
+import os
+from typing import Any, Dict
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+from markupsafe import Markup
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), '..', 'templates')
+
+# Fragmentos sin variables: se renderizan una sola vez y se inyectan ya listos
+STATIC_PARTIALS = {
+    "estilos_cotizacion": "email/_estilos_cotizacion.html",
+    "estilos_recuperacion": "email/_estilos_recuperacion.html",
+    "pie_cotizacion": "email/_pie_cotizacion.html",
+    "acciones_cotizacion": "telegram/_acciones_cotizacion.html",
+}
+
+TELEGRAM_SEPARATOR = "━" * 49
+
+
+def _format_money(value: Any) -> str:
+    """Formato monetario usado en los correos (1,234.50)"""
+    try:
+        return f"{float(value):,.2f}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+class TemplateService:
+    """
+    Plantillas Jinja2 compiladas y cacheadas para correos y mensajes de Telegram.
+
+    El entorno se crea una sola vez por proceso: cada plantilla se compila en
+    su primer uso (o en preload) y queda en la caché de Jinja2, y los
+    fragmentos estáticos (CSS, pies, bloques de acciones) se pre-renderizan
+    al arrancar para que cada envío solo interpole los datos variables.
+    """
+
+    _env: Environment = None
+    _static: Dict[str, Markup] = {}
+
+    @classmethod
+    def environment(cls) -> Environment:
+        if cls._env is None:
+            env = Environment(
+                loader=FileSystemLoader(TEMPLATES_DIR),
+                autoescape=select_autoescape(["html"]),
+                undefined=StrictUndefined,
+                auto_reload=False,
+                cache_size=-1,
+                trim_blocks=True,
+                lstrip_blocks=True,
+            )
+            env.filters["moneda"] = _format_money
+            cls._env = env
+        return cls._env
+
+    @classmethod
+    def preload(cls) -> None:
+        """Compila todas las plantillas y pre-renderiza los fragmentos estáticos"""
+        env = cls.environment()
+        static = {"separador": Markup(TELEGRAM_SEPARATOR)}
+        for key, name in STATIC_PARTIALS.items():
+            static[key] = Markup(env.get_template(name).render().strip())
+        env.globals["estaticos"] = static
+        cls._static = static
+
+        for name in env.list_templates(extensions=["html"]):
+            env.get_template(name)
+
+    @classmethod
+    def render(cls, template_name: str, **context: Any) -> str:
+        """
+        Renderiza una plantilla compilada
+
+        Args:
+            template_name: Ruta relativa a templates/ (ej: "email/cotizacion.html")
+            **context: Variables de la plantilla
+
+        Returns:
+            str: Contenido renderizado
+        """
+        if not cls._static:
+            cls.preload()
+        return cls.environment().get_template(template_name).render(**context)
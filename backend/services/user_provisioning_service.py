@@ -0,0 +1,169 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import ValidationError
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+from schemas.user_schemas import UserCreateSchema
+from services.auth_service import AuthService
+
+# Procesos para calcular los hashes bcrypt de un lote (CPU puro)
+USUARIOS_HASH_WORKERS = int(os.getenv("USUARIOS_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Filas por petición/lote de alta masiva
+USUARIOS_LOTE_MAX = int(os.getenv("USUARIOS_LOTE_MAX", "1000"))
+
+
+def hash_password(password: str) -> str:
+    """Hash de una contraseña (se ejecuta en los procesos del pool)"""
+    return AuthService.get_password_hash(password)
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+class UserProvisioningService:
+    """
+    Alta masiva de usuarios
+
+    Valida cada fila con UserCreateSchema, descarta los duplicados dentro del
+    lote y los ya registrados (una sola consulta `$in` por username y email),
+    calcula los hashes bcrypt en un ProcessPoolExecutor repartido entre los
+    núcleos y escribe todo con un insert_many no ordenado. Una fila con error
+    no impide crear las demás; el resultado informa cada fila por separado.
+
+    A diferencia de /register, una fila sin `is_admin` crea un usuario
+    normal. Las filas con `temporal: true` (contraseña generada por el alta)
+    quedan sin `password_created_at`, de modo que el primer login exige
+    cambiar la contraseña.
+    """
+
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    def __init__(self, users_collection: Collection, max_workers: int = USUARIOS_HASH_WORKERS):
+        self.users_collection = users_collection
+        self.max_workers = max(1, max_workers)
+
+    @classmethod
+    def _get_pool(cls, max_workers: int) -> ProcessPoolExecutor:
+        if cls._pool is None:
+            cls._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return cls._pool
+
+    @classmethod
+    def shutdown(cls):
+        if cls._pool is not None:
+            cls._pool.shutdown(wait=False, cancel_futures=True)
+            cls._pool = None
+
+    def hash_passwords(self, passwords: List[str]) -> List[str]:
+        """Hashes en paralelo (en el proceso actual si el lote es de una sola contraseña)"""
+        if len(passwords) <= 1 or self.max_workers == 1:
+            return [hash_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.max_workers * 4))
+        return list(self._get_pool(self.max_workers).map(hash_password, passwords, chunksize=chunksize))
+
+    def provision(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Crea los usuarios de `rows`
+
+        Args:
+            rows: Filas con username, email, password, is_admin (opcional, false) y temporal (opcional)
+
+        Returns:
+            Dict: {"creados", "errores", "resultados": [{"fila", "username", "status", "_id" | "error"}]}
+        """
+        if len(rows) > USUARIOS_LOTE_MAX:
+            raise ValueError(f"Máximo {USUARIOS_LOTE_MAX} usuarios por lote")
+
+        resultados: List[Dict[str, Any]] = []
+        validos: List[Dict[str, Any]] = []
+        usernames = set()
+        emails = set()
+        for fila, row in enumerate(rows, start=1):
+            resultado = {"fila": fila, "username": row.get("username") if isinstance(row, dict) else None}
+            resultados.append(resultado)
+            try:
+                user = UserCreateSchema(**{"is_admin": False, **row})
+            except ValidationError as e:
+                resultado.update(status="error", error=_validation_message(e))
+                continue
+            except TypeError:
+                resultado.update(status="error", error="Fila inválida")
+                continue
+
+            if user.username in usernames:
+                resultado.update(status="error", error="Nombre de usuario repetido en el lote")
+                continue
+            if user.email in emails:
+                resultado.update(status="error", error="Email repetido en el lote")
+                continue
+            usernames.add(user.username)
+            emails.add(user.email)
+            validos.append({"resultado": resultado, "user": user, "temporal": bool(row.get("temporal"))})
+
+        # Una sola consulta para los ya registrados
+        if validos:
+            registrados = list(self.users_collection.find(
+                {"$or": [{"username": {"$in": list(usernames)}}, {"email": {"$in": list(emails)}}]},
+                {"username": 1, "email": 1}
+            ))
+            usernames_registrados = {user["username"] for user in registrados}
+            emails_registrados = {user["email"] for user in registrados}
+            pendientes = []
+            for item in validos:
+                if item["user"].username in usernames_registrados:
+                    item["resultado"].update(status="error", error="El nombre de usuario ya existe")
+                elif item["user"].email in emails_registrados:
+                    item["resultado"].update(status="error", error="El email ya está registrado")
+                else:
+                    pendientes.append(item)
+            validos = pendientes
+
+        if validos:
+            hashes = self.hash_passwords([item["user"].password for item in validos])
+            ahora = datetime.utcnow()
+            documentos = [
+                {
+                    "username": item["user"].username,
+                    "email": item["user"].email,
+                    "hashed_password": hashed,
+                    "is_active": True,
+                    "is_admin": item["user"].is_admin,
+                    "created_at": ahora,
+                    # Sin fecha la contraseña cuenta como vencida: cambio obligatorio en el primer login
+                    "password_created_at": None if item["temporal"] else ahora,
+                    "password_needs_reset": item["temporal"],
+                    "last_login": None,
+                    "failed_login_attempts": 0,
+                    "locked_until": None,
+                    "reset_token": None,
+                    "reset_token_expires": None
+                }
+                for item, hashed in zip(validos, hashes)
+            ]
+
+            rechazados: Dict[int, str] = {}
+            try:
+                # ordered=False: un duplicado concurrente solo rechaza su fila
+                self.users_collection.insert_many(documentos, ordered=False)
+            except BulkWriteError as e:
+                rechazados = {
+                    error["index"]: "El usuario o el email ya existe" if error.get("code") == 11000 else error.get("errmsg", "Error al insertar")
+                    for error in e.details.get("writeErrors", [])
+                }
+
+            for index, (item, documento) in enumerate(zip(validos, documentos)):
+                if index in rechazados:
+                    item["resultado"].update(status="error", error=rechazados[index])
+                else:
+                    item["resultado"].update(status="creado", _id=str(documento["_id"]))
+
+        creados = sum(1 for resultado in resultados if resultado["status"] == "creado")
+        return {
+            "creados": creados,
+            "errores": len(resultados) - creados,
+            "resultados": resultados
+        }
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Prueba del envío batch de emails contra un servidor Resend local
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import resend
+from fake_resend_server import FakeResendServer
+from services.email_service import EmailService
+
+def _messages(count: int):
+    return [
+        {"to": f"cliente{i}@example.com", "subject": f"Cotización {i}", "html": f"<p>Cotización {i}</p>"}
+        for i in range(count)
+    ]
+
+def test_batch_email():
+    """250 emails -> 3 peticiones batch; el lote rechazado se reenvía de uno en uno"""
+    server = FakeResendServer(latency=0.05, fail_to=["rechazado@example.com"]).start()
+    original_url = resend.api_url
+    resend.api_url = server.url
+    try:
+        messages = _messages(250)
+        messages[120]["to"] = "rechazado@example.com"
+
+        results = asyncio.run(EmailService.send_batch_emails(messages, max_concurrency=2))
+
+        print(f"📨 Peticiones recibidas por el servidor: {len(server.requests)}")
+        print(f"🔀 Máximo de peticiones simultáneas: {server.max_in_flight}")
+        batch = [r for r in server.requests if r["path"] == "/emails/batch"]
+        individuales = [r for r in server.requests if r["path"] == "/emails"]
+        assert len(batch) == 3
+        # El lote rechazado (100-199) se reenvía de uno en uno
+        assert len(individuales) == 100
+        assert server.max_in_flight <= 2
+
+        assert len(results) == 250
+        assert [r["to"] for r in results] == [m["to"] for m in messages]
+        # Solo falla el destinatario rechazado; el resto de su lote se envía
+        failed = [i for i, r in enumerate(results) if r["status"] == "error"]
+        assert failed == [120]
+        assert "rechazado@example.com" in results[120]["error"]
+        assert all(results[i]["id"] for i in range(250) if i not in failed)
+        print("✅ Envío batch correcto")
+    finally:
+        resend.api_url = original_url
+        server.stop()
+
+if __name__ == "__main__":
+    test_batch_email()
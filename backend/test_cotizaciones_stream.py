@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Script para probar los deltas del feed de cotizaciones (change stream)
+
+Los `$set` con rutas con punto (el reprecio escribe
+"opcion_pago.valor_cuota") llegan en `updatedFields` con la ruta tal
+cual. El dashboard aplica el delta con `{ ...q, ...delta.campos }`, así
+que el delta debe traer el campo de primer nivel completo y no la ruta.
+
+Archivar una cotización la borra de la colección activa: el feed debe
+anunciarla como archivada (update con `fecha_archivo`) y no como borrada,
+igual en modo change stream y en polling.
+
+Requiere mongomock (benchmarks/requirements.txt).
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+import mongomock
+from bson import ObjectId
+
+from services.archive_service import ArchiveService
+from services.cotizaciones_stream import CotizacionesChangeFeed
+from services.sync_service import SyncService
+
+
+def evento_update(doc, updated_fields, removed_fields=()):
+    return {
+        "operationType": "update",
+        "documentKey": {"_id": doc["_id"] if doc else ObjectId()},
+        "updateDescription": {"updatedFields": updated_fields, "removedFields": list(removed_fields)},
+        "fullDocument": doc,
+    }
+
+
+def verificar(nombre, condicion, detalle=""):
+    print(f"{'✓' if condicion else '✗'} {nombre}{': ' + detalle if detalle and not condicion else ''}")
+    return condicion
+
+
+def probar_rutas_con_punto():
+    feed = CotizacionesChangeFeed(collection=None, sync_service=None)
+    doc = {
+        "_id": ObjectId(),
+        "estado": "pendiente",
+        "opcion_pago": {"tipo": "Cuotas", "cantidad_cuotas": 3, "valor_cuota": 40.0},
+        "resumen_costo": {"subtotal_leyes": 100.0, "costo_encuadernacion": 20.0, "total": 120.0},
+        "leyes_seleccionadas": {"items": [], "subtotal": 100.0},
+    }
+    ok = True
+
+    # Reprecio: rutas con punto y un campo de primer nivel
+    delta = feed._delta_from_change(evento_update(doc, {
+        "opcion_pago.valor_cuota": 40.0,
+        "leyes_seleccionadas.subtotal": 100.0,
+        "resumen_costo": doc["resumen_costo"],
+    }))
+    campos = delta["campos"]
+    ok &= verificar("Sin rutas con punto en el delta", not any("." in key for key in campos), str(list(campos)))
+    ok &= verificar("opcion_pago completo", campos.get("opcion_pago") == doc["opcion_pago"], str(campos.get("opcion_pago")))
+    ok &= verificar("leyes_seleccionadas completo", campos.get("leyes_seleccionadas") == doc["leyes_seleccionadas"])
+    ok &= verificar("resumen_costo sin cambios", campos.get("resumen_costo") == doc["resumen_costo"])
+
+    # Lo mismo que hace el dashboard: el campo anidado queda actualizado
+    anterior = {**doc, "opcion_pago": {**doc["opcion_pago"], "valor_cuota": 50.0}}
+    aplicado = {**anterior, **campos}
+    ok &= verificar("La cuota mostrada es la nueva", aplicado["opcion_pago"]["valor_cuota"] == 40.0)
+
+    # Campo eliminado con ruta
+    delta = feed._delta_from_change(evento_update(doc, {}, removed_fields=["opcion_pago.descuento"]))
+    ok &= verificar("removedFields con punto", delta["campos"] == {"opcion_pago": doc["opcion_pago"]}, str(delta["campos"]))
+
+    # Campos simples pasan sin cambios
+    delta = feed._delta_from_change(evento_update(doc, {"estado": "aprobada"}))
+    ok &= verificar("Campo simple", delta["campos"] == {"estado": "aprobada"}, str(delta["campos"]))
+
+    # Documento ya borrado (fullDocument None): se omiten las rutas
+    delta = feed._delta_from_change(evento_update(None, {"opcion_pago.valor_cuota": 40.0, "estado": "aprobada"}))
+    ok &= verificar("Sin fullDocument no se envían rutas", delta["campos"] == {"estado": "aprobada"}, str(delta["campos"]))
+    return ok
+
+
+def probar_archivo():
+    db = mongomock.MongoClient().feed_test
+    sync_service = SyncService(db.contadores, db.lapidas, {"cotizaciones": db.cotizaciones})
+    archive_service = ArchiveService(db.cotizaciones, db.archivo, edad_dias=0, sync_service=sync_service)
+    feed = CotizacionesChangeFeed(db.cotizaciones, sync_service, archive_collection=db.archivo)
+    ok = True
+
+    entregada = {"_id": ObjectId(), "estado": "entregado", "fecha_entrega": datetime.now() - timedelta(days=1), **sync_service.stamp()}
+    borrada = {"_id": ObjectId(), "estado": "pendiente", **sync_service.stamp()}
+    db.cotizaciones.insert_many([entregada, borrada])
+    desde = sync_service.current_version()
+
+    archive_service.run()
+    db.cotizaciones.delete_one({"_id": borrada["_id"]})
+    sync_service.record_delete("cotizaciones", borrada["_id"])
+
+    # Polling: update con fecha_archivo para la archivada, delete solo para la borrada
+    deltas = {delta["id"]: delta for delta in feed._changes(desde, set())}
+    archivada = deltas.get(str(entregada["_id"]), {})
+    ok &= verificar("Polling: archivada como update", archivada.get("tipo") == "update" and bool(archivada["campos"].get("fecha_archivo")), str(archivada))
+    ok &= verificar("Polling: borrada como delete", deltas.get(str(borrada["_id"]), {}).get("tipo") == "delete")
+
+    # Change stream: el delete de la colección activa es un update si la cotización está en el archivo
+    def evento_delete(doc_id, coll):
+        return {"operationType": "delete", "ns": {"db": "feed_test", "coll": coll}, "documentKey": {"_id": doc_id}}
+
+    delta = feed._delta_from_change(evento_delete(entregada["_id"], "cotizaciones"))
+    ok &= verificar("Stream: archivada como update", delta["tipo"] == "update" and delta["campos"] == archivada.get("campos"), str(delta))
+    delta = feed._delta_from_change(evento_delete(borrada["_id"], "cotizaciones"))
+    ok &= verificar("Stream: borrada como delete", delta == {"tipo": "delete", "id": str(borrada["_id"])}, str(delta))
+    delta = feed._delta_from_change(evento_delete(entregada["_id"], "archivo"))
+    ok &= verificar("Stream: borrado del archivo como delete", delta["tipo"] == "delete", str(delta))
+    return ok
+
+
+def main():
+    ok = probar_rutas_con_punto()
+    ok &= probar_archivo()
+
+    print("\n✅ Todas las pruebas pasaron" if ok else "\n❌ Hay pruebas fallidas")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
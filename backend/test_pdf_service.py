@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Script para probar el PDF de cotizaciones con datos del cliente que
+contienen markup
+
+Los nombres y emails los escribe el cliente (POST /cotizaciones es
+público) y reportlab interpreta el texto de un Paragraph como markup: sin
+escapar, "<b>" sin cerrar rompe el maquetado (500) y `<img src=...>` hace
+que reportlab abra archivos locales o URLs. Se prueba el maquetado directo
+y el flujo completo sobre mongomock.
+
+Requiere mongomock y reportlab (benchmarks/requirements.txt, requirements.txt).
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+os.environ["PDF_CACHE_DIR"] = tempfile.mkdtemp(prefix="leyesvzla-pdf-test-")
+
+import httpx
+import mongomock
+
+from benchmarks.environment import build_app
+from benchmarks.seed_data import cotizacion_payload, seed_database
+from services.pdf_service import render_cotizacion_pdf
+
+# Archivo inexistente: si reportlab interpretara el <img> fallaría al abrirlo
+IMAGEN = os.path.join(os.environ["PDF_CACHE_DIR"], "no-existe.png")
+
+NOMBRES = [
+    "x <b>y",
+    "a</b>",
+    f'a <img src="{IMAGEN}"/>',
+    "Pérez & Hijos <S.A.>",
+]
+
+
+def datos(nombre):
+    return {
+        "id": "prueba",
+        "cliente_nombre": nombre,
+        "cliente_email": f"{nombre}@example.com",
+        "fecha": "hoy",
+        "estado": "pendiente",
+        "items": [{"nombre": nombre, "grosor": "Bajo", "precio": 10}],
+        "volumenes": [{"numero": 1, "leyes": nombre}],
+        "encuadernacion": "",
+        "subtotal_leyes": 10,
+        "costo_encuadernacion": 0,
+        "total": 10,
+        "opcion_pago": "Contado",
+    }
+
+
+def probar_maquetado():
+    ok = True
+    for nombre in NOMBRES:
+        try:
+            pdf = render_cotizacion_pdf(datos(nombre))
+            correcto = pdf.startswith(b"%PDF")
+            print(f"{'✓' if correcto else '✗'} Maquetado con {nombre!r}: {len(pdf)} bytes")
+        except Exception as e:
+            correcto = False
+            print(f"✗ Maquetado con {nombre!r}: {type(e).__name__}: {str(e)[:120]}")
+        ok &= correcto
+    return ok
+
+
+async def probar_api(app, leyes):
+    ok = True
+    rng = random.Random(1)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for nombre in NOMBRES:
+                payload = cotizacion_payload(leyes, rng)
+                payload["cliente"]["nombre"] = nombre
+                creada = await client.post("/cotizaciones", json=payload)
+                if creada.status_code not in (200, 201):
+                    print(f"✗ POST /cotizaciones con {nombre!r}: {creada.status_code} {creada.text[:120]}")
+                    ok = False
+                    continue
+                pdf = await client.get(f"/cotizaciones/{creada.json()['_id']}/pdf")
+                correcto = pdf.status_code == 200 and pdf.content.startswith(b"%PDF")
+                print(f"{'✓' if correcto else '✗'} GET /cotizaciones/{{id}}/pdf con {nombre!r}: {pdf.status_code}")
+                ok &= correcto
+    return ok
+
+
+def main():
+    db = mongomock.MongoClient().pdf_test
+    seed = seed_database(db, 0, {"leyes": "leyes", "cotizaciones": "cotizaciones", "encuadernacion": "encuadernacion", "users": "users"})
+    app = build_app(db)
+
+    ok = probar_maquetado()
+    ok &= asyncio.run(probar_api(app, seed["leyes"]))
+
+    print("\n✅ Todas las pruebas pasaron" if ok else "\n❌ Hay pruebas fallidas")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Script para probar el agrupamiento de consultas simultáneas (SingleFlight)
+
+Monta la aplicación sobre mongomock, hace lentas las consultas y lanza
+muchas peticiones a la vez: cada clave debe producir una sola consulta a
+Mongo por cada fallo de caché, y los errores deben llegar a todas las
+peticiones agrupadas.
+
+Requiere mongomock (benchmarks/requirements.txt).
+"""
+
+import asyncio
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+import httpx
+import mongomock
+
+from app_factory import create_app
+from services.auth_service import AuthService
+from services.single_flight import SingleFlight
+
+PETICIONES = 50
+# Latencia artificial de cada consulta, para que las peticiones se solapen
+LATENCIA_SEGUNDOS = 0.05
+
+consultas = Counter()
+_find_original = mongomock.collection.Collection.find
+
+
+def find_lento(self, *args, **kwargs):
+    consultas[self.name] += 1
+    time.sleep(LATENCIA_SEGUNDOS)
+    return _find_original(self, *args, **kwargs)
+
+
+def seed(db):
+    db.leyes.insert_many([
+        {"nombre": f"Ley {n}", "grosor": "Bajo", "precio": 10.0 + n, "categoria": "General", "fecha_actualizacion": datetime.now()}
+        for n in range(20)
+    ])
+    db.encuadernacion.insert_many([
+        {"material": "MDF", "tamano": "Carta", "precio": 20.0, "activo": True, "fecha_creacion": datetime.now(), "fecha_actualizacion": datetime.now()},
+        {"material": "Plastificado", "tamano": "Pequeño", "precio": 5.0, "activo": False, "fecha_creacion": datetime.now(), "fecha_actualizacion": datetime.now()}
+    ])
+    user_id = db.users.insert_one({
+        "username": "admin",
+        "email": "admin@example.com",
+        "hashed_password": "-",
+        "is_active": True,
+        "is_admin": True,
+        "created_at": datetime.utcnow(),
+        "password_created_at": datetime.utcnow(),
+        "last_login": None
+    }).inserted_id
+    return AuthService.create_access_token({"sub": str(user_id)})
+
+
+async def rafaga(client, path, n=PETICIONES, headers=None):
+    responses = await asyncio.gather(*[client.get(path, headers=headers) for _ in range(n)])
+    assert all(r.status_code == 200 for r in responses), [r.status_code for r in responses]
+    primera = responses[0].json()
+    assert all(r.json() == primera for r in responses), "Las respuestas agrupadas difieren"
+    return primera
+
+
+def check(nombre, obtenido, esperado):
+    estado = "✓" if obtenido == esperado else "✗"
+    print(f"{estado} {nombre}: {obtenido} consulta(s) (esperado {esperado})")
+    return obtenido == esperado
+
+
+async def probar_api(app, token):
+    ok = True
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        consultas.clear()
+        leyes = await rafaga(client, "/leyes")
+        ok &= check(f"GET /leyes x{PETICIONES} ({len(leyes)} leyes)", consultas["leyes"], 1)
+
+        consultas.clear()
+        await rafaga(client, "/leyes")
+        ok &= check("GET /leyes, segundo fallo", consultas["leyes"], 1)
+
+        consultas.clear()
+        activas, todas = await asyncio.gather(rafaga(client, "/encuadernacion"), rafaga(client, "/encuadernacion/admin"))
+        ok &= check(
+            f"GET /encuadernacion y /encuadernacion/admin x{PETICIONES} ({len(activas)} y {len(todas)})",
+            consultas["encuadernacion"],
+            2
+        )
+
+        consultas.clear()
+        usuario = await rafaga(client, "/auth/me", headers={"Authorization": f"Bearer {token}"})
+        ok &= check(f"GET /auth/me x{PETICIONES} ({usuario['username']})", consultas["users"], 1)
+
+        consultas.clear()
+        await rafaga(client, "/planes-pago/cotizaciones-pendientes")
+        ok &= check("GET /planes-pago/cotizaciones-pendientes", consultas["cotizaciones"], 1)
+    return ok
+
+
+async def probar_errores():
+    flight = SingleFlight()
+
+    def falla():
+        time.sleep(LATENCIA_SEGUNDOS)
+        raise RuntimeError("Mongo no disponible")
+
+    resultados = await asyncio.gather(*[flight.do("clave", falla) for _ in range(10)], return_exceptions=True)
+    ok = all(isinstance(r, RuntimeError) for r in resultados)
+    print(f"{'✓' if ok else '✗'} Error propagado a {sum(isinstance(r, RuntimeError) for r in resultados)} de 10 peticiones")
+    return ok & check("Carga con error", flight.executions, 1)
+
+
+def main():
+    db = mongomock.MongoClient().single_flight_test
+    token = seed(db)
+    app = create_app(db, archive_interval=0)
+
+    mongomock.collection.Collection.find = find_lento
+    try:
+        ok = asyncio.run(probar_api(app, token))
+        ok &= asyncio.run(probar_errores())
+    finally:
+        mongomock.collection.Collection.find = _find_original
+
+    print("\n✅ Todas las pruebas pasaron" if ok else "\n❌ Hay pruebas fallidas")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
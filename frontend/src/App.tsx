@@ -3,7 +3,8 @@ import { useMemo, useState, useEffect } from 'react';
 import { Toaster } from 'react-hot-toast';
 import { LawCatalog } from './components/LawCatalog';
 import { QuoteSummary } from './components/QuoteSummary';
-import { lawsCatalog, loadLawsFromBackend, staticLawsCatalog } from './data/lawsData';
+import { lawsCatalog, loadLawsFromBackend, staticLawsCatalog, applyBackendLaws } from './data/lawsData';
+import { loadBootstrap } from './data/bootstrapData';
 import { BookIcon } from 'lucide-react';
 import { AdminButton } from './components/AdminButton';
 
@@ -17,7 +18,11 @@ export function App() {
     const initializeLaws = async () => {
       try {
         setIsLoading(true);
-        await loadLawsFromBackend();
+        try {
+          applyBackendLaws((await loadBootstrap()).leyes);
+        } catch {
+          await loadLawsFromBackend();
+        }
         setCurrentLaws(lawsCatalog);
       } catch (error) {
         console.error('Error inicializando leyes:', error);
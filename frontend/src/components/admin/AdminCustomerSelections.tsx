@@ -11,7 +11,8 @@ export const AdminCustomerSelections: React.FC = () => {
     quotations,
     loading,
     error,
-    updateQuotationStatus
+    updateQuotationStatus,
+    updateQuotationsStatus
   } = useAdmin();
 
   const [searchTerm, setSearchTerm] = useState('');
@@ -111,6 +112,27 @@ export const AdminCustomerSelections: React.FC = () => {
     }
   };
 
+  // Marcar como entregadas todas las cotizaciones visibles (una sola petición)
+  const handleMarkAllAsDelivered = async () => {
+    const ids = filteredSelections
+      .map(quotation => (typeof quotation._id === 'object' ? quotation._id.$oid : quotation._id) || '')
+      .filter(id => id !== '');
+    if (ids.length === 0) return;
+    if (window.confirm(`¿Estás seguro de marcar ${ids.length} cotización(es) como entregadas?`)) {
+      const loadingToast = toast.loading('Actualizando estados...');
+      try {
+        const result = await updateQuotationsStatus(ids, 'entregado');
+        if (selectedSelection && ids.includes(selectedSelection)) {
+          setSelectedSelection(null);
+        }
+        toast.success(`${result.actualizadas} cotización(es) marcadas como entregadas`, { id: loadingToast });
+      } catch (error: any) {
+        console.error('Error al marcar como entregadas:', error);
+        toast.error(`Error al marcar como entregadas: ${error.message || 'Error desconocido'}`, { id: loadingToast });
+      }
+    }
+  };
+
   const handleRefresh = async () => {
     try {
       setLocalLoading(true);
@@ -180,6 +202,15 @@ export const AdminCustomerSelections: React.FC = () => {
               className="pl-10 pr-4 py-2 border border-gray-300 rounded-md focus:ring-blue-500 focus:border-blue-500 w-64" 
             />
           </div>
+          <button
+            onClick={handleMarkAllAsDelivered}
+            disabled={filteredSelections.length === 0}
+            className="flex items-center px-3 py-2 bg-green-600 text-white rounded-md hover:bg-green-700 transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
+            title="Marcar todas las cotizaciones visibles como entregadas"
+          >
+            <CheckCircleIcon size={16} className="mr-2" />
+            Entregar visibles
+          </button>
           <button
             onClick={handleRefresh}
             className="flex items-center px-3 py-2 bg-gray-600 text-white rounded-md hover:bg-gray-700 transition-colors"
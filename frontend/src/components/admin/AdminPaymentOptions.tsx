@@ -17,12 +17,12 @@ export const AdminPaymentOptions: React.FC = () => {
       return;
     }
     const updatedOptions = [...paymentOptions, newOption].sort((a, b) => a - b);
-    updatePaymentOptions(updatedOptions);
+    updatePaymentOptions(updatedOptions).catch((error: Error) => alert(error.message));
     setNewOption(0);
   };
   const handleDelete = (option: number) => {
     if (window.confirm(`¿Está seguro que desea eliminar la opción de ${option} cuota(s)?`)) {
-      updatePaymentOptions(paymentOptions.filter(opt => opt !== option));
+      updatePaymentOptions(paymentOptions.filter(opt => opt !== option)).catch((error: Error) => alert(error.message));
     }
   };
   return <div className="bg-white rounded-lg shadow-md p-6">
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../../context/AuthContext';
-import { UserIcon, MailIcon, PlusIcon, EditIcon, TrashIcon, EyeIcon, EyeOffIcon } from 'lucide-react';
+import { UserIcon, MailIcon, PlusIcon, EditIcon, TrashIcon, EyeIcon, EyeOffIcon, SearchIcon } from 'lucide-react';
 import axios from 'axios';
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8005';
@@ -15,6 +15,17 @@ interface User {
   last_login?: string;
 }
 
+// Respuesta paginada de GET /auth/users
+interface UserPage {
+  usuarios: User[];
+  total: number;
+  pagina: number;
+  limite: number;
+  hay_mas: boolean;
+}
+
+const USERS_PER_PAGE = 25;
+
 interface CreateUserData {
   username: string;
   email: string;
@@ -30,6 +41,10 @@ export const UserManagement: React.FC = () => {
   const [editingUser, setEditingUser] = useState<User | null>(null);
   const [showPassword, setShowPassword] = useState(false);
   const [successMessage, setSuccessMessage] = useState('');
+  const [searchTerm, setSearchTerm] = useState('');
+  const [page, setPage] = useState(1);
+  const [totalUsers, setTotalUsers] = useState(0);
+  const [hasMore, setHasMore] = useState(false);
   
   // Form states
   const [formData, setFormData] = useState<CreateUserData>({
@@ -39,17 +54,22 @@ export const UserManagement: React.FC = () => {
     is_admin: false
   });
 
+  // Búsqueda con espera para no pedir una página por cada tecla
   useEffect(() => {
-    loadUsers();
-  }, []);
+    const timer = setTimeout(() => loadUsers(), searchTerm ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [searchTerm, page]);
 
   const loadUsers = async () => {
     try {
       setIsLoading(true);
-      const response = await axios.get(`${API_BASE_URL}/auth/users`, {
-        headers: { Authorization: `Bearer ${token}` }
+      const response = await axios.get<UserPage>(`${API_BASE_URL}/auth/users`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { pagina: page, limite: USERS_PER_PAGE, ...(searchTerm.trim() ? { buscar: searchTerm.trim() } : {}) }
       });
-      setUsers(response.data);
+      setUsers(response.data.usuarios);
+      setTotalUsers(response.data.total);
+      setHasMore(response.data.hay_mas);
     } catch (error: any) {
       console.error('Error loading users:', error);
     } finally {
@@ -290,6 +310,23 @@ export const UserManagement: React.FC = () => {
         </div>
       )}
 
+      {/* Search */}
+      <div className="relative mb-4 w-72">
+        <div className="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none">
+          <SearchIcon size={16} className="text-gray-400" />
+        </div>
+        <input
+          type="text"
+          placeholder="Buscar por usuario o email..."
+          value={searchTerm}
+          onChange={(e) => {
+            setSearchTerm(e.target.value);
+            setPage(1);
+          }}
+          className="pl-10 pr-4 py-2 border border-gray-300 rounded-md focus:ring-blue-500 focus:border-blue-500 w-full"
+        />
+      </div>
+
       {/* Users Table */}
       <div className="overflow-x-auto">
         <table className="min-w-full divide-y divide-gray-200">
@@ -377,7 +414,32 @@ export const UserManagement: React.FC = () => {
 
       {users.length === 0 && !isLoading && (
         <div className="text-center py-8 text-gray-500">
-          No hay usuarios registrados
+          {searchTerm ? 'No hay usuarios que coincidan con la búsqueda' : 'No hay usuarios registrados'}
+        </div>
+      )}
+
+      {/* Pagination */}
+      {totalUsers > USERS_PER_PAGE && (
+        <div className="flex justify-between items-center mt-4 text-sm text-gray-600">
+          <span>
+            {(page - 1) * USERS_PER_PAGE + 1}-{(page - 1) * USERS_PER_PAGE + users.length} de {totalUsers} usuarios
+          </span>
+          <div className="flex space-x-2">
+            <button
+              onClick={() => setPage(prev => Math.max(1, prev - 1))}
+              disabled={page === 1 || isLoading}
+              className="px-3 py-1 border border-gray-300 rounded-md hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              Anterior
+            </button>
+            <button
+              onClick={() => setPage(prev => prev + 1)}
+              disabled={!hasMore || isLoading}
+              className="px-3 py-1 border border-gray-300 rounded-md hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              Siguiente
+            </button>
+          </div>
         </div>
       )}
 
@@ -7,14 +7,19 @@ import {
   createLawInBackend, 
   updateLawInBackend, 
   deleteLawFromBackend,
-  getLawsWithMongoIds 
+  getLawsWithMongoIds,
+  applyBackendLaws
 } from '../data/lawsData';
 import { 
   Quotation, 
   saveQuotationToBackend, 
   getQuotationsFromBackend, 
   deleteQuotationFromBackend, 
-  updateQuotationStatus 
+  updateQuotationStatus,
+  updateQuotationsStatus,
+  BulkStatusResult,
+  subscribeToQuotationChanges,
+  QuotationDelta
 } from '../data/quotationsData';
 import {
   EncuadernacionType,
@@ -25,6 +30,13 @@ import {
   deleteEncuadernacionFromBackend,
   toggleEncuadernacionStatusInBackend
 } from '../data/encuadernacionData';
+import {
+  PaymentPlan,
+  getPaymentPlansFromBackend,
+  createPaymentPlanInBackend,
+  deletePaymentPlanFromBackend
+} from '../data/paymentPlansData';
+import { loadBootstrap } from '../data/bootstrapData';
 
 interface AdminContextType {
   laws: Law[];
@@ -32,7 +44,7 @@ interface AdminContextType {
   addLaw: (law: Omit<Law, 'id'>) => Promise<Law>;
   deleteLaw: (mongoId: string) => Promise<void>;
   paymentOptions: number[];
-  updatePaymentOptions: (options: number[]) => void;
+  updatePaymentOptions: (options: number[]) => Promise<void>;
   veryThickLawIds: number[];
   updateVeryThickLawIds: (ids: number[]) => void;
   customerSelections: CustomerSelection[];
@@ -48,6 +60,7 @@ interface AdminContextType {
   loadQuotations: () => Promise<void>;
   removeQuotation: (id: string) => Promise<void>;
   updateQuotationStatus: (id: string, estado: string, fechaEntrega?: string) => Promise<Quotation>;
+  updateQuotationsStatus: (ids: string[], estado: string) => Promise<BulkStatusResult>;
   // Propiedades para encuadernación
   encuadernaciones: EncuadernacionType[];
   allEncuadernaciones: EncuadernacionType[];
@@ -110,6 +123,7 @@ export const AdminProvider: React.FC<{
       return [1, 2, 3, 4];
     }
   });
+  const [paymentPlans, setPaymentPlans] = useState<PaymentPlan[]>([]);
   // Cargar veryThickLawIds desde localStorage al inicializar
   const [veryThickLawIds, setVeryThickLawIds] = useState<number[]>(() => {
     try {
@@ -130,9 +144,34 @@ export const AdminProvider: React.FC<{
   const [allEncuadernaciones, setAllEncuadernaciones] = useState<EncuadernacionType[]>([]);
 
   useEffect(() => {
-    refreshLaws();
+    loadBootstrapData(); // Leyes, encuadernaciones y planes de pago en una sola petición
     loadQuotations(); // Cargar quotations al inicializar
-    loadEncuadernaciones(); // Cargar encuadernaciones al inicializar
+  }, []);
+
+  // Aplicar en vivo los cambios de cotizaciones en lugar de recargar toda la lista
+  useEffect(() => {
+    const getId = (q: Quotation) => (typeof q._id === 'object' ? q._id.$oid : q._id) as unknown as string;
+
+    const applyDelta = (delta: QuotationDelta) => {
+      setQuotations(prev => {
+        switch (delta.tipo) {
+          case 'insert':
+            return prev.some(q => getId(q) === delta.id) ? prev : [delta.cotizacion, ...prev];
+          case 'update':
+            return prev.map(q => (getId(q) === delta.id ? { ...q, ...delta.campos } : q));
+          case 'upsert':
+            return prev.some(q => getId(q) === delta.id)
+              ? prev.map(q => (getId(q) === delta.id ? delta.cotizacion : q))
+              : [delta.cotizacion, ...prev];
+          case 'delete':
+            return prev.filter(q => getId(q) !== delta.id);
+          default:
+            return prev;
+        }
+      });
+    };
+
+    return subscribeToQuotationChanges(applyDelta);
   }, []);
 
     // Persistir paymentOptions en localStorage cuando cambien
@@ -246,6 +285,25 @@ export const AdminProvider: React.FC<{
     }
   };
 
+  const loadBootstrapData = async (): Promise<void> => {
+    try {
+      setLoading(true);
+      setError(null);
+      const data = await loadBootstrap();
+      const lawsWithIds = applyBackendLaws(data.leyes);
+      setLaws(lawsCatalog);
+      setLawsWithMongoIds(lawsWithIds);
+      setEncuadernaciones(data.encuadernaciones.map(encuadernacion => ({ ...encuadernacion, activo: true })));
+      setPaymentPlans(data.planes_pago.map(plan => ({ ...plan, activo: true })));
+      setPaymentOptions(data.planes_pago.map(plan => plan.cantidad_cuotas));
+      setLoading(false);
+    } catch (err: any) {
+      // Servidor sin /bootstrap: cargar cada recurso por separado
+      console.error('Error al cargar datos iniciales:', err);
+      await Promise.all([refreshLaws(), loadEncuadernaciones(), loadPaymentPlans()]);
+    }
+  };
+
   const refreshLaws = async (): Promise<void> => {
     try {
       setLoading(true);
@@ -305,10 +363,31 @@ export const AdminProvider: React.FC<{
     }
   };
 
- const updatePaymentOptions = (options: number[]) => {
+ const loadPaymentPlans = async (): Promise<void> => {
+  try {
+    const plans = await getPaymentPlansFromBackend();
+    setPaymentPlans(plans);
+    setPaymentOptions(plans.map(plan => plan.cantidad_cuotas));
+  } catch (error: any) {
+    // Sin conexión se conservan las opciones guardadas en localStorage
+    console.error('Error al cargar planes de pago:', error);
+  }
+};
+
+ const updatePaymentOptions = async (options: number[]): Promise<void> => {
   // Validar que las opciones sean números válidos
   const validOptions = options.filter(opt => typeof opt === 'number' && opt > 0);
-  setPaymentOptions(validOptions);
+  try {
+    const added = validOptions.filter(opt => !paymentOptions.includes(opt));
+    const removed = paymentPlans.filter(plan => plan._id && !validOptions.includes(plan.cantidad_cuotas));
+    await Promise.all([
+      ...added.map(opt => createPaymentPlanInBackend(opt)),
+      ...removed.map(plan => deletePaymentPlanFromBackend(plan._id as string))
+    ]);
+    await loadPaymentPlans();
+  } catch (error: any) {
+    throw new Error(error.message || 'No se pudieron actualizar los planes de pago');
+  }
 };
 
 
@@ -402,6 +481,21 @@ useEffect(() => {
           throw new Error(error.message || 'Error al actualizar estado de cotización');
         }
       },
+      updateQuotationsStatus: async (ids: string[], estado: string) => {
+        try {
+          const result = await updateQuotationsStatus(ids, estado);
+          const actualizadas = new Set(result.resultados.filter(r => r.status === 'actualizada').map(r => r.id));
+          setQuotations(prev => prev.map(q => {
+            const id = typeof q._id === 'object' ? q._id.$oid : q._id;
+            return id && actualizadas.has(id)
+              ? { ...q, estado: result.estado, ...(result.fecha_entrega ? { fecha_entrega: result.fecha_entrega } : {}) }
+              : q;
+          }));
+          return result;
+        } catch (error: any) {
+          throw new Error(error.message || 'Error al actualizar estado de cotizaciones');
+        }
+      },
       encuadernaciones,
       allEncuadernaciones,
       loadEncuadernaciones,
@@ -0,0 +1,33 @@
+import { BackendLaw } from './lawsData';
+import { EncuadernacionType } from './encuadernacionData';
+import { PaymentPlan } from './paymentPlansData';
+
+export interface BootstrapData {
+  version: string;
+  leyes: Pick<BackendLaw, '_id' | 'nombre' | 'precio' | 'grosor' | 'categoria'>[];
+  encuadernaciones: Pick<EncuadernacionType, '_id' | 'material' | 'tamano' | 'precio'>[];
+  planes_pago: Pick<PaymentPlan, '_id' | 'cantidad_cuotas' | 'nombre'>[];
+}
+
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8005';
+
+let pendingBootstrap: Promise<BootstrapData> | null = null;
+
+// Catálogo, encuadernaciones activas y planes de pago en una sola petición.
+// App y AdminProvider lo piden al montar: comparten la misma petición en curso,
+// y las siguientes las revalida el navegador con el ETag (304 sin cuerpo).
+export const loadBootstrap = (): Promise<BootstrapData> => {
+  if (!pendingBootstrap) {
+    pendingBootstrap = fetch(`${API_BASE_URL}/bootstrap`)
+      .then(async response => {
+        if (!response.ok) {
+          throw new Error(`Error ${response.status}: ${response.statusText}`);
+        }
+        return (await response.json()) as BootstrapData;
+      })
+      .finally(() => {
+        pendingBootstrap = null;
+      });
+  }
+  return pendingBootstrap;
+};
@@ -124,6 +124,19 @@ export const deleteLawFromBackend = async (id: string): Promise<void> => {
   }
 };
 
+// Convierte las leyes del backend (p. ej. de /bootstrap) y actualiza el catálogo compartido
+export const applyBackendLaws = (data: Pick<BackendLaw, '_id' | 'nombre' | 'precio' | 'grosor'>[]): (Law & { mongoId: string })[] => {
+  const laws = data.map((law, index) => ({
+    id: index + 1,
+    name: law.nombre,
+    price: law.precio,
+    thickness: mapThickness(law.grosor),
+    mongoId: law._id
+  }));
+  lawsCatalog = laws.map(({ mongoId, ...law }) => law);
+  return laws;
+};
+
 // Función para obtener todas las leyes con sus IDs de MongoDB
 export const getLawsWithMongoIds = async (): Promise<(Law & { mongoId: string })[]> => {
   try {
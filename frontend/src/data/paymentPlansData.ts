@@ -0,0 +1,62 @@
+export interface PaymentPlan {
+  _id?: string;
+  cantidad_cuotas: number;
+  nombre: string;
+  activo: boolean;
+}
+
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8005';
+
+// Función para obtener los planes de pago activos
+export const getPaymentPlansFromBackend = async (): Promise<PaymentPlan[]> => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/planes-pago`);
+    if (!response.ok) {
+      throw new Error(`Error ${response.status}: ${response.statusText}`);
+    }
+    return await response.json();
+  } catch (error) {
+    console.error('Error al obtener planes de pago:', error);
+    throw error;
+  }
+};
+
+// Función para crear (o reactivar) un plan de pago
+export const createPaymentPlanInBackend = async (cantidadCuotas: number): Promise<PaymentPlan> => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/planes-pago`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ cantidad_cuotas: cantidadCuotas }),
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json();
+      throw new Error(errorData.detail || `Error ${response.status}: ${response.statusText}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('Error al crear plan de pago:', error);
+    throw error;
+  }
+};
+
+// Función para desactivar un plan de pago
+export const deletePaymentPlanFromBackend = async (id: string): Promise<void> => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/planes-pago/${id}`, {
+      method: 'DELETE',
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json();
+      throw new Error(errorData.detail || `Error ${response.status}: ${response.statusText}`);
+    }
+  } catch (error) {
+    console.error('Error al eliminar plan de pago:', error);
+    throw error;
+  }
+};
@@ -84,10 +84,12 @@ export const saveQuotationToBackend = async (quotation: Omit<Quotation, '_id'>):
   }
 };
 
-// Función para obtener todas las cotizaciones
+// Función para obtener todas las cotizaciones (incluidas las entregadas ya archivadas)
 export const getQuotationsFromBackend = async (): Promise<Quotation[]> => {
   try {
-    const response = await axios.get<Quotation[]>(`${API_BASE_URL}/cotizaciones`);
+    const response = await axios.get<Quotation[]>(`${API_BASE_URL}/cotizaciones`, {
+      params: { incluir_archivadas: true }
+    });
     return response.data;
   } catch (error) {
     console.error('Error al obtener cotizaciones:', error);
@@ -127,4 +129,53 @@ export const updateQuotationStatus = async (id: string, estado: string, fechaEnt
     }
     throw new Error('Error de conexión al actualizar el estado');
   }
-};
\ No newline at end of file
+};
+// Resultado por id de PATCH /cotizaciones/estado
+export interface BulkStatusResult {
+  estado: string;
+  fecha_entrega: string | null;
+  actualizadas: number;
+  total: number;
+  hay_mas: boolean;
+  resultados: { id: string; status: 'actualizada' | 'sin_cambios' | 'no_encontrada' }[];
+}
+
+// Cambia el estado de varias cotizaciones en una sola petición
+export const updateQuotationsStatus = async (ids: string[], estado: string): Promise<BulkStatusResult> => {
+  try {
+    const response = await axios.patch(`${API_BASE_URL}/cotizaciones/estado`, { estado, ids });
+    return response.data;
+  } catch (error: any) {
+    if (error.response) {
+      throw new Error(`Error ${error.response.status}: ${error.response.data?.detail || 'Error del servidor'}`);
+    }
+    throw new Error('Error de conexión al actualizar los estados');
+  }
+};
+
+// Cambios de cotizaciones emitidos por GET /cotizaciones/stream
+export type QuotationDelta =
+  | { tipo: 'insert'; id: string; cotizacion: Quotation }
+  | { tipo: 'update'; id: string; campos: Partial<Quotation> }
+  | { tipo: 'upsert'; id: string; cotizacion: Quotation }
+  | { tipo: 'delete'; id: string };
+
+// Suscribirse a los cambios en vivo; devuelve la función para cerrar la conexión
+export const subscribeToQuotationChanges = (onDelta: (delta: QuotationDelta) => void): (() => void) => {
+  const source = new EventSource(`${API_BASE_URL}/cotizaciones/stream`);
+
+  source.addEventListener('cotizacion', (event) => {
+    try {
+      onDelta(JSON.parse((event as MessageEvent).data) as QuotationDelta);
+    } catch (error) {
+      console.error('Error al procesar cambio de cotización:', error);
+    }
+  });
+
+  source.onerror = () => {
+    // EventSource se reconecta solo usando el "retry" que envía el servidor
+    console.warn('Conexión de cambios de cotizaciones interrumpida, reintentando...');
+  };
+
+  return () => source.close();
+};